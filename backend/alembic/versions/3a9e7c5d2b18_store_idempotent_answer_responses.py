@@ -0,0 +1,28 @@
+"""store responses of idempotent answer submissions
+
+Revision ID: 3a9e7c5d2b18
+Revises: 7e2c4b9d1f36
+Create Date: 2026-10-20 10:14:38.201467
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a9e7c5d2b18'
+down_revision: Union[str, None] = '7e2c4b9d1f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('survey_answer_idempotency_keys', sa.Column('response_status', sa.Integer(), nullable=True))
+    op.add_column('survey_answer_idempotency_keys', sa.Column('response_body', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('survey_answer_idempotency_keys', 'response_body')
+    op.drop_column('survey_answer_idempotency_keys', 'response_status')
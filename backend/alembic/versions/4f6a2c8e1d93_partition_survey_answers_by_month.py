@@ -0,0 +1,119 @@
+"""partition survey_answers by month
+
+Revision ID: 4f6a2c8e1d93
+Revises: 038b7b24a711
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f6a2c8e1d93'
+down_revision: Union[str, None] = '038b7b24a711'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сколько месяцев вперёд создаём партиции сразу при миграции.
+# Дальше их поддерживает `python -m src.cli partitions ensure`.
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    # Ключ партиционирования должен быть NOT NULL и входить в первичный ключ
+    op.execute("UPDATE survey_answers SET created_at = now() WHERE created_at IS NULL")
+
+    # Переименовываем старую таблицу вместе с индексами, чтобы освободить имена
+    op.execute("ALTER SEQUENCE survey_answers_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE survey_answers RENAME TO survey_answers_unpartitioned")
+    op.execute("ALTER TABLE survey_answers_unpartitioned RENAME CONSTRAINT survey_answers_pkey TO survey_answers_unpartitioned_pkey")
+    op.execute("ALTER INDEX ix_survey_answers_id RENAME TO ix_survey_answers_unpartitioned_id")
+    op.execute("ALTER INDEX ix_survey_answers_public_id RENAME TO ix_survey_answers_unpartitioned_public_id")
+    op.execute("ALTER INDEX ix_survey_answers_survey_id RENAME TO ix_survey_answers_unpartitioned_survey_id")
+
+    op.execute("""
+        CREATE TABLE survey_answers (
+            id INTEGER NOT NULL DEFAULT nextval('survey_answers_id_seq'),
+            survey_id INTEGER NOT NULL REFERENCES surveys (id),
+            public_id VARCHAR NOT NULL,
+            answers TEXT NOT NULL,
+            respondent_id VARCHAR,
+            ip VARCHAR,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT survey_answers_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE survey_answers_id_seq OWNED BY survey_answers.id")
+    # Индексы на родительской таблице автоматически создаются на каждой партиции
+    op.create_index(op.f('ix_survey_answers_id'), 'survey_answers', ['id'], unique=False)
+    op.create_index(op.f('ix_survey_answers_public_id'), 'survey_answers', ['public_id'], unique=False)
+    op.create_index(op.f('ix_survey_answers_survey_id'), 'survey_answers', ['survey_id'], unique=False)
+
+    # Помесячные партиции: от самого старого ответа до MONTHS_AHEAD месяцев вперёд
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month_start DATE;
+            last_month DATE;
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(created_at), now()))::date
+              INTO month_start
+              FROM survey_answers_unpartitioned;
+            last_month := (date_trunc('month', now()) + interval '{MONTHS_AHEAD} months')::date;
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF survey_answers FOR VALUES FROM (%L) TO (%L)',
+                    'survey_answers_p' || to_char(month_start, 'YYYYMM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END
+        $$
+    """)
+    # Страховка на случай, если партиции вовремя не созданы
+    op.execute("CREATE TABLE survey_answers_default PARTITION OF survey_answers DEFAULT")
+
+    op.execute("""
+        INSERT INTO survey_answers (id, survey_id, public_id, answers, respondent_id, ip, created_at)
+        SELECT id, survey_id, public_id, answers, respondent_id, ip, created_at
+          FROM survey_answers_unpartitioned
+    """)
+    op.drop_table('survey_answers_unpartitioned')
+
+
+def downgrade() -> None:
+    op.execute("ALTER SEQUENCE survey_answers_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE survey_answers RENAME TO survey_answers_partitioned")
+    op.execute("ALTER TABLE survey_answers_partitioned RENAME CONSTRAINT survey_answers_pkey TO survey_answers_partitioned_pkey")
+    op.execute("ALTER INDEX ix_survey_answers_id RENAME TO ix_survey_answers_partitioned_id")
+    op.execute("ALTER INDEX ix_survey_answers_public_id RENAME TO ix_survey_answers_partitioned_public_id")
+    op.execute("ALTER INDEX ix_survey_answers_survey_id RENAME TO ix_survey_answers_partitioned_survey_id")
+
+    op.create_table('survey_answers',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('survey_answers_id_seq')"), nullable=False),
+    sa.Column('survey_id', sa.Integer(), nullable=False),
+    sa.Column('public_id', sa.String(), nullable=False),
+    sa.Column('answers', sa.Text(), nullable=False),
+    sa.Column('respondent_id', sa.String(), nullable=True),
+    sa.Column('ip', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("ALTER SEQUENCE survey_answers_id_seq OWNED BY survey_answers.id")
+    op.create_index(op.f('ix_survey_answers_id'), 'survey_answers', ['id'], unique=False)
+    op.create_index(op.f('ix_survey_answers_public_id'), 'survey_answers', ['public_id'], unique=False)
+    op.create_index(op.f('ix_survey_answers_survey_id'), 'survey_answers', ['survey_id'], unique=False)
+
+    op.execute("""
+        INSERT INTO survey_answers (id, survey_id, public_id, answers, respondent_id, ip, created_at)
+        SELECT id, survey_id, public_id, answers, respondent_id, ip, created_at
+          FROM survey_answers_partitioned
+    """)
+    # Партиции удаляются вместе с родительской таблицей
+    op.execute("DROP TABLE survey_answers_partitioned CASCADE")
@@ -0,0 +1,42 @@
+"""add survey responses in progress
+
+Revision ID: 5c1e9b3d7a42
+Revises: a4d8c2e6f190
+Create Date: 2026-10-19 16:12:54.204718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9b3d7a42'
+down_revision: Union[str, None] = 'a4d8c2e6f190'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('survey_responses_in_progress',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('survey_id', sa.Integer(), nullable=False),
+    sa.Column('respondent_token', sa.String(length=64), nullable=False),
+    sa.Column('respondent_id', sa.String(), nullable=True),
+    sa.Column('ip', sa.String(), nullable=True),
+    sa.Column('answers', sa.Text(), nullable=False),
+    sa.Column('followup_count', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('survey_id', 'respondent_token', name='uq_survey_responses_in_progress_survey_id_token')
+    )
+    op.create_index(op.f('ix_survey_responses_in_progress_survey_id'), 'survey_responses_in_progress', ['survey_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_survey_responses_in_progress_survey_id'), table_name='survey_responses_in_progress')
+    op.drop_table('survey_responses_in_progress')
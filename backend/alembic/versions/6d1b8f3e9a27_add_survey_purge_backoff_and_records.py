@@ -0,0 +1,39 @@
+"""add survey purge backoff and purge records
+
+Revision ID: 6d1b8f3e9a27
+Revises: 3a9e7c5d2b18
+Create Date: 2026-10-20 11:02:51.873310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d1b8f3e9a27'
+down_revision: Union[str, None] = '3a9e7c5d2b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('surveys', sa.Column('purge_attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('surveys', sa.Column('purge_retry_at', sa.DateTime(), nullable=True))
+    op.create_table('survey_purges',
+    sa.Column('survey_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.Column('purged_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('survey_id')
+    )
+    op.create_index(op.f('ix_survey_purges_user_id'), 'survey_purges', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_survey_purges_user_id'), table_name='survey_purges')
+    op.drop_table('survey_purges')
+    op.drop_column('surveys', 'purge_retry_at')
+    op.drop_column('surveys', 'purge_attempts')
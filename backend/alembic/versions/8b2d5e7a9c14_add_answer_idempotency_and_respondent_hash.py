@@ -0,0 +1,46 @@
+"""add answer idempotency keys and respondent hash
+
+Revision ID: 8b2d5e7a9c14
+Revises: 4f6a2c8e1d93
+Create Date: 2026-10-19 11:03:27.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d5e7a9c14'
+down_revision: Union[str, None] = '4f6a2c8e1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('survey_answers', sa.Column('respondent_hash', sa.String(length=64), nullable=True))
+    op.execute("""
+        UPDATE survey_answers
+           SET respondent_hash = encode(sha256(convert_to(
+               CASE WHEN respondent_id IS NOT NULL AND respondent_id <> '' THEN 'r:' || respondent_id ELSE 'ip:' || ip END,
+               'UTF8')), 'hex')
+         WHERE coalesce(nullif(respondent_id, ''), ip) IS NOT NULL
+    """)
+    op.create_index('ix_survey_answers_survey_id_respondent_hash', 'survey_answers', ['survey_id', 'respondent_hash'], unique=False)
+
+    op.create_table('survey_answer_idempotency_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('survey_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('survey_id', 'key', name='uq_survey_answer_idempotency_keys_survey_id_key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('survey_answer_idempotency_keys')
+    op.drop_index('ix_survey_answers_survey_id_respondent_hash', table_name='survey_answers')
+    op.drop_column('survey_answers', 'respondent_hash')
@@ -0,0 +1,34 @@
+"""add template survey fields
+
+Revision ID: 9d3f6a2b8c15
+Revises: 5c1e9b3d7a42
+Create Date: 2026-10-19 17:05:41.318620
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f6a2b8c15'
+down_revision: Union[str, None] = '5c1e9b3d7a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('surveys', sa.Column('is_template_survey', sa.Boolean(), server_default='false', nullable=False))
+    op.add_column('surveys', sa.Column('app_name', sa.String(), nullable=True))
+    op.add_column('surveys', sa.Column('app_purpose', sa.Text(), nullable=True))
+    op.add_column('surveys', sa.Column('app_functionality', sa.Text(), nullable=True))
+    op.create_index(op.f('ix_surveys_is_template_survey'), 'surveys', ['is_template_survey'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_surveys_is_template_survey'), table_name='surveys')
+    op.drop_column('surveys', 'app_functionality')
+    op.drop_column('surveys', 'app_purpose')
+    op.drop_column('surveys', 'app_name')
+    op.drop_column('surveys', 'is_template_survey')
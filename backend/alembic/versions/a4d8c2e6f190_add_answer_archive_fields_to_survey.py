@@ -0,0 +1,32 @@
+"""add answer archive fields to survey
+
+Revision ID: a4d8c2e6f190
+Revises: e71f0b4c6d58
+Create Date: 2026-10-19 15:02:37.511204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8c2e6f190'
+down_revision: Union[str, None] = 'e71f0b4c6d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('surveys', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.add_column('surveys', sa.Column('answers_archive_uri', sa.String(), nullable=True))
+    op.add_column('surveys', sa.Column('answers_archived_through_id', sa.Integer(), nullable=True))
+    # Время архивации уже архивных опросов неизвестно — отсчитываем от момента миграции
+    op.execute("UPDATE surveys SET archived_at = now() WHERE archived")
+
+
+def downgrade() -> None:
+    op.drop_column('surveys', 'answers_archived_through_id')
+    op.drop_column('surveys', 'answers_archive_uri')
+    op.drop_column('surveys', 'archived_at')
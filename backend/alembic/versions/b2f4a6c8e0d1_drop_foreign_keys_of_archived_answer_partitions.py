@@ -0,0 +1,45 @@
+"""drop foreign keys of archived answer partitions
+
+Revision ID: b2f4a6c8e0d1
+Revises: 6d1b8f3e9a27
+Create Date: 2026-10-20 11:40:07.352918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f4a6c8e0d1'
+down_revision: Union[str, None] = '6d1b8f3e9a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Партиции, уже перенесённые в answers_archive, сохранили внешний ключ на surveys
+    # и блокируют удаление опросов и пользователей
+    op.execute("""
+        DO $$
+        DECLARE
+            fk RECORD;
+        BEGIN
+            FOR fk IN
+                SELECT rel.relname, con.conname
+                  FROM pg_constraint con
+                  JOIN pg_class rel ON rel.oid = con.conrelid
+                  JOIN pg_namespace nsp ON nsp.oid = rel.relnamespace
+                 WHERE con.contype = 'f' AND nsp.nspname = 'answers_archive'
+            LOOP
+                EXECUTE format('ALTER TABLE answers_archive.%I DROP CONSTRAINT %I', fk.relname, fk.conname);
+            END LOOP;
+        END
+        $$
+    """)
+
+
+def downgrade() -> None:
+    # Архивные ответы могут ссылаться на уже удалённые опросы, ключи не восстанавливаются
+    pass
@@ -0,0 +1,32 @@
+"""add answers_count to survey
+
+Revision ID: c3e9a1f47b26
+Revises: 8b2d5e7a9c14
+Create Date: 2026-10-19 12:20:51.307645
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9a1f47b26'
+down_revision: Union[str, None] = '8b2d5e7a9c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('surveys', sa.Column('answers_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE surveys
+           SET answers_count = counts.answers_count
+          FROM (SELECT survey_id, count(*) AS answers_count FROM survey_answers GROUP BY survey_id) AS counts
+         WHERE counts.survey_id = surveys.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('surveys', 'answers_count')
@@ -0,0 +1,26 @@
+"""add sessions_revoked_at to user
+
+Revision ID: c8e1d4a7f592
+Revises: b2f4a6c8e0d1
+Create Date: 2026-10-20 14:12:48.205317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1d4a7f592'
+down_revision: Union[str, None] = 'b2f4a6c8e0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('sessions_revoked_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'sessions_revoked_at')
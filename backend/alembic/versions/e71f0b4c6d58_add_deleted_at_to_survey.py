@@ -0,0 +1,28 @@
+"""add deleted_at to survey
+
+Revision ID: e71f0b4c6d58
+Revises: c3e9a1f47b26
+Create Date: 2026-10-19 13:41:09.882417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e71f0b4c6d58'
+down_revision: Union[str, None] = 'c3e9a1f47b26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('surveys', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_surveys_deleted_at'), 'surveys', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_surveys_deleted_at'), table_name='surveys')
+    op.drop_column('surveys', 'deleted_at')
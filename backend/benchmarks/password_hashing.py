@@ -0,0 +1,77 @@
+"""
+Login throughput under concurrency: bcrypt on the event loop vs the hashing thread pool.
+
+Runs --logins concurrent password verifications, --concurrency at a time,
+the way authenticate_user does them:
+inline:    pwd_context.verify called directly in the coroutine (the old code);
+offloaded: verify_and_update_password (thread pool, bounded queue).
+Alongside, a ticker coroutine measures event-loop lag, i.e. how long any other
+request on the worker would have waited.
+
+Run from backend/ (src.auth.utils needs the usual .env):
+    python -m benchmarks.password_hashing [--logins 200] [--concurrency 50] [--rounds 12]
+"""
+import argparse
+import asyncio
+import time
+
+from src.auth.utils import pwd_context, verify_and_update_password
+from src.config import settings
+
+PASSWORD = "correct horse battery staple"
+
+
+async def ticker(stop: asyncio.Event, lags: list[float], interval: float = 0.01) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run(name: str, verify, hashed: str, logins: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login() -> None:
+        async with semaphore:
+            assert await verify(PASSWORD, hashed)
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    lag_task = asyncio.create_task(ticker(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+    print(
+        f"{name:10} {logins / elapsed:8.1f} logins/s   "
+        f"loop lag p99 {p99 * 1000:8.1f} ms   max {max(lags, default=0) * 1000:8.1f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=settings.password_bcrypt_rounds)
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash(PASSWORD, rounds=args.rounds)
+    print(f"bcrypt rounds={args.rounds}, hashing threads={settings.password_hash_workers}, "
+          f"max pending={settings.password_hash_max_pending}")
+
+    async def inline(password: str, hashed_password: str) -> bool:
+        return pwd_context.verify(password, hashed_password)
+
+    async def offloaded(password: str, hashed_password: str) -> bool:
+        valid, _ = await verify_and_update_password(password, hashed_password)
+        return valid
+
+    await run("inline", inline, hashed, args.logins, args.concurrency)
+    await run("offloaded", offloaded, hashed, args.logins, min(args.concurrency, settings.password_hash_max_pending))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Serialization cost of the heaviest endpoints: before vs after the orjson fast path.
+
+before: the handler returns a pydantic model / list of models. FastAPI validates
+        it against response_model, runs jsonable_encoder and encodes with json.dumps
+        (JSONResponse).
+after:  the handler returns trusted_json(dict), which ORJSONResponse encodes once.
+
+Run from backend/ (src.tasks.survey_api needs the usual .env):
+    python -m benchmarks.serialization [--answers 5000] [--surveys 200] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.responses import trusted_json
+from src.tasks.models import SurveyOut
+from src.tasks.survey_api import SurveyAnalytics
+
+QUESTIONS = [
+    {"id": "q1", "type": "rating", "text": "Как вы оцениваете сервис?"},
+    {"id": "q2", "type": "multiple_choice", "text": "Откуда вы о нас узнали?", "options": ["Друзья", "Реклама", "Поиск"]},
+    {"id": "q3", "type": "open_ended", "text": "Что можно улучшить?"},
+]
+
+
+def make_answers(n: int) -> list[dict]:
+    start = datetime(2026, 1, 1)
+    return [
+        {
+            "answers": [str(random.randint(1, 5)), random.choice(QUESTIONS[1]["options"]), "Всё хорошо, спасибо " * 3],
+            "respondent_id": f"tg-{i}",
+            "ip": f"10.0.{i // 256 % 256}.{i % 256}",
+            "created_at": (start + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(n)
+    ]
+
+
+def make_surveys(n: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "topic": f"Опрос {i}",
+            "questions": QUESTIONS,
+            "created_at": datetime(2026, 1, 1) + timedelta(days=i),
+            "public_id": f"pub{i:05d}",
+            "archived": i % 3 == 0,
+            "answers_count": i * 10,
+        }
+        for i in range(n)
+    ]
+
+
+def make_analytics(answers: list[dict]) -> dict:
+    return {
+        "total_responses": len(answers),
+        "question_analytics": {
+            QUESTIONS[0]["text"]: {"type": "rating", "average": 3.0, "median": 3, "mode": 3,
+                                   "distribution": {str(v): len(answers) // 5 for v in range(1, 6)}},
+            QUESTIONS[1]["text"]: {"type": "multiple_choice",
+                                   "answers": {opt: len(answers) // 3 for opt in QUESTIONS[1]["options"]}},
+            QUESTIONS[2]["text"]: {"type": "text", "answers": [a["answers"][2] for a in answers]},
+        },
+        "first_response_date": answers[0]["created_at"],
+        "last_response_date": answers[-1]["created_at"],
+        "unique_respondents": len(answers),
+        "avg_time_between_responses": 1.0,
+        "response_rate": 100.0,
+        "response_times": [a["created_at"] for a in answers],
+        "popular_day": "Monday",
+        "popular_hour": "12:00 - 12:59",
+    }
+
+
+def before(adapter: TypeAdapter, data):
+    def run():
+        validated = adapter.validate_python(data)
+        return JSONResponse(jsonable_encoder(validated)).body
+    return run
+
+
+def after(data):
+    return lambda: trusted_json(data).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=5000)
+    parser.add_argument("--surveys", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    answers = make_answers(args.answers)
+    cases = [
+        ("GET /api/surveys/ (list)", TypeAdapter(list[SurveyOut]), make_surveys(args.surveys)),
+        ("GET /s/{public_id}/answers", TypeAdapter(list[dict]), answers),
+        ("GET /{survey_id}/analytics", TypeAdapter(SurveyAnalytics), make_analytics(answers)),
+    ]
+
+    print(f"{'endpoint':32} {'before ms':>10} {'after ms':>10} {'speedup':>8} {'bytes':>10}")
+    for name, adapter, data in cases:
+        before_ms = min(timeit.repeat(before(adapter, data), number=1, repeat=args.repeat)) * 1000
+        after_ms = min(timeit.repeat(after(data), number=1, repeat=args.repeat)) * 1000
+        size = len(trusted_json(data).body)
+        assert json.loads(trusted_json(data).body) == json.loads(before(adapter, data)())
+        print(f"{name:32} {before_ms:10.2f} {after_ms:10.2f} {before_ms / after_ms:7.1f}x {size:10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
 #!/bin/bash
 echo "Running database migrations..."
 cd /app
-alembic upgrade head 
\ No newline at end of file
+alembic upgrade head 
+echo "Ensuring survey_answers partitions..."
+python -m src.cli partitions ensure
+if [ -n "$PUBLIC_SURVEY_SNAPSHOT_DIR" ]; then
+  echo "Publishing static survey snapshots..."
+  python -m src.cli publish-surveys
+fi
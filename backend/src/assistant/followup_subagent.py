@@ -9,6 +9,14 @@ client = AzureOpenAI(
     api_key=os.getenv("AZURE_OPENAI_KEY"),
 )
 
+# Только на эти типы вопросов subagent может ответить уточнением
+FOLLOWUP_QUESTION_TYPES = ("open_ended", "long_text")
+
+
+def may_need_followup(question) -> bool:
+    return isinstance(question, dict) and question.get('type') in FOLLOWUP_QUESTION_TYPES
+
+
 def generate_followup_with_gpt41mini(topic, question, answer, history):
     """
     Use gpt-4.1-mini to generate a follow-up or clarification prompt.
@@ -47,8 +55,7 @@ def followup_subagent(topic, question, answer, history, session, followup_limit=
     Returns:
         dict: {'action': 'followup', 'message': ...} or {'action': 'next'}
     """
-    qtype = question.get('type')
-    if qtype in ("open_ended", "long_text"):
+    if may_need_followup(question):
         followup_count = session.get('followup_count', 0)
         if followup_count < followup_limit:
             if not ai_is_meaningful_answer(answer, question):
@@ -9,6 +9,9 @@ from src.database import get_async_db
 from src.tasks.models import User
 from src.auth.dependencies import get_current_user
 from src.tasks.schema import Survey
+from src.tasks.publish import publish_survey
+from src.leaderboard.events import leaderboard_events
+from src.leaderboard.ranking import leaderboard_ranking
 from src.config import settings
 
 router = APIRouter()
@@ -89,5 +92,8 @@ async def create_survey_from_template(
     db.add(new_survey)
     await db.commit()
     await db.refresh(new_survey)
+    leaderboard_ranking.add_app(new_survey.id, new_survey.app_name, all_questions)
+    await leaderboard_events.apps_changed()
+    await publish_survey(new_survey.public_id, new_survey.topic, all_questions)
 
     return new_survey 
\ No newline at end of file
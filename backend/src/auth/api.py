@@ -7,19 +7,26 @@ from authlib.integrations.starlette_client import OAuth # type: ignore
 import jwt
 from datetime import datetime, timedelta
 import uuid
+import logging
 import os
+from urllib.parse import urlencode
 
-from src.auth.dependencies import get_current_user
-from src.auth.exceptions import (InvalidCredentialsException,
+from src.auth.dependencies import get_current_user, oauth2_scheme, optional_oauth2_scheme
+from src.auth.exceptions import (InvalidCredentialsException, InvalidTokenException,
+                             PasswordHashingBusyException, TokenExpiredException,
                              UserAlreadyExistsException, raise_http_exception)
-from src.tasks.models import Token, User, UserCredentials
+from src.auth.revocation import revoke_access_token
+from src.auth.tokens import exchange_legacy_token, issue_tokens, revoke_refresh_token, rotate_refresh_token
+from src.tasks.models import RefreshTokenIn, Token, User, UserCredentials
 from src.tasks.service import AuthService
 from src.database import get_async_db
 from src.config import settings
 from src.tasks.crud import UserDAO
-from src.auth.utils import create_access_token
+from src.auth.utils import decode_access_claims
 from src.tasks.schema import User as DBUser
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 oauth = OAuth()
@@ -46,7 +53,7 @@ async def login_for_access_token(
             password=form_data.password,
             db=db
         )
-    except InvalidCredentialsException as e:
+    except (InvalidCredentialsException, PasswordHashingBusyException) as e:
         raise_http_exception(e)
 
 
@@ -57,10 +64,47 @@ async def register_user(
 ):
     try:
         return await AuthService.register_user(credentials, db)
-    except UserAlreadyExistsException as e:
+    except (UserAlreadyExistsException, PasswordHashingBusyException) as e:
+        raise_http_exception(e)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    data: RefreshTokenIn | None = Body(None),
+    legacy_token: str | None = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+    Without a body, an old non-expiring access token in Authorization is exchanged
+    instead (until legacy_token_exchange_until).
+    """
+    try:
+        if data is not None:
+            return await rotate_refresh_token(data.refresh_token, db)
+        if legacy_token is None:
+            raise InvalidTokenException()
+        return await exchange_legacy_token(legacy_token, db)
+    except InvalidTokenException as e:
         raise_http_exception(e)
 
 
+@router.post("/logout")
+async def logout(
+    data: RefreshTokenIn | None = Body(None),
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Revoke the current access token and, if given, the session of the refresh token."""
+    try:
+        await revoke_access_token(decode_access_claims(token))
+    except (InvalidTokenException, TokenExpiredException):
+        pass  # токен уже недействителен
+    if data is not None:
+        await revoke_refresh_token(data.refresh_token, db)
+    return {"ok": True}
+
+
 @router.get("/me", response_model=User)
 async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
@@ -149,20 +193,18 @@ async def auth_via_google(request: Request, db: AsyncSession = Depends(get_async
         await db.refresh(user)
 
 
-    # Создаем наш внутренний токен доступа
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    # Создаем наш внутренний токен доступа и refresh-токен
+    tokens = await issue_tokens(user, db)
+    access_token = tokens["access_token"]
 
     # ПРАВИЛЬНО: Редирект на эндпоинт ФРОНТЕНДА, который умеет обрабатывать токен
     # Путь /auth/callback соответствует вашему компоненту AuthCallback.jsx
     frontend = os.getenv("FRONTEND_URL", "http://localhost:3000")
-    frontend_url = f"{frontend}/auth/callback?token={access_token}"
-    
-    # Debug logging
-    print(f"🔗 Redirecting to frontend: {frontend_url}")
-    print(f"🔗 Token length: {len(access_token) if access_token else 0}")
+    # Токены передаются во фрагменте: он не уходит на сервер, не пишется в логи и не попадает в Referer
+    frontend_url = f"{frontend}/auth/callback#" + urlencode(
+        {"token": access_token, "refresh_token": tokens["refresh_token"]}
+    )
+    logger.info("Google login of user %s, redirecting to %s/auth/callback", user.id, frontend)
     
     return RedirectResponse(url=frontend_url, status_code=302)
     
@@ -1,34 +1,39 @@
+from datetime import datetime
+
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.tasks.crud import UserDAO
 from src.auth.exceptions import (InvalidTokenException, TokenExpiredException,
-                             UserNotFoundException, raise_http_exception)
+                             raise_http_exception)
 from src.tasks.models import User
-from src.auth.utils import decode_access_token
-from src.database import get_async_db
+from src.auth.revocation import token_denylist
+from src.auth.utils import decode_access_claims
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token", auto_error=False)
+
+
+def _from_timestamp(value: int | None) -> datetime | None:
+    return datetime.fromtimestamp(value) if value is not None else None
 
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_async_db)
+    token: str = Depends(oauth2_scheme)
 ) -> User:
     try:
-        email = decode_access_token(token)
-        db_user = await UserDAO.get_user_by_email_or_raise(email, db)
+        claims = decode_access_claims(token)
+        # Токен несёт всё о пользователе — БД не нужна, только проверка отзыва
+        if token_denylist.is_revoked(claims):
+            raise InvalidTokenException()
         return User(
-            id=db_user.id,
-            email=db_user.email,
-            name=db_user.name,
-            created_at=db_user.created_at,
-            updated_at=db_user.updated_at
+            id=claims["uid"],
+            email=claims["sub"],
+            name=claims["name"],
+            created_at=_from_timestamp(claims.get("created_at")),
+            updated_at=_from_timestamp(claims.get("updated_at"))
         )
     except (
         InvalidTokenException,
-        TokenExpiredException,
-        UserNotFoundException
+        TokenExpiredException
     ) as e:
         raise_http_exception(e)
\ No newline at end of file
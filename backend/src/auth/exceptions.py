@@ -41,6 +41,12 @@ class TokenExpiredException(AuthException):
         super().__init__("Token has expired")
 
 
+class PasswordHashingBusyException(AuthException):
+    """Raised when too many password hash/verify calls are already pending."""
+    def __init__(self):
+        super().__init__("Server is busy, please retry")
+
+
 class InsufficientPermissionsException(AuthException):
     """Raised when user doesn't have required permissions."""
     def __init__(self, required_permission: str = None):
@@ -89,6 +95,12 @@ def raise_http_exception(exception: AuthException) -> HTTPException:
             status_code=status.HTTP_403_FORBIDDEN,
             detail=str(exception)
         )
+    elif isinstance(exception, PasswordHashingBusyException):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exception),
+            headers={"Retry-After": "1"}
+        )
     elif isinstance(exception, DatabaseException):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,80 @@
+"""
+In-memory denylist of access tokens.
+
+Access tokens are short-lived and verified without the database, so
+revoking one means remembering it until it would have expired anyway:
+  - a single token by its jti (logout);
+  - all tokens of a user issued before a moment (password change, account
+    deletion), compared with the token's iat to the second.
+A check is two dict lookups. Revocations are published on the
+"revocations" pub/sub channel (src/pubsub.py) so every worker applies them.
+A worker that misses a message still rejects the token once it expires
+(access_token_expire_minutes).
+"""
+import json
+import time
+
+from src.config import settings
+from src.metrics import Counter, Gauge
+from src.pubsub import pubsub
+
+REVOCATIONS_CHANNEL = "revocations"
+
+DENYLIST_SIZE = Gauge("token_denylist_entries", "Revoked access tokens and users remembered by this process")
+DENYLIST_HITS = Counter("token_denylist_hits_total", "Requests rejected because their access token was revoked")
+
+
+class TokenDenylist:
+    def __init__(self):
+        self._tokens: dict[str, float] = {}  # jti -> token expiry (unix time)
+        self._users: dict[int, int] = {}  # user id -> tokens issued before this second are revoked
+        DENYLIST_SIZE.set_function(lambda: len(self._tokens) + len(self._users))
+
+    def _prune(self) -> None:
+        now = time.time()
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        oldest = now - settings.access_token_expire_minutes * 60
+        self._users = {user_id: since for user_id, since in self._users.items() if since > oldest}
+
+    def revoke_token(self, jti: str, exp: float) -> None:
+        self._prune()
+        self._tokens[jti] = exp
+
+    def revoke_user(self, user_id: int, since: int) -> None:
+        self._prune()
+        self._users[user_id] = max(since, self._users.get(user_id, 0))
+
+    def is_revoked(self, claims: dict) -> bool:
+        revoked = claims.get("jti") in self._tokens or claims.get("iat", 0) < self._users.get(claims.get("uid"), 0)
+        if revoked:
+            DENYLIST_HITS.inc()
+        return revoked
+
+
+token_denylist = TokenDenylist()
+
+
+async def revoke_access_token(claims: dict) -> None:
+    """Revoke one access token (its decoded claims) in every worker."""
+    if "jti" not in claims or "exp" not in claims:
+        return
+    token_denylist.revoke_token(claims["jti"], claims["exp"])
+    await pubsub.publish(REVOCATIONS_CHANNEL, json.dumps({"jti": claims["jti"], "exp": claims["exp"]}))
+
+
+async def revoke_user_access_tokens(user_id: int) -> None:
+    """Revoke every access token of a user issued so far, in every worker."""
+    since = int(time.time())
+    token_denylist.revoke_user(user_id, since)
+    await pubsub.publish(REVOCATIONS_CHANNEL, json.dumps({"user_id": user_id, "since": since}))
+
+
+async def _on_revocation(payload: str) -> None:
+    message = json.loads(payload)
+    if "jti" in message:
+        token_denylist.revoke_token(message["jti"], message["exp"])
+    else:
+        token_denylist.revoke_user(message["user_id"], message["since"])
+
+
+pubsub.subscribe(REVOCATIONS_CHANNEL, _on_revocation)
@@ -0,0 +1,129 @@
+"""
+Token pairs: short-lived access tokens plus rotating server-side refresh tokens.
+
+Access tokens (create_user_access_token) carry the principal and expire after
+access_token_expire_minutes; they are checked against the in-memory denylist
+only (src/auth/revocation.py). Changing a user's name or email
+(UserDAO.update_user) revokes them, so the client refreshes and gets the new
+claims instead of waiting for expiry. Refresh tokens are random strings stored as
+SHA-256 hashes in refresh_tokens and live refresh_token_expire_days.
+
+POST /auth/refresh rotates: the presented refresh token is revoked and a new
+one is issued in the same family. A refresh token that was already rotated
+away and is presented again was probably stolen, so its whole family is
+revoked and the client has to log in again.
+
+Until legacy_token_exchange_until, POST /auth/refresh also accepts an access
+token issued before this scheme (only "sub", no expiry) as a Bearer token and
+starts a new session for its user, unless the user has since logged out
+everywhere (users.sessions_revoked_at).
+"""
+import hashlib
+import secrets
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.auth.exceptions import InvalidTokenException
+from src.auth.revocation import revoke_user_access_tokens
+from src.auth.utils import create_user_access_token, decode_legacy_token
+from src.config import settings
+from src.tasks.crud import UserDAO
+from src.tasks.schema import RefreshToken, User
+
+
+def _hash_token(raw: str) -> str:
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _add_refresh_token(user_id: int, db: AsyncSession, family_id: str | None = None) -> str:
+    raw = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_token(raw),
+        family_id=family_id or uuid.uuid4().hex,
+        created_at=datetime.now(),
+        expires_at=datetime.now() + timedelta(days=settings.refresh_token_expire_days),
+    ))
+    return raw
+
+
+async def issue_tokens(user: User, db: AsyncSession) -> Dict[str, str]:
+    """Start a new session: an access token and a refresh token of a new family."""
+    refresh_token = _add_refresh_token(user.id, db)
+    await db.commit()
+    return {
+        "access_token": create_user_access_token(user),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+async def _revoke_family(family_id: str, db: AsyncSession) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now())
+    )
+
+
+async def rotate_refresh_token(raw: str, db: AsyncSession) -> Dict[str, str]:
+    """Exchange a refresh token for a new token pair. Raises InvalidTokenException."""
+    result = await db.execute(
+        select(RefreshToken).where(RefreshToken.token_hash == _hash_token(raw)).with_for_update()
+    )
+    token = result.scalar_one_or_none()
+    if token is None or token.expires_at <= datetime.now():
+        raise InvalidTokenException()
+    if token.revoked_at is not None:
+        # Повторное использование уже заменённого токена — отзываем всю цепочку
+        await _revoke_family(token.family_id, db)
+        await db.commit()
+        raise InvalidTokenException()
+
+    user = await UserDAO.get_user_by_id(token.user_id, db)
+    if user is None:
+        raise InvalidTokenException()
+    token.revoked_at = datetime.now()
+    refresh_token = _add_refresh_token(user.id, db, family_id=token.family_id)
+    await db.commit()
+    return {
+        "access_token": create_user_access_token(user),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+async def exchange_legacy_token(token: str, db: AsyncSession) -> Dict[str, str]:
+    """Trade a pre-refresh-token access token for a token pair. Raises InvalidTokenException."""
+    until = settings.legacy_token_exchange_until
+    if until is None or date.today() > until:
+        raise InvalidTokenException()
+    user = await UserDAO.get_user_by_email(decode_legacy_token(token), db)
+    if user is None or user.sessions_revoked_at is not None:
+        raise InvalidTokenException()
+    return await issue_tokens(user, db)
+
+
+async def revoke_refresh_token(raw: str, db: AsyncSession) -> None:
+    """Log out one session: revoke the family of the refresh token, if it exists."""
+    result = await db.execute(select(RefreshToken.family_id).where(RefreshToken.token_hash == _hash_token(raw)))
+    family_id = result.scalar_one_or_none()
+    if family_id is not None:
+        await _revoke_family(family_id, db)
+        await db.commit()
+
+
+async def revoke_user_sessions(user_id: int, db: AsyncSession) -> None:
+    """Log out everywhere: revoke all refresh tokens and all issued access tokens of a user."""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now())
+    )
+    await db.execute(update(User).where(User.id == user_id).values(sessions_revoked_at=datetime.now()))
+    await db.commit()
+    await revoke_user_access_tokens(user_id)
@@ -1,47 +1,133 @@
-from datetime import datetime, timedelta
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
-from jose import JWTError, jwt
+from jose import ExpiredSignatureError, JWTError, jwt
 from passlib.context import CryptContext
-from src.auth.exceptions import InvalidTokenException, TokenExpiredException
+from src.auth.exceptions import InvalidTokenException, PasswordHashingBusyException, TokenExpiredException
 from src.config import settings
+from src.metrics import Counter, Gauge, Histogram
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Хэши с другим числом раундов считаются устаревшими и пересчитываются при входе
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.password_bcrypt_rounds)
+
+# bcrypt отпускает GIL, поэтому хватает потоков; event loop на время хэширования не блокируется
+_hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
+_hash_pending = 0
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds", "Password hash/verify latency including the wait for a worker thread", ["operation"]
+)
+PASSWORD_HASH_PENDING = Gauge("password_hash_pending", "Password hash/verify calls running or waiting for a thread")
+PASSWORD_HASH_REJECTED = Counter("password_hash_rejected_total", "Password hash/verify calls rejected as over capacity")
+PASSWORD_HASH_PENDING.set_function(lambda: _hash_pending)
 
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
+async def _run_hashing(operation: str, fn, *args):
+    """
+    Run a bcrypt call on the hashing thread pool. At most password_hash_max_pending
+    calls may be running or queued; beyond that PasswordHashingBusyException is raised.
+    """
+    global _hash_pending
+    if _hash_pending >= settings.password_hash_max_pending:
+        PASSWORD_HASH_REJECTED.inc()
+        raise PasswordHashingBusyException()
+    _hash_pending += 1
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+        PASSWORD_HASH_SECONDS.observe(time.perf_counter() - started, operation=operation)
+
 
+async def hash_password(password: str) -> str:
+    """Hash a password off the event loop."""
+    return await _run_hashing("hash", pwd_context.hash, password)
 
-def get_password_hash(password: str) -> str:
-    """Hash a password."""
-    return pwd_context.hash(password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verify a password off the event loop. Returns (valid, new_hash); new_hash is
+    set when the stored hash uses outdated parameters and should be replaced.
+    """
+    if not hashed_password:
+        return False, None  # OAuth-пользователи без пароля
+    return await _run_hashing("verify", pwd_context.verify_and_update, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
-    """Create a JWT access token without expiration."""
+    """Create a JWT access token that expires after access_token_expire_minutes (or expires_delta)."""
+    now = datetime.now(timezone.utc)
     to_encode = data.copy()
+    to_encode.update({
+        "iat": int(now.timestamp()),
+        "exp": now + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes)),
+        "jti": uuid.uuid4().hex,
+    })
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> str:
+def create_user_access_token(user) -> str:
     """
-    Decode JWT token and return email.
-    Raises InvalidTokenException.
+    Access token carrying everything the User principal needs (id, email, name,
+    timestamps), so get_current_user does not query the database.
+    """
+    return create_access_token(data={
+        "sub": user.email,
+        "uid": user.id,
+        "name": user.name,
+        "created_at": int(user.created_at.timestamp()) if user.created_at else None,
+        "updated_at": int(user.updated_at.timestamp()) if user.updated_at else None,
+    })
+
+
+def decode_access_claims(token: str) -> dict:
+    """
+    Decode a JWT access token and return its claims.
+    Tokens issued before claims-rich tokens carry only "sub", never expire and
+    cannot be revoked, so they are rejected here; until legacy_token_exchange_until
+    POST /auth/refresh trades them for a token pair (decode_legacy_token).
+    Raises InvalidTokenException or TokenExpiredException.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except ExpiredSignatureError:
+        raise TokenExpiredException()
+    except JWTError:
+        raise InvalidTokenException()
+    if any(payload.get(claim) is None for claim in ("sub", "uid", "exp", "iat")):
+        raise InvalidTokenException()
+    return payload
+
+
+def decode_legacy_token(token: str) -> str:
+    """
+    Decode an access token issued before claims-rich tokens (only "sub", no expiry)
+    and return its email. Raises InvalidTokenException for any other token.
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
-        email: str = payload.get("sub")
-        if email is None:
-            raise InvalidTokenException()
-        return email
     except JWTError:
         raise InvalidTokenException()
+    if payload.get("sub") is None or "uid" in payload or "iat" in payload:
+        raise InvalidTokenException()
+    return payload["sub"]
+
+
+def decode_access_token(token: str) -> str:
+    """
+    Decode JWT token and return email.
+    Raises InvalidTokenException or TokenExpiredException.
+    """
+    return decode_access_claims(token)["sub"]
 
 
 def validate_token(token: str) -> bool:
@@ -0,0 +1,149 @@
+"""
+Maintenance commands for the backend.
+
+Usage:
+    python -m src.cli partitions ensure [--months-ahead N]
+    python -m src.cli partitions detach --older-than-months N [--drop]
+    python -m src.cli import-answers --survey-id ID [--format ndjson|csv] FILE
+    python -m src.cli reconcile-answers-count [--survey-id ID]
+    python -m src.cli purge-deleted-surveys
+    python -m src.cli archive-answers [--older-than-days N] [--survey-id ID]
+    python -m src.cli publish-surveys
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# CLI-команды — фоновые задачи: по умолчанию используем профиль пула "worker"
+os.environ.setdefault("DB_ENGINE_PROFILE", "worker")
+
+from src.config import settings
+from src.database import AsyncSessionLocal, async_engine
+from src.tasks.archive import archive_cold_answers, archive_survey_answers
+from src.tasks.bulk_import import (DEFAULT_BATCH_SIZE, IMPORT_FORMATS,
+                                   BulkAnswerImporter, ImportNotAllowedError, iter_file_lines)
+from src.tasks.crud import SurveyDAO
+from src.tasks.partitions import detach_answer_partitions, ensure_answer_partitions
+from src.tasks.publish import republish_all
+from src.tasks.purge import survey_purger
+from src.tasks.schema import Survey
+
+logger = logging.getLogger(__name__)
+
+
+async def _partitions(args: argparse.Namespace) -> None:
+    async with async_engine.begin() as conn:
+        if args.action == "ensure":
+            created = await ensure_answer_partitions(conn, months_ahead=args.months_ahead)
+            print(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+        else:
+            detached = await detach_answer_partitions(
+                conn, older_than_months=args.older_than_months, drop=args.drop
+            )
+            print(f"Detached {len(detached)} partition(s): {', '.join(detached) or '-'}")
+
+
+async def _import_answers(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        survey = await db.get(Survey, args.survey_id)
+        if survey is None:
+            raise SystemExit(f"Survey {args.survey_id} not found")
+        fmt = args.format or ("csv" if args.file.endswith(".csv") else "ndjson")
+        try:
+            importer = BulkAnswerImporter(survey, db, batch_size=args.batch_size)
+        except ImportNotAllowedError as e:
+            raise SystemExit(f"Survey {args.survey_id}: {e}")
+        if args.file == "-":
+            result = await importer.run(iter_file_lines(sys.stdin), fmt)
+        else:
+            with open(args.file, encoding="utf-8", newline="") as f:
+                result = await importer.run(iter_file_lines(f), fmt)
+    print(f"Imported {result.imported} answer(s), rejected {result.rejected}")
+    for error in result.errors:
+        print(f"  {error}")
+
+
+async def _reconcile_answers_count(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        corrected = await SurveyDAO.reconcile_answers_count(db, survey_id=args.survey_id)
+    print(f"Corrected answers_count of {corrected} survey(s)")
+
+
+async def _purge_deleted_surveys(args: argparse.Namespace) -> None:
+    await survey_purger.run_until_idle()
+    print("No soft-deleted surveys left to purge")
+
+
+async def _archive_answers(args: argparse.Namespace) -> None:
+    if args.survey_id is not None:
+        archived = {args.survey_id: await archive_survey_answers(args.survey_id)}
+    else:
+        archived = await archive_cold_answers(older_than_days=args.older_than_days)
+    print(f"Archived {sum(archived.values())} answer(s) of {len(archived)} survey(s)")
+
+
+async def _publish_surveys(args: argparse.Namespace) -> None:
+    if not settings.public_survey_snapshot_dir:
+        raise SystemExit("PUBLIC_SURVEY_SNAPSHOT_DIR is not set")
+    async with AsyncSessionLocal() as db:
+        published, removed = await republish_all(db)
+    print(f"Published {published} survey(s), removed {removed} stale snapshot(s)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    partitions = commands.add_parser("partitions", help="Manage survey_answers partitions")
+    partition_actions = partitions.add_subparsers(dest="action", required=True)
+    ensure = partition_actions.add_parser("ensure", help="Create upcoming monthly partitions")
+    ensure.add_argument("--months-ahead", type=int, default=None)
+    detach = partition_actions.add_parser("detach", help="Detach (archive) old partitions")
+    detach.add_argument("--older-than-months", type=int, required=True)
+    detach.add_argument("--drop", action="store_true", help="Drop instead of moving to the archive schema")
+    partitions.set_defaults(handler=_partitions)
+
+    import_answers = commands.add_parser("import-answers", help="Bulk import answers from NDJSON/CSV")
+    import_answers.add_argument("--survey-id", type=int, required=True)
+    import_answers.add_argument("--format", choices=IMPORT_FORMATS, default=None)
+    import_answers.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    import_answers.add_argument("file", help="Path to the file, or - for stdin")
+    import_answers.set_defaults(handler=_import_answers)
+
+    reconcile = commands.add_parser("reconcile-answers-count", help="Recompute surveys.answers_count")
+    reconcile.add_argument("--survey-id", type=int, default=None)
+    reconcile.set_defaults(handler=_reconcile_answers_count)
+
+    purge = commands.add_parser("purge-deleted-surveys", help="Purge soft-deleted surveys until none are left")
+    purge.set_defaults(handler=_purge_deleted_surveys)
+
+    archive = commands.add_parser(
+        "archive-answers", help="Move answers of long-archived surveys to Parquet cold storage"
+    )
+    archive.add_argument("--older-than-days", type=int, default=None)
+    archive.add_argument("--survey-id", type=int, default=None, help="Archive one survey regardless of age")
+    archive.set_defaults(handler=_archive_answers)
+
+    publish = commands.add_parser("publish-surveys", help="Rebuild static snapshots of active public surveys")
+    publish.set_defaults(handler=_publish_surveys)
+
+    return parser
+
+
+async def _run(args: argparse.Namespace) -> None:
+    try:
+        await args.handler(args)
+    finally:
+        await async_engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args(argv)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
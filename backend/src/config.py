@@ -1,3 +1,5 @@
+from datetime import date
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -14,7 +16,74 @@ class Settings(BaseSettings):
     frontend_url: str = Field(alias="FRONTEND_URL")
     environment: str = "development"  # По умолчанию development
     simple_api_key: str = "change-me-in-production" # Simple key for convenience endpoints
-    access_token_expire_minutes: int = 43200  # Token expiration in minutes (30 days)
+    access_token_expire_minutes: int = 15  # Access token lifetime; clients renew it with POST /auth/refresh
+    refresh_token_expire_days: int = 30  # Refresh token lifetime (each refresh issues a new one)
+    legacy_token_exchange_until: date | None = date(2026, 12, 31)  # Until this day POST /auth/refresh trades old non-expiring access tokens for a token pair; None disables
+    password_bcrypt_rounds: int = 12  # bcrypt cost; hashes with another cost are rehashed on login
+    password_hash_workers: int = 4  # Threads hashing/verifying passwords per worker process
+    password_hash_max_pending: int = 64  # Hash/verify calls running or queued before logins get 503
+    db_engine_profile: str = "web"  # web | worker | migration, see ENGINE_PROFILES in src/database.py
+    db_pool_size: int | None = None  # Overrides of the profile's pool settings
+    db_max_overflow: int | None = None
+    db_pool_timeout: float | None = None
+    db_pool_recycle: int | None = None
+    db_pool_pre_ping: bool | None = None
+    db_pgbouncer_mode: bool = False  # Disable asyncpg prepared-statement caching (PgBouncer transaction pooling)
+    db_statement_cache_size: int = 100  # asyncpg prepared-statement cache size when not behind PgBouncer
+    read_database_url: str | None = None  # Async URL of a read replica; reads go to the primary when unset
+    read_db_pool_size: int | None = None
+    read_db_max_overflow: int | None = None
+    replica_max_lag_seconds: float = 5.0  # Fall back to the primary when the replica lags more than this
+    replica_lag_check_seconds: float = 2.0  # How often to re-check replica lag
+    read_your_writes_seconds: float = 10.0  # Keep a user's reads on the primary this long after their own commit
+    read_your_writes_backend: str = "memory"  # memory (per worker) | redis
+    read_your_writes_max_entries: int = 100000  # Memory backend bound
+    answer_partition_months_ahead: int = 3  # How many monthly survey_answers partitions to keep ready
+    answer_write_mode: str = "direct"  # direct: commit per submission; buffered: write-behind group commit; queued: 202 + durable local queue
+    answer_buffer_max_rows: int = 500  # Flush when this many rows are queued
+    answer_buffer_flush_ms: int = 50  # ...or when the oldest queued row is this old
+    answer_buffer_queue_size: int = 10000  # Queue capacity; when full, submissions are written directly
+    answer_buffer_durability: str = "commit"  # commit: respond after the batch commits; accepted: respond once queued
+    answer_buffer_spill_path: str = "answer_buffer_spill.ndjson"  # Accepted rows whose flush failed; written again on start
+    answer_queue_path: str = "answer_queue.sqlite3"  # SQLite (WAL) file of the queued ingestion mode
+    answer_queue_batch_size: int = 500  # Queued answers written per Postgres transaction
+    answer_queue_poll_seconds: float = 1.0
+    answer_queue_max_attempts: int = 5  # Then the answer is marked failed
+    answer_duplicate_check: bool = False  # Reject repeat submissions from the same respondent_id/IP (best-effort)
+    answer_dedup_max_surveys: int = 200  # Bloom filters kept in memory (one per active survey)
+    answer_dedup_bloom_capacity: int = 50000  # Expected respondents per survey
+    answer_dedup_bloom_error_rate: float = 0.01
+    survey_purge_enabled: bool = True  # Run the background purger of soft-deleted surveys in this process
+    survey_purge_batch_size: int = 1000  # Answers deleted per transaction
+    survey_purge_batch_delay_ms: int = 200  # Pause between batches (throttling)
+    survey_purge_poll_seconds: float = 30.0  # How often to look for new soft-deleted surveys
+    survey_purge_max_backoff_seconds: float = 3600.0  # A survey whose purge fails is retried with backoff up to this
+    answer_archive_after_days: int = 90  # Move answers of surveys archived this long ago to cold storage
+    answer_archive_dir: str = "answer_archive"  # Local directory for Parquet parts (and the Azure download cache)
+    azure_storage_connection_string: str | None = None  # Store archive parts in Azure Blob Storage when set
+    answer_archive_container: str = "answer-archive"
+    public_survey_cache_size: int = 1024  # Public survey definitions cached per worker
+    public_survey_cache_ttl_seconds: float = 30.0  # Upper bound on staleness across workers
+    redis_url: str | None = None  # Shared state for multi-worker setups (rate limits, sessions)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # memory (per worker) | redis
+    rate_limit_max_keys: int = 100000  # Counters kept by the memory backend (LRU)
+    rate_limits: dict[str, str] = {}  # Per-rule overrides, e.g. {"answer_ip": "30/60"}; see src/ratelimit.py
+    followup_limit: int = 2  # Follow-up questions (LLM generations) per respondent and survey
+    respondent_session_backend: str = "memory"  # memory (per worker) | redis
+    respondent_session_ttl_seconds: float = 86400
+    respondent_session_max_entries: int = 100000  # Memory backend bound (LRU)
+    public_survey_snapshot_dir: str | None = None  # Directory of static survey snapshots served by the proxy
+    leaderboard_rebuild_seconds: float | None = None  # Optional safety reload of the in-memory leaderboard (e.g. 3600); off by default
+    leaderboard_ws_queue_size: int = 16  # Outbound messages queued per websocket client
+    leaderboard_ws_slow_consumer_policy: str = "drop_oldest"  # drop_oldest | disconnect, when a client's queue is full
+    leaderboard_ws_send_timeout_seconds: float = 10.0  # Close clients whose single send takes longer
+    leaderboard_broadcast_debounce_ms: int = 100  # Broadcast once answers have been quiet this long...
+    leaderboard_broadcast_min_interval_ms: int = 500  # ...and at most this often per worker...
+    leaderboard_broadcast_max_delay_ms: int = 2000  # ...but never later than this after the first change
+    pubsub_backend: str = "memory"  # memory (single worker) | postgres (LISTEN/NOTIFY across workers)
+    pubsub_database_url: str | None = None  # Direct Postgres URL for LISTEN when the main URL goes through PgBouncer
+    leaderboard_ws_heartbeat_seconds: float = 30.0  # Ping interval for clients connected with ?heartbeat=true; 0 disables
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
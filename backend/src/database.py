@@ -1,18 +1,107 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from starlette.requests import HTTPConnection
+import asyncio
 import logging
 import os
+import time
+import uuid
 
+from src.auth.exceptions import InvalidTokenException, TokenExpiredException
+from src.auth.utils import decode_access_claims
 from src.config import settings
+from src.metrics import Counter, Gauge, Histogram
+from src.redis import get_redis
 
 logger = logging.getLogger(__name__)
 
-# Create async engine without pool settings for now
-async_engine = create_async_engine(
+# Named engine profiles. The process picks one with DB_ENGINE_PROFILE;
+# individual values can be overridden with DB_POOL_SIZE, DB_MAX_OVERFLOW, etc.
+ENGINE_PROFILES = {
+    # uvicorn/gunicorn web worker: many concurrent requests
+    "web": {"pool_size": 10, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": True},
+    # CLI and background jobs: few long-running connections
+    "worker": {"pool_size": 2, "max_overflow": 2, "pool_timeout": 60, "pool_recycle": 1800, "pool_pre_ping": True},
+    # Alembic and one-off scripts: no pooling at all
+    "migration": {"poolclass": NullPool},
+}
+
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections currently checked out of the pool", ["engine"])
+POOL_CAPACITY = Gauge("db_pool_capacity", "Maximum connections the pool can hand out (size + overflow)", ["engine"])
+POOL_SATURATION = Gauge("db_pool_saturation", "Checked out connections / pool capacity", ["engine"])
+POOL_CHECKOUT_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ["engine"])
+POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection", ["engine"])
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait time and timeouts."""
+
+    metrics_name = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc(engine=self.metrics_name)
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, engine=self.metrics_name)
+
+
+def _profile_options(profile: str, **overrides) -> dict:
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown database engine profile: {profile}")
+    options = dict(ENGINE_PROFILES[profile])
+    if options.get("poolclass") is not NullPool:
+        for key, value in overrides.items():
+            if value is not None:
+                options[key] = value
+    return options
+
+
+def _asyncpg_connect_args() -> dict:
+    if settings.db_pgbouncer_mode:
+        # PgBouncer в режиме transaction не гарантирует, что prepared statement
+        # окажется на том же серверном соединении: отключаем кэши и даём уникальные имена
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {"statement_cache_size": settings.db_statement_cache_size}
+
+
+def create_profiled_async_engine(url: str, name: str, profile: str | None = None, **overrides):
+    """Create an async engine using a named profile, with pool metrics labelled `name`."""
+    options = _profile_options(profile or settings.db_engine_profile, **overrides)
+    if "poolclass" not in options:
+        options["poolclass"] = type(
+            f"InstrumentedAsyncPool_{name}", (InstrumentedAsyncPool,), {"metrics_name": name}
+        )
+    engine = create_async_engine(url, echo=False, connect_args=_asyncpg_connect_args(), **options)
+
+    pool = engine.sync_engine.pool
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        POOL_CAPACITY.set(capacity, engine=name)
+        POOL_CHECKED_OUT.set_function(pool.checkedout, engine=name)
+        POOL_SATURATION.set_function(lambda: pool.checkedout() / capacity if capacity else 0, engine=name)
+    return engine
+
+
+# Primary (read-write) engine
+async_engine = create_profiled_async_engine(
     settings.async_database_url,
-    echo=False
+    name="primary",
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
 )
 
 # Create async session factory
@@ -22,22 +111,183 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
-# Create sync engine for migrations and utilities
-sync_engine = create_engine(
-    settings.sync_database_url,
-    echo=False
-)
+# Optional read replica for read-mostly endpoints (see get_read_db)
+read_async_engine = create_profiled_async_engine(
+    settings.read_database_url,
+    name="replica",
+    pool_size=settings.read_db_pool_size,
+    max_overflow=settings.read_db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+) if settings.read_database_url else None
+
+ReadSessionLocal = sessionmaker(
+    read_async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+) if read_async_engine is not None else None
+
+# Sync engine for migrations and utilities is created on first use,
+# so web workers don't open a second pool they never need
+_sync_engine = None
+
+def get_sync_engine():
+    global _sync_engine
+    if _sync_engine is None:
+        _sync_engine = create_engine(
+            settings.sync_database_url,
+            echo=False,
+            **_profile_options("migration")
+        )
+    return _sync_engine
 
 SyncSessionLocal = sessionmaker(
-    bind=sync_engine,
     autocommit=False,
     autoflush=False
 )
 
 Base = declarative_base()
 
-async def get_async_db():
+REPLICA_LAG = Gauge("db_replica_lag_seconds", "Last measured replication lag of the read replica")
+
+
+class ReplicaLagMonitor:
+    """Periodically measures replica lag; the result is cached between checks."""
+
+    def __init__(self, max_lag: float, check_interval: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._healthy = False
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _measure(self) -> float:
+        async with read_async_engine.connect() as conn:
+            result = await conn.execute(text(
+                """
+                SELECT CASE
+                    WHEN NOT pg_is_in_recovery() THEN 0
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                END
+                """
+            ))
+            lag = result.scalar()
+        return float(lag or 0)
+
+    async def is_healthy(self) -> bool:
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self._healthy
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return self._healthy
+            try:
+                lag = await self._measure()
+                REPLICA_LAG.set(lag)
+                self._healthy = lag <= self.max_lag
+                if not self._healthy:
+                    logger.warning(f"Read replica lags {lag:.1f}s, routing reads to the primary")
+            except Exception as e:
+                logger.error(f"Read replica check failed: {str(e)}")
+                self._healthy = False
+            self._checked_at = time.monotonic()
+        return self._healthy
+
+
+replica_monitor = ReplicaLagMonitor(
+    max_lag=settings.replica_max_lag_seconds,
+    check_interval=settings.replica_lag_check_seconds,
+)
+
+
+class MemoryPrimaryStickiness:
+    """Read-your-writes marks per worker process: user id -> read from the primary until."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._until: dict[int, float] = {}
+
+    async def mark(self, user_id: int) -> None:
+        now = time.monotonic()
+        if len(self._until) >= self.max_entries:
+            self._until = {uid: until for uid, until in self._until.items() if until > now}
+        self._until[user_id] = now + self.ttl_seconds
+
+    async def is_sticky(self, user_id: int) -> bool:
+        return self._until.get(user_id, 0) > time.monotonic()
+
+
+class RedisPrimaryStickiness:
+    """Read-your-writes marks shared by all workers, expiring with the key."""
+
+    def __init__(self, redis, ttl_seconds: float):
+        self.redis = redis
+        self.ttl_ms = int(ttl_seconds * 1000)
+
+    async def mark(self, user_id: int) -> None:
+        await self.redis.set(f"ryw:{user_id}", 1, px=self.ttl_ms)
+
+    async def is_sticky(self, user_id: int) -> bool:
+        return bool(await self.redis.exists(f"ryw:{user_id}"))
+
+
+_stickiness = None
+
+
+def _primary_stickiness():
+    global _stickiness
+    if _stickiness is None:
+        if settings.read_your_writes_backend == "redis":
+            redis = get_redis()
+            if redis is None:
+                raise RuntimeError("READ_YOUR_WRITES_BACKEND=redis requires REDIS_URL")
+            _stickiness = RedisPrimaryStickiness(redis, settings.read_your_writes_seconds)
+        else:
+            _stickiness = MemoryPrimaryStickiness(settings.read_your_writes_seconds, settings.read_your_writes_max_entries)
+    return _stickiness
+
+
+def _authenticated_user_id(connection: HTTPConnection) -> int | None:
+    """User id from the Bearer access token; None for anonymous requests (public surveys)."""
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_claims(token)["uid"]
+    except (InvalidTokenException, TokenExpiredException):
+        return None
+
+
+async def get_async_db(connection: HTTPConnection):
     async with AsyncSessionLocal() as session:
+        committed = []
+        if read_async_engine is not None:
+            # После собственного коммита пользователь какое-то время читает с primary (read-your-writes)
+            event.listen(session.sync_session, "after_commit", lambda _: committed.append(True))
+        try:
+            yield session
+        except SQLAlchemyError as e:
+            logger.error(f"Database error occurred: {str(e)}")
+            await session.rollback()
+            raise
+        if committed:
+            user_id = _authenticated_user_id(connection)
+            if user_id is not None:
+                await _primary_stickiness().mark(user_id)
+
+async def get_read_db(connection: HTTPConnection):
+    """
+    Session for read-mostly endpoints. Uses the read replica when it is configured,
+    healthy and the authenticated user has not written recently; otherwise the primary.
+    """
+    use_replica = ReadSessionLocal is not None and await replica_monitor.is_healthy()
+    if use_replica:
+        user_id = _authenticated_user_id(connection)
+        use_replica = user_id is None or not await _primary_stickiness().is_sticky(user_id)
+    session_factory = ReadSessionLocal if use_replica else AsyncSessionLocal
+    async with session_factory() as session:
         try:
             yield session
         except SQLAlchemyError as e:
@@ -46,7 +296,7 @@ async def get_async_db():
             raise
 
 def get_sync_db():
-    db = SyncSessionLocal()
+    db = SyncSessionLocal(bind=get_sync_engine())
     try:
         yield db
     except SQLAlchemyError as e:
@@ -54,4 +304,4 @@ def get_sync_db():
         db.rollback()
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
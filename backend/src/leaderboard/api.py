@@ -1,114 +1,114 @@
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import json
-from sqlalchemy import select, func, and_
-from src.tasks.schema import Survey, SurveyAnswer
 
-from src.database import get_async_db
+from src.database import AsyncSessionLocal, get_read_db
+from src.leaderboard.connections import manager
+from src.leaderboard.protocol import ENCODINGS, PROTOCOL_VERSIONS, encode_v1, leaderboard_publisher
+from src.leaderboard.ranking import LEADERBOARD_QUERY, LeaderboardEntry, leaderboard_ranking
 
 router = APIRouter()
 
-class LeaderboardEntry(BaseModel):
-    app_name: str
-    average_rating: float
-    helpful_percentage: float
-    rank: int
-
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
-
-manager = ConnectionManager()
+async def get_ranked_rows(db: AsyncSession) -> List[tuple[int, LeaderboardEntry]]:
+    """
+    Returns (survey_id, entry) pairs from the in-memory ranking, or from the
+    database if the ranking has not been loaded yet.
+    """
+    if leaderboard_ranking.loaded:
+        return leaderboard_ranking.items()
+    result = await db.execute(LEADERBOARD_QUERY)
+    return [
+        (row.survey_id, LeaderboardEntry(
+            rank=i + 1,
+            app_name=row.app_name or "",
+            average_rating=row.average_rating,
+            helpful_percentage=row.helpful_percentage,
+        ))
+        for i, row in enumerate(result)
+    ]
 
 async def get_leaderboard_data(db: AsyncSession) -> List[LeaderboardEntry]:
     """
-    Calculates and returns leaderboard data from the database.
+    Returns the current leaderboard entries.
     """
-    # Get all template surveys
-    stmt = select(Survey).where(Survey.is_template_survey == True)
-    result = await db.execute(stmt)
-    template_surveys = result.scalars().all()
-
-    leaderboard = []
-    for survey in template_surveys:
-        # Get all answers for the survey
-        answer_stmt = select(SurveyAnswer).where(SurveyAnswer.survey_id == survey.id)
-        answer_result = await db.execute(answer_stmt)
-        answers = answer_result.scalars().all()
-
-        total_rating = 0
-        rating_count = 0
-        helpful_count = 0
-        
-        for answer_record in answers:
-            try:
-                answer_data = json.loads(answer_record.answers)
-                
-                # Find the rating and helpful answers
-                for ans in answer_data:
-                    if ans.get("id") == "rating" and isinstance(ans.get("answer"), int):
-                        total_rating += ans["answer"]
-                        rating_count += 1
-                    if ans.get("id") == "helpful" and ans.get("answer") == "Yes":
-                        helpful_count += 1
-            except (json.JSONDecodeError, TypeError):
-                continue
-
-        average_rating = total_rating / rating_count if rating_count > 0 else 0
-        helpful_percentage = (helpful_count / len(answers)) * 100 if answers else 0
-
-        leaderboard.append({
-            "app_name": survey.app_name,
-            "average_rating": average_rating,
-            "helpful_percentage": helpful_percentage,
-        })
-    
-    # Rank the leaderboard
-    leaderboard.sort(key=lambda x: (x['average_rating'], x['helpful_percentage']), reverse=True)
-    
-    ranked_leaderboard = []
-    for i, entry in enumerate(leaderboard):
-        ranked_leaderboard.append(LeaderboardEntry(rank=i + 1, **entry))
-
-    return ranked_leaderboard
+    return [entry for _, entry in await get_ranked_rows(db)]
 
 @router.get("/leaderboard", response_model=List[LeaderboardEntry])
-async def get_leaderboard(db: AsyncSession = Depends(get_async_db)):
+async def get_leaderboard(
+    limit: int | None = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    Returns the current leaderboard rankings.
+    Returns the current leaderboard rankings, optionally a page of them.
     """
+    if leaderboard_ranking.loaded:
+        return leaderboard_ranking.entries(offset, offset + limit if limit else None)
     leaderboard_data = await get_leaderboard_data(db)
-    return leaderboard_data
+    return leaderboard_data[offset:offset + limit if limit else None]
+
+@router.get("/apps/{survey_id}/rank", response_model=LeaderboardEntry)
+async def get_app_rank(survey_id: int):
+    """
+    Returns the leaderboard entry (with its rank) of one app.
+    """
+    entry = leaderboard_ranking.entry_for(survey_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="App not found on the leaderboard")
+    return entry
 
 @router.websocket("/ws/leaderboard")
-async def websocket_endpoint(websocket: WebSocket, db: AsyncSession = Depends(get_async_db)):
-    await manager.connect(websocket)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    protocol: int = 1,
+    encoding: str = "json",
+    heartbeat: bool | None = None,
+):
+    """
+    Live leaderboard. protocol=1 (default): the full list on every change;
+    protocol=2: snapshot + sequence-numbered deltas, see src/leaderboard/protocol.py.
+    """
+    if protocol not in PROTOCOL_VERSIONS or encoding not in ENCODINGS or (protocol == 1 and encoding != "json"):
+        await websocket.close(code=1008)
+        return
+
+    # Сессия БД не держится открытой всё время соединения
+    async with AsyncSessionLocal() as db:
+        rows = await get_ranked_rows(db)
+    if protocol >= 2:
+        # Snapshot должен совпадать с состоянием, от которого считаются следующие delta
+        leaderboard_publisher.publish(rows)
+    client = await manager.connect(
+        websocket, fmt=(protocol, encoding), heartbeat=heartbeat if heartbeat is not None else protocol >= 2
+    )
     try:
         # Send initial leaderboard data
-        leaderboard_data = await get_leaderboard_data(db)
-        await websocket.send_text(json.dumps([d.dict() for d in leaderboard_data]))
-        
+        if protocol >= 2:
+            client.send(leaderboard_publisher.snapshot(encoding))
+        else:
+            client.send(encode_v1(rows))
+
         while True:
-            # This is just to keep the connection open.
-            # In a real app, you wouldn't need this loop if you only broadcast updates.
-            await websocket.receive_text() 
+            # Любое сообщение клиента — ответ на ping
+            message = await websocket.receive_text()
+            client.touch()
+            if protocol >= 2 and _is_resync(message):
+                client.send(leaderboard_publisher.snapshot(encoding))
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
+def _is_resync(message: str) -> bool:
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get("type") == "resync"
+
 # This function will be called from the survey submission endpoint to broadcast updates.
 async def broadcast_leaderboard_update(db: AsyncSession):
-    leaderboard_data = await get_leaderboard_data(db)
-    await manager.broadcast(json.dumps([d.dict() for d in leaderboard_data])) 
\ No newline at end of file
+    rows = await get_ranked_rows(db)
+    # Каждый формат сериализуется один раз; отправку по сокетам делают writer-задачи клиентов
+    leaderboard_publisher.publish(rows)
@@ -0,0 +1,208 @@
+"""
+Websocket fan-out for leaderboard viewers.
+
+`broadcast` never awaits a socket: it appends the message for the client's
+format (protocol version, encoding; see protocol.py) to every client's
+bounded outbound queue and returns. Each client has its own writer task that
+drains its queue, so a slow or dead client delays nobody but itself.
+
+Slow consumers (queue full, leaderboard_ws_queue_size):
+  - "drop_oldest": the oldest queued message is dropped. A v1 message is a
+    complete leaderboard, so the client only skips intermediate states; a v2
+    client sees a sequence gap and asks for a resync;
+  - "disconnect": the client is closed with 1013 (try again later).
+A send that takes longer than leaderboard_ws_send_timeout_seconds also
+closes the client.
+
+Heartbeat: every leaderboard_ws_heartbeat_seconds v2 clients (and v1
+clients that connected with ?heartbeat=true) get {"type": "ping"}. A client that has sent nothing
+(any message counts as a pong) for three intervals is closed. Legacy
+clients treat every message as a leaderboard, so they get no pings and rely
+on the server's protocol-level pings (uvicorn --ws-ping-interval).
+"""
+import asyncio
+import collections
+import json
+import time
+from collections import deque
+
+from starlette.websockets import WebSocket
+
+from src.config import settings
+from src.metrics import Counter, Gauge, Histogram
+
+WS_CONNECTIONS = Gauge("leaderboard_ws_connections", "Leaderboard websocket clients connected to this worker")
+WS_QUEUED = Gauge("leaderboard_ws_queued_messages", "Messages waiting in leaderboard websocket send queues")
+WS_SEND_LAG = Histogram("leaderboard_ws_send_lag_seconds", "Time from broadcast to the message being sent to a client")
+WS_DROPPED = Counter("leaderboard_ws_dropped_messages_total", "Messages dropped from full send queues")
+WS_DISCONNECTS = Counter(
+    "leaderboard_ws_disconnects_total", "Server-side websocket closes by reason", ["reason"]
+)
+
+PING_MESSAGE = json.dumps({"type": "ping"})
+MISSED_HEARTBEATS = 3
+
+
+class ClientConnection:
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, fmt: tuple[int, str], heartbeat: bool):
+        self.manager = manager
+        self.websocket = websocket
+        self.format = fmt
+        self.heartbeat = heartbeat
+        self.last_seen = time.monotonic()
+        self.closed = False
+        self._queue: deque[tuple[float, str | bytes]] = deque()
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._write())
+
+    def send(self, message: str | bytes) -> bool:
+        """Queue a message. Returns False if the client is (now) closed."""
+        if self.closed:
+            return False
+        if len(self._queue) >= self.manager.queue_size:
+            if self.manager.slow_consumer_policy == "disconnect":
+                self.manager.close(self, 1013, "slow_consumer")
+                return False
+            self._queue.popleft()
+            WS_DROPPED.inc()
+            WS_QUEUED.dec()
+        self._queue.append((time.monotonic(), message))
+        WS_QUEUED.inc()
+        self._ready.set()
+        return True
+
+    def touch(self) -> None:
+        self.last_seen = time.monotonic()
+
+    async def _write(self) -> None:
+        while True:
+            while not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+            queued_at, message = self._queue.popleft()
+            WS_QUEUED.dec()
+            try:
+                if isinstance(message, bytes):
+                    send = self.websocket.send_bytes(message)
+                else:
+                    send = self.websocket.send_text(message)
+                await asyncio.wait_for(send, timeout=self.manager.send_timeout)
+            except asyncio.TimeoutError:
+                self.manager.close(self, 1013, "send_timeout")
+                return
+            except Exception:
+                self.manager.close(self, None, "send_error")
+                return
+            WS_SEND_LAG.observe(time.monotonic() - queued_at)
+
+    def _stop(self) -> None:
+        self.closed = True
+        WS_QUEUED.dec(len(self._queue))
+        self._queue.clear()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+
+class ConnectionManager:
+    def __init__(
+        self,
+        queue_size: int,
+        slow_consumer_policy: str,
+        send_timeout: float,
+        heartbeat_seconds: float,
+    ):
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.heartbeat_seconds = heartbeat_seconds
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
+        self._formats: collections.Counter[tuple[int, str]] = collections.Counter()
+        self._heartbeat_task: asyncio.Task | None = None
+        WS_CONNECTIONS.set_function(lambda: len(self.active_connections))
+
+    async def connect(
+        self, websocket: WebSocket, fmt: tuple[int, str] = (1, "json"), heartbeat: bool = False
+    ) -> ClientConnection:
+        await websocket.accept()
+        client = ClientConnection(self, websocket, fmt, heartbeat)
+        self.active_connections[websocket] = client
+        self._formats[fmt] += 1
+        return client
+
+    def disconnect(self, websocket: WebSocket) -> None:
+        client = self.active_connections.pop(websocket, None)
+        if client is not None:
+            client._stop()
+            self._formats[client.format] -= 1
+            if not self._formats[client.format]:
+                del self._formats[client.format]
+
+    def formats(self) -> list[tuple[int, str]]:
+        """Formats (protocol version, encoding) of the connected clients."""
+        return list(self._formats)
+
+    def close(self, client: ClientConnection, code: int | None, reason: str) -> None:
+        """Drop a client from the server side; `code` also sends a close frame."""
+        if client.closed:
+            return
+        WS_DISCONNECTS.inc(reason=reason)
+        self.disconnect(client.websocket)
+        if code is not None:
+            asyncio.create_task(self._close_socket(client.websocket, code))
+
+    @staticmethod
+    async def _close_socket(websocket: WebSocket, code: int) -> None:
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass  # клиент уже отключился
+
+    def broadcast(self, messages: dict[tuple[int, str], str | bytes]) -> int:
+        """
+        Queue for every client the message of its format; clients of other
+        formats get nothing. Returns the number of clients a message was queued for.
+        """
+        sent = 0
+        for client in list(self.active_connections.values()):
+            message = messages.get(client.format)
+            if message is not None and client.send(message):
+                sent += 1
+        return sent
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            deadline = time.monotonic() - self.heartbeat_seconds * MISSED_HEARTBEATS
+            for client in list(self.active_connections.values()):
+                if not client.heartbeat:
+                    continue
+                if client.last_seen < deadline:
+                    self.close(client, 1001, "heartbeat_timeout")
+                else:
+                    client.send(PING_MESSAGE)
+
+    def start(self) -> None:
+        if self.heartbeat_seconds > 0 and (self._heartbeat_task is None or self._heartbeat_task.done()):
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        clients = list(self.active_connections.values())
+        for client in clients:
+            WS_DISCONNECTS.inc(reason="shutdown")
+            self.disconnect(client.websocket)
+        await asyncio.gather(*(self._close_socket(client.websocket, 1001) for client in clients))
+
+
+manager = ConnectionManager(
+    queue_size=settings.leaderboard_ws_queue_size,
+    slow_consumer_policy=settings.leaderboard_ws_slow_consumer_policy,
+    send_timeout=settings.leaderboard_ws_send_timeout_seconds,
+    heartbeat_seconds=settings.leaderboard_ws_heartbeat_seconds,
+)
@@ -0,0 +1,174 @@
+"""
+Leaderboard events shared by all workers (src/pubsub.py, channel "leaderboard").
+
+A worker that saves answers to template surveys applies them to its own
+in-memory ranking right away and publishes their contributions
+(survey_id, rating, helpful) — a few bytes per answer, never the leaderboard
+itself. Answers recorded in the same event-loop tick, or while the previous
+message is being sent, go out as one message.
+
+Every worker, the publisher included, receives each message once. The
+others apply the contributions to their ranking; then each worker marks
+its leaderboard dirty, and BroadcastScheduler turns a burst of such
+triggers into one broadcast to the worker's websocket clients. Template
+surveys being created or deleted publish "reload", and the other workers
+rebuild their ranking from the database. Messages lost while the pub/sub
+connection was down are corrected by a rebuild once it is back.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.leaderboard.api import broadcast_leaderboard_update
+from src.leaderboard.connections import manager
+from src.leaderboard.ranking import leaderboard_ranking
+from src.metrics import Counter, Histogram
+from src.pubsub import pubsub
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_TRIGGERS = Counter("leaderboard_broadcast_triggers_total", "Leaderboard changes that requested a broadcast")
+BROADCAST_MERGED = Counter(
+    "leaderboard_broadcast_merged_triggers_total", "Triggers merged into an already pending broadcast"
+)
+BROADCASTS = Counter("leaderboard_broadcasts_total", "Leaderboard recompute + broadcast runs")
+BROADCAST_STALENESS = Histogram(
+    "leaderboard_broadcast_staleness_seconds", "Time from the first pending trigger to the broadcast"
+)
+
+LEADERBOARD_CHANNEL = "leaderboard"
+WORKER_ID = uuid.uuid4().hex
+MAX_ITEMS_PER_MESSAGE = 200  # NOTIFY payload < 8000 bytes
+
+
+class BroadcastScheduler:
+    """
+    Runs `action` once for any number of mark_dirty() calls. A run starts
+    once triggers have been quiet for `debounce` seconds and at least
+    `min_interval` seconds after the previous run, but never later than
+    `max_delay` seconds after the first pending trigger. Triggers that
+    arrive during a run cause one more run.
+    """
+
+    def __init__(
+        self, action: Callable[[], Awaitable[None]], debounce: float, min_interval: float, max_delay: float
+    ):
+        self.action = action
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self.max_delay = max_delay
+        self._dirty_since: float | None = None
+        self._last_trigger = 0.0
+        self._last_run = 0.0
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def mark_dirty(self) -> None:
+        now = time.monotonic()
+        BROADCAST_TRIGGERS.inc()
+        if self._dirty_since is None:
+            self._dirty_since = now
+            self._wake.set()
+        else:
+            BROADCAST_MERGED.inc()
+        self._last_trigger = now
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _due(self) -> float:
+        ready = max(self._last_trigger + self.debounce, self._last_run + self.min_interval)
+        return min(ready, self._dirty_since + self.max_delay)
+
+    async def _run(self) -> None:
+        while True:
+            if self._dirty_since is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            delay = self._due() - time.monotonic()
+            if delay > 0:
+                # Новые триггеры могут только отодвинуть срок, поэтому после сна он пересчитывается
+                await asyncio.sleep(delay)
+                continue
+            dirty_since, self._dirty_since = self._dirty_since, None
+            self._last_run = time.monotonic()
+            BROADCAST_STALENESS.observe(self._last_run - dirty_since)
+            BROADCASTS.inc()
+            try:
+                await self.action()
+            except Exception as e:
+                logger.error(f"Leaderboard broadcast failed: {str(e)}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def _broadcast_local() -> None:
+    if manager.active_connections:
+        async with AsyncSessionLocal() as db:
+            await broadcast_leaderboard_update(db)
+
+
+class LeaderboardEvents:
+    def __init__(self, broadcasts: BroadcastScheduler):
+        self.broadcasts = broadcasts
+        self._pending: list[list] = []
+        self._sender: asyncio.Task | None = None
+
+    def answer_recorded(self, survey_id: int, answers: str | list[Any]) -> None:
+        """Count a committed answer here and, if its survey is ranked, in the other workers."""
+        contribution = leaderboard_ranking.record_answer(survey_id, answers)
+        if contribution is None:
+            return
+        self._pending.append([survey_id, *contribution])
+        if self._sender is None or self._sender.done():
+            self._sender = asyncio.create_task(self._send_pending())
+
+    async def _send_pending(self) -> None:
+        while self._pending:
+            items = self._pending[:MAX_ITEMS_PER_MESSAGE]
+            del self._pending[:MAX_ITEMS_PER_MESSAGE]
+            await pubsub.publish(
+                LEADERBOARD_CHANNEL, json.dumps({"op": "answers", "origin": WORKER_ID, "items": items})
+            )
+
+    async def apps_changed(self) -> None:
+        """Call after adding or removing an app in this worker's ranking."""
+        await pubsub.publish(LEADERBOARD_CHANNEL, json.dumps({"op": "reload", "origin": WORKER_ID}))
+
+    async def resync(self) -> None:
+        """Rebuild after a pub/sub reconnect: other workers' messages may have been missed."""
+        await leaderboard_ranking.rebuild()
+        self.broadcasts.mark_dirty()
+
+    async def handle(self, payload: str) -> None:
+        message = json.loads(payload)
+        if message["origin"] != WORKER_ID:
+            if message["op"] == "answers":
+                for survey_id, rating, helpful in message["items"]:
+                    leaderboard_ranking.apply(survey_id, rating, helpful)
+            elif message["op"] == "reload":
+                await leaderboard_ranking.rebuild()
+        self.broadcasts.mark_dirty()
+
+
+leaderboard_broadcasts = BroadcastScheduler(
+    _broadcast_local,
+    debounce=settings.leaderboard_broadcast_debounce_ms / 1000,
+    min_interval=settings.leaderboard_broadcast_min_interval_ms / 1000,
+    max_delay=settings.leaderboard_broadcast_max_delay_ms / 1000,
+)
+leaderboard_events = LeaderboardEvents(leaderboard_broadcasts)
+pubsub.subscribe(LEADERBOARD_CHANNEL, leaderboard_events.handle)
+pubsub.on_reconnect(leaderboard_events.resync)
@@ -0,0 +1,89 @@
+"""
+Leaderboard websocket protocol.
+
+v1 (default): every message is the full leaderboard, a JSON list of
+{"app_name", "average_rating", "helpful_percentage", "rank"}. This is what
+the current frontend expects.
+
+v2 (/ws/leaderboard?protocol=2[&encoding=msgpack]), server -> client:
+    {"type": "snapshot", "seq": 7, "entries": [{"id": 12, "app_name": ..., "average_rating": ...,
+                                                "helpful_percentage": ..., "rank": 1}, ...]}
+    {"type": "delta", "seq": 8, "changed": [<entries as above>], "removed": [<ids>]}
+    {"type": "ping"}
+`changed` lists only apps whose values or rank changed, so a delta costs
+O(changes) instead of O(apps). A client applies a delta only if its seq is
+the last seen seq + 1 and ignores deltas until the first snapshot. On a gap
+(e.g. a delta dropped from a full send queue) it sends {"type": "resync"}
+and gets a fresh snapshot. Client messages are JSON text with either
+encoding; any of them counts as a pong. Sequence numbers are per worker; a
+reconnect always starts with a snapshot.
+
+With encoding=msgpack, v2 messages are sent as binary msgpack frames.
+"""
+import json
+from typing import Any
+
+import orjson
+
+from src.leaderboard.connections import ConnectionManager, manager
+from src.leaderboard.ranking import LeaderboardEntry
+
+PROTOCOL_VERSIONS = (1, 2)
+ENCODINGS = ("json", "msgpack")
+V1 = (1, "json")
+
+
+def encode(payload: Any, encoding: str) -> str | bytes:
+    if encoding == "msgpack":
+        import msgpack
+
+        return msgpack.packb(payload)
+    return orjson.dumps(payload).decode()
+
+
+def encode_v1(rows: list[tuple[int, LeaderboardEntry]]) -> str:
+    return json.dumps([entry.dict() for _, entry in rows])
+
+
+class LeaderboardPublisher:
+    """Keeps the last published leaderboard of this worker and broadcasts changes to it."""
+
+    def __init__(self, manager: ConnectionManager):
+        self.manager = manager
+        self.seq = 0
+        self._state: dict[int, dict] = {}
+        self._snapshots: dict[str, str | bytes] = {}
+
+    def publish(self, rows: list[tuple[int, LeaderboardEntry]]) -> bool:
+        """
+        Make `rows` (ranked (survey_id, entry) pairs) the current leaderboard and
+        send every client the update in its format. Returns False if nothing changed.
+        """
+        entries = {survey_id: {"id": survey_id, **entry.dict()} for survey_id, entry in rows}
+        changed = [entry for survey_id, entry in entries.items() if self._state.get(survey_id) != entry]
+        removed = [survey_id for survey_id in self._state if survey_id not in entries]
+        if not changed and not removed:
+            return False
+
+        self.seq += 1
+        self._state = entries
+        self._snapshots = {}
+        delta = {"type": "delta", "seq": self.seq, "changed": changed, "removed": removed}
+        # Каждый формат кодируется один раз и только если есть клиенты с ним
+        messages = {}
+        for fmt in self.manager.formats():
+            messages[fmt] = encode_v1(rows) if fmt == V1 else encode(delta, fmt[1])
+        self.manager.broadcast(messages)
+        return True
+
+    def snapshot(self, encoding: str) -> str | bytes:
+        message = self._snapshots.get(encoding)
+        if message is None:
+            message = encode(
+                {"type": "snapshot", "seq": self.seq, "entries": list(self._state.values())}, encoding
+            )
+            self._snapshots[encoding] = message
+        return message
+
+
+leaderboard_publisher = LeaderboardPublisher(manager)
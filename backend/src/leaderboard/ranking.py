@@ -0,0 +1,283 @@
+"""
+In-memory ranked leaderboard.
+
+Per-app sums (rating sum/count, "Yes" count, answers) are loaded once from
+LEADERBOARD_QUERY. Every new answer to a template survey then updates its app
+in O(log n): the app's key (-average_rating, -helpful_percentage, survey_id)
+is removed from a SortedList and re-inserted. Rank lookup, top-K and range
+queries read the SortedList directly, with no re-sorting.
+
+The structure is per worker process. It sees the answers written by its own
+worker immediately and those of other workers through src/leaderboard/events.py.
+The full query runs only on start, when apps are added or removed, and after
+the pub/sub connection is restored. An optional safety rebuild
+(leaderboard_rebuild_seconds, off by default) bounds drift from lost messages.
+"""
+import asyncio
+import json
+import logging
+import re
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any
+
+from pydantic import BaseModel
+from sortedcontainers import SortedList
+from sqlalchemy import text
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+RANKED_APPS = Gauge("leaderboard_ranked_apps", "Apps in the in-memory leaderboard")
+RANKING_UPDATES = Counter("leaderboard_ranking_updates_total", "Answers applied to the in-memory leaderboard")
+
+# Весь лидерборд — один запрос. Ответ на вопрос берётся по позиции вопроса с id "rating"/"helpful"
+# в survey.questions; элемент ответа — строка (веб, бот) или объект {"id": ..., "answer": ...}.
+LEADERBOARD_QUERY = text("""
+WITH apps AS (
+    SELECT s.id,
+           s.app_name,
+           (SELECT q.ord - 1 FROM jsonb_array_elements(s.questions::jsonb) WITH ORDINALITY AS q(question, ord)
+             WHERE q.question->>'id' = 'rating' LIMIT 1)::int AS rating_idx,
+           (SELECT q.ord - 1 FROM jsonb_array_elements(s.questions::jsonb) WITH ORDINALITY AS q(question, ord)
+             WHERE q.question->>'id' = 'helpful' LIMIT 1)::int AS helpful_idx
+      FROM surveys s
+     WHERE s.is_template_survey AND s.deleted_at IS NULL
+),
+app_answers AS (
+    SELECT apps.id AS survey_id,
+           CASE jsonb_typeof(doc -> apps.rating_idx)
+                WHEN 'object' THEN doc -> apps.rating_idx ->> 'answer'
+                ELSE doc -> apps.rating_idx #>> '{}' END AS rating,
+           CASE jsonb_typeof(doc -> apps.helpful_idx)
+                WHEN 'object' THEN doc -> apps.helpful_idx ->> 'answer'
+                ELSE doc -> apps.helpful_idx #>> '{}' END AS helpful
+      FROM apps
+      JOIN survey_answers a ON a.survey_id = apps.id
+     CROSS JOIN LATERAL (SELECT a.answers::jsonb AS doc) d
+)
+SELECT apps.id AS survey_id,
+       apps.app_name,
+       apps.rating_idx,
+       apps.helpful_idx,
+       coalesce(sum(app_answers.rating::int) FILTER (WHERE app_answers.rating ~ '^[0-9]{1,2}$'), 0) AS rating_sum,
+       count(*) FILTER (WHERE app_answers.rating ~ '^[0-9]{1,2}$') AS rating_count,
+       count(*) FILTER (WHERE app_answers.helpful = 'Yes') AS helpful_count,
+       count(app_answers.survey_id) AS answers_count,
+       coalesce(avg(app_answers.rating::int) FILTER (WHERE app_answers.rating ~ '^[0-9]{1,2}$'), 0)::float AS average_rating,
+       coalesce(100.0 * count(*) FILTER (WHERE app_answers.helpful = 'Yes')
+                / nullif(count(app_answers.survey_id), 0), 0)::float AS helpful_percentage
+  FROM apps
+  LEFT JOIN app_answers ON app_answers.survey_id = apps.id
+ GROUP BY apps.id, apps.app_name, apps.rating_idx, apps.helpful_idx
+ ORDER BY average_rating DESC, helpful_percentage DESC, apps.id
+""")
+
+
+# Оценка — одна-две цифры, как в LEADERBOARD_QUERY: длинная строка цифр не должна ломать ::int
+_RATING = re.compile(r"[0-9]{1,2}")
+
+
+class LeaderboardEntry(BaseModel):
+    app_name: str
+    average_rating: float
+    helpful_percentage: float
+    rank: int
+
+
+def question_index(questions: list[Any], question_id: str) -> int | None:
+    for i, question in enumerate(questions):
+        if isinstance(question, dict) and question.get("id") == question_id:
+            return i
+    return None
+
+
+def _answer_value(answers: list[Any], index: int | None) -> str | None:
+    # То же правило, что в LEADERBOARD_QUERY
+    if index is None or index >= len(answers):
+        return None
+    value = answers[index]
+    if isinstance(value, dict):
+        value = value.get("answer")
+    return None if value is None else str(value)
+
+
+@dataclass
+class AppStats:
+    survey_id: int
+    app_name: str
+    rating_idx: int | None
+    helpful_idx: int | None
+    rating_sum: int = 0
+    rating_count: int = 0
+    helpful_count: int = 0
+    answers_count: int = 0
+
+    @property
+    def average_rating(self) -> float:
+        return self.rating_sum / self.rating_count if self.rating_count else 0.0
+
+    @property
+    def helpful_percentage(self) -> float:
+        return self.helpful_count * 100 / self.answers_count if self.answers_count else 0.0
+
+    def sort_key(self) -> tuple:
+        return (-self.average_rating, -self.helpful_percentage, self.survey_id)
+
+
+class RankedLeaderboard:
+    def __init__(self):
+        self._apps: dict[int, AppStats] = {}
+        self._order = SortedList()
+        self.loaded = False
+        self._task: asyncio.Task | None = None
+        RANKED_APPS.set_function(lambda: len(self._apps))
+
+    def _insert(self, app: AppStats) -> None:
+        self._apps[app.survey_id] = app
+        self._order.add(app.sort_key())
+
+    def _entry(self, key: tuple, rank: int) -> LeaderboardEntry:
+        app = self._apps[key[2]]
+        return LeaderboardEntry(
+            rank=rank,
+            app_name=app.app_name or "",
+            average_rating=app.average_rating,
+            helpful_percentage=app.helpful_percentage,
+        )
+
+    def load(self, rows) -> None:
+        """Replace the contents with rows of LEADERBOARD_QUERY."""
+        self._apps = {}
+        self._order = SortedList()
+        for row in rows:
+            self._insert(AppStats(
+                survey_id=row.survey_id,
+                app_name=row.app_name,
+                rating_idx=row.rating_idx,
+                helpful_idx=row.helpful_idx,
+                rating_sum=row.rating_sum,
+                rating_count=row.rating_count,
+                helpful_count=row.helpful_count,
+                answers_count=row.answers_count,
+            ))
+        self.loaded = True
+
+    async def rebuild(self) -> None:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(LEADERBOARD_QUERY)
+            self.load(result)
+
+    def add_app(self, survey_id: int, app_name: str, questions: list[Any]) -> None:
+        if survey_id in self._apps:
+            return
+        self._insert(AppStats(
+            survey_id=survey_id,
+            app_name=app_name,
+            rating_idx=question_index(questions, "rating"),
+            helpful_idx=question_index(questions, "helpful"),
+        ))
+
+    def remove_app(self, survey_id: int) -> None:
+        app = self._apps.pop(survey_id, None)
+        if app is not None:
+            self._order.remove(app.sort_key())
+
+    def contribution(self, survey_id: int, answers: str | list[Any]) -> tuple[int | None, bool] | None:
+        """(rating, helpful) of an answer to a ranked survey; None for other surveys."""
+        app = self._apps.get(survey_id)
+        if app is None:
+            return None
+        if isinstance(answers, str):
+            answers = json.loads(answers)
+        rating = _answer_value(answers, app.rating_idx)
+        return (
+            int(rating) if rating is not None and _RATING.fullmatch(rating) else None,
+            _answer_value(answers, app.helpful_idx) == "Yes",
+        )
+
+    def apply(self, survey_id: int, rating: int | None, helpful: bool) -> bool:
+        """Count one answer of a survey. Returns False for surveys that are not on the leaderboard."""
+        app = self._apps.get(survey_id)
+        if app is None:
+            return False
+        self._order.remove(app.sort_key())
+        if rating is not None:
+            app.rating_sum += rating
+            app.rating_count += 1
+        if helpful:
+            app.helpful_count += 1
+        app.answers_count += 1
+        self._order.add(app.sort_key())
+        RANKING_UPDATES.inc()
+        return True
+
+    def record_answer(self, survey_id: int, answers: str | list[Any]) -> tuple[int | None, bool] | None:
+        """Apply a new answer of a survey and return its contribution (None if the survey is not ranked)."""
+        contribution = self.contribution(survey_id, answers)
+        if contribution is not None:
+            self.apply(survey_id, *contribution)
+        return contribution
+
+    def is_ranked(self, survey_id: int) -> bool:
+        return survey_id in self._apps
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def rank(self, survey_id: int) -> int | None:
+        app = self._apps.get(survey_id)
+        if app is None:
+            return None
+        return self._order.index(app.sort_key()) + 1
+
+    def items(self, start: int = 0, stop: int | None = None) -> list[tuple[int, LeaderboardEntry]]:
+        """(survey_id, entry) pairs with ranks start+1 .. stop (0-based slice of the ranking)."""
+        keys = islice(self._order, start, stop)
+        return [(key[2], self._entry(key, start + i + 1)) for i, key in enumerate(keys)]
+
+    def entries(self, start: int = 0, stop: int | None = None) -> list[LeaderboardEntry]:
+        return [entry for _, entry in self.items(start, stop)]
+
+    def top(self, k: int) -> list[LeaderboardEntry]:
+        return self.entries(0, k)
+
+    def entry_for(self, survey_id: int) -> LeaderboardEntry | None:
+        rank = self.rank(survey_id)
+        if rank is None:
+            return None
+        return self._entry(self._order[rank - 1], rank)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.leaderboard_rebuild_seconds)
+            try:
+                await self.rebuild()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Leaderboard rebuild failed: {str(e)}")
+
+    async def start(self) -> None:
+        """Cold-start load plus, if configured, the periodic safety rebuild."""
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Initial leaderboard load failed: {str(e)}")
+        if settings.leaderboard_rebuild_seconds and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+leaderboard_ranking = RankedLeaderboard()
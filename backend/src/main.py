@@ -1,4 +1,5 @@
 from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,7 +7,14 @@ from starlette.middleware.sessions import SessionMiddleware
 import os
 import logging
 from src.config import settings
-from src.database import get_async_db, AsyncSessionLocal
+from src.database import get_async_db, AsyncSessionLocal, async_engine
+from src.tasks.partitions import ensure_answer_partitions
+from src.tasks.answer_buffer import answer_buffer
+from src.tasks.ingest_queue import answer_queue
+from src.tasks.purge import survey_purger
+from src.metrics import REGISTRY
+from src.ratelimit import RateLimitMiddleware, build_rules, get_rate_limit_backend
+from src.redis import close_redis
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -16,12 +24,16 @@ from src.auth.api import router as auth_router
 from src.tasks.survey_api import router as survey_router
 from src.assistant.template_survey import router as template_survey_router
 from src.leaderboard.api import router as leaderboard_router
+from src.leaderboard.connections import manager as leaderboard_connections
+from src.leaderboard.events import leaderboard_broadcasts
+from src.leaderboard.ranking import leaderboard_ranking
+from src.pubsub import pubsub
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 app.router.redirect_slashes = False
 
 # Список разрешенных origins
@@ -58,6 +70,45 @@ async def startup_event():
         logger.error(f"Database connection failed: {str(e)}")
         # Don't raise here to allow the application to start even with DB issues
 
+    try:
+        async with async_engine.begin() as conn:
+            created = await ensure_answer_partitions(conn)
+        if created:
+            logger.info(f"Created survey_answers partitions: {', '.join(created)}")
+    except Exception as e:
+        logger.error(f"Failed to ensure survey_answers partitions: {str(e)}")
+
+    if settings.answer_write_mode == "buffered":
+        await answer_buffer.start()
+    elif settings.answer_write_mode == "queued":
+        await answer_queue.start()
+    if settings.survey_purge_enabled:
+        survey_purger.start()
+    await leaderboard_ranking.start()
+    await pubsub.start()
+    leaderboard_connections.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info("Shutting down application...")
+    # Дописываем в БД всё, что осталось в буфере ответов
+    await answer_buffer.stop()
+    await answer_queue.stop()
+    await survey_purger.stop()
+    await leaderboard_ranking.stop()
+    await leaderboard_broadcasts.stop()
+    await leaderboard_connections.stop()
+    await pubsub.stop()
+    await close_redis()
+
+# Ограничение частоты публичных и AI-эндпоинтов; добавляется до CORS, чтобы 429 тоже получал CORS-заголовки
+if settings.rate_limit_enabled:
+    app.add_middleware(
+        RateLimitMiddleware,
+        backend=get_rate_limit_backend(),
+        rules=build_rules(settings.rate_limits),
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -99,6 +150,10 @@ def read_root():
         "environment": getattr(settings, 'environment', 'development')
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def check_health(db: AsyncSession = Depends(get_async_db)):
     logger.info("Health check endpoint called")
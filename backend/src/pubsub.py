@@ -0,0 +1,164 @@
+"""
+Publish/subscribe between worker processes.
+
+Handlers are registered per channel with subscribe() before start(). A
+published payload (a string) reaches the handlers of every worker,
+including the publishing one.
+
+Backends (PUBSUB_BACKEND):
+  - "memory": handlers of this process only; for a single worker and tests;
+  - "postgres": LISTEN/NOTIFY on one dedicated asyncpg connection per worker,
+    so no extra infrastructure is needed. LISTEN needs a session, so behind
+    PgBouncer in transaction mode set PUBSUB_DATABASE_URL to Postgres itself.
+    NOTIFY payloads must stay under 8000 bytes. Delivery is at most once:
+    notifications sent while a worker is reconnecting are lost, so
+    subscribers must tolerate gaps: handlers registered with on_reconnect()
+    run after every reconnect so they can resync. If the connection is down,
+    publish() still delivers to the local handlers.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable
+
+from src.config import settings
+from src.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+PUBSUB_MESSAGES = Counter("pubsub_messages_total", "Pub/sub messages by channel and direction", ["channel", "direction"])
+PUBSUB_ERRORS = Counter("pubsub_errors_total", "Failed pub/sub publishes and connection losses", ["operation"])
+
+Handler = Callable[[str], Awaitable[None]]
+ReconnectHandler = Callable[[], Awaitable[None]]
+
+
+class MemoryPubSub:
+    def __init__(self):
+        self._handlers: dict[str, list[Handler]] = defaultdict(list)
+        self._reconnect_handlers: list[ReconnectHandler] = []
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers[channel].append(handler)
+
+    def on_reconnect(self, handler: ReconnectHandler) -> None:
+        """Run `handler` after the connection is restored: messages may have been lost meanwhile."""
+        self._reconnect_handlers.append(handler)
+
+    def _dispatch(self, channel: str, payload: str) -> None:
+        PUBSUB_MESSAGES.inc(channel=channel, direction="received")
+        for handler in self._handlers.get(channel, ()):
+            asyncio.create_task(_run_handler(handler, channel, payload))
+
+    async def publish(self, channel: str, payload: str) -> None:
+        PUBSUB_MESSAGES.inc(channel=channel, direction="published")
+        self._dispatch(channel, payload)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+async def _run_handler(handler: Handler, channel: str, payload: str) -> None:
+    try:
+        await handler(payload)
+    except Exception as e:
+        logger.error(f"Pub/sub handler for {channel} failed: {str(e)}")
+
+
+async def _run_reconnect_handler(handler: ReconnectHandler) -> None:
+    try:
+        await handler()
+    except Exception as e:
+        logger.error(f"Pub/sub reconnect handler failed: {str(e)}")
+
+
+class PostgresPubSub(MemoryPubSub):
+    def __init__(self, dsn: str, keepalive_seconds: float = 30.0):
+        super().__init__()
+        self.dsn = dsn
+        self.keepalive_seconds = keepalive_seconds
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._connected_before = False
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        self._dispatch(channel, payload)
+
+    async def publish(self, channel: str, payload: str) -> None:
+        PUBSUB_MESSAGES.inc(channel=channel, direction="published")
+        conn = self._conn
+        if conn is not None:
+            try:
+                async with self._lock:
+                    await conn.execute("SELECT pg_notify($1, $2)", channel, payload)
+                return
+            except Exception as e:
+                logger.error(f"NOTIFY on {channel} failed: {str(e)}")
+        PUBSUB_ERRORS.inc(operation="publish")
+        # Другие воркеры сообщение не получат, но локальные подписчики — да
+        self._dispatch(channel, payload)
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        try:
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _: closed.set())
+            for channel in self._handlers:
+                await conn.add_listener(channel, self._on_notify)
+            self._conn = conn
+            logger.info(f"Listening on {', '.join(self._handlers)}")
+            if self._connected_before:
+                for handler in self._reconnect_handlers:
+                    asyncio.create_task(_run_reconnect_handler(handler))
+            self._connected_before = True
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), timeout=self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    # Обрыв TCP без закрытия соединения замечается только на запросе
+                    async with self._lock:
+                        await conn.execute("SELECT 1")
+        finally:
+            self._conn = None
+            if not conn.is_closed():
+                await conn.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Pub/sub connection lost: {str(e)}")
+            PUBSUB_ERRORS.inc(operation="connection")
+            await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _create_pubsub():
+    if settings.pubsub_backend == "postgres":
+        url = settings.pubsub_database_url or settings.async_database_url
+        return PostgresPubSub(url.replace("+asyncpg", ""))
+    return MemoryPubSub()
+
+
+pubsub = _create_pubsub()
@@ -0,0 +1,240 @@
+"""
+Sliding-window rate limiting for unauthenticated endpoints, as ASGI middleware.
+
+Each rule matches a method and a path pattern and limits requests per client
+IP or per survey (the public_id in the path). The window is a sliding-window
+counter: the previous fixed window's count is weighted by how much of it still
+overlaps the sliding window, then added to the current window's count. That
+takes two counters per key and O(1) work per check.
+
+Backends:
+  - "memory": per worker process, LRU-bounded number of keys;
+  - "redis": shared by all workers (REDIS_URL), one Lua call per check.
+If the shared backend fails, requests are let through and the failure is counted.
+
+A request is counted against every rule it matches only if all of them allow
+it: when a later rule (say, the per-survey one) rejects it, the hits already
+taken from earlier rules are given back, so a rejected request costs the
+client nothing.
+
+The client IP is scope["client"]. Behind Caddy/nginx that is the proxy unless
+uvicorn rewrites it from X-Forwarded-For, so the start commands pass
+--proxy-headers --forwarded-allow-ips "$FORWARDED_ALLOW_IPS" (Dockerfile,
+Procfile, azure.config.yml).
+
+Limits are configured per rule with RATE_LIMITS, a JSON object such as
+{"answer_ip": "30/60"} (requests per seconds). "0/60" disables a rule.
+"""
+import json
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config import settings
+from src.metrics import Counter
+from src.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total", "Rate limit checks by rule and outcome (allowed, limited, error)", ["rule", "outcome"]
+)
+
+
+@dataclass
+class RateLimitRule:
+    name: str
+    method: str
+    pattern: re.Pattern
+    scope: str  # ip | survey
+    limit: int
+    window_seconds: float
+
+
+_PUBLIC = r"^/api/surveys/s/(?P<public_id>[^/]+)"
+
+# name, method, path, scope, default limit, window
+DEFAULT_RULES = [
+    ("answer_ip", "POST", _PUBLIC + r"/answer$", "ip", 30, 60),
+    ("answer_survey", "POST", _PUBLIC + r"/answer$", "survey", 600, 60),
+    ("response_answer_ip", "PUT", _PUBLIC + r"/responses/[^/]+/answers/\d+$", "ip", 60, 60),
+    ("response_answer_survey", "PUT", _PUBLIC + r"/responses/[^/]+/answers/\d+$", "survey", 1200, 60),
+    ("response_start_ip", "POST", _PUBLIC + r"/responses$", "ip", 20, 60),
+    ("next_question_ip", "POST", _PUBLIC + r"/next-question$", "ip", 20, 60),
+    ("next_question_survey", "POST", _PUBLIC + r"/next-question$", "survey", 300, 60),
+    ("generate_questions_ip", "POST", r"^/api/surveys/generate-questions(-advanced)?$", "ip", 10, 60),
+]
+
+
+def build_rules(overrides: dict[str, str] | None = None) -> list[RateLimitRule]:
+    overrides = overrides or {}
+    rules = []
+    for name, method, path, scope, limit, window in DEFAULT_RULES:
+        if name in overrides:
+            limit, window = (float(part) for part in overrides[name].split("/"))
+        if limit <= 0:
+            continue
+        rules.append(RateLimitRule(name, method, re.compile(path), scope, int(limit), float(window)))
+    return rules
+
+
+def _estimate(previous: int, current: int, window: float, now: float) -> float:
+    overlap = 1 - (now % window) / window
+    return previous * overlap + current
+
+
+class MemoryRateLimitBackend:
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> [window index, count in that window, count in the window before]
+        self._counters: OrderedDict[str, list] = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: float) -> tuple[bool, float]:
+        """Count a request if it fits the limit. Returns (allowed, seconds until retry)."""
+        now = time.time()
+        index = int(now // window)
+        entry = self._counters.get(key)
+        if entry is None:
+            entry = [index, 0, 0]
+            self._counters[key] = entry
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+            if entry[0] != index:
+                entry[2] = entry[1] if entry[0] == index - 1 else 0
+                entry[1] = 0
+                entry[0] = index
+        if _estimate(entry[2], entry[1], window, now) >= limit:
+            return False, window - now % window
+        entry[1] += 1
+        return True, 0.0
+
+    async def release(self, key: str, window: float) -> None:
+        """Give back a hit counted by hit() in the current window."""
+        entry = self._counters.get(key)
+        if entry is not None and entry[0] == int(time.time() // window) and entry[1] > 0:
+            entry[1] -= 1
+
+
+# KEYS: current window, previous window. ARGV: overlap of the previous window, limit, TTL ms
+_REDIS_HIT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+_REDIS_RELEASE = """
+if tonumber(redis.call('GET', KEYS[1]) or '0') > 0 then
+    redis.call('DECR', KEYS[1])
+end
+"""
+
+
+class RedisRateLimitBackend:
+    def __init__(self, redis):
+        self._script = redis.register_script(_REDIS_HIT)
+        self._release = redis.register_script(_REDIS_RELEASE)
+
+    async def hit(self, key: str, limit: int, window: float) -> tuple[bool, float]:
+        now = time.time()
+        index = int(now // window)
+        overlap = 1 - (now % window) / window
+        allowed = await self._script(
+            keys=[f"rl:{key}:{index}", f"rl:{key}:{index - 1}"],
+            args=[overlap, limit, int(window * 2000)],
+        )
+        if allowed:
+            return True, 0.0
+        return False, window - now % window
+
+    async def release(self, key: str, window: float) -> None:
+        await self._release(keys=[f"rl:{key}:{int(time.time() // window)}"])
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, backend, rules: list[RateLimitRule]):
+        self.app = app
+        self.backend = backend
+        self.rules = rules
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        path = scope["path"]
+        counted: list[tuple[str, float]] = []
+        for rule in self.rules:
+            if rule.method != method:
+                continue
+            match = rule.pattern.match(path)
+            if match is None:
+                continue
+            if rule.scope == "survey":
+                subject = match.group("public_id")
+            else:
+                client = scope.get("client")
+                subject = client[0] if client else "unknown"
+            try:
+                allowed, retry_after = await self.backend.hit(
+                    f"{rule.name}:{subject}", rule.limit, rule.window_seconds
+                )
+            except Exception as e:
+                # Общий backend недоступен — не блокируем пользователей
+                RATE_LIMIT_DECISIONS.inc(rule=rule.name, outcome="error")
+                logger.error(f"Rate limit check failed: {str(e)}")
+                continue
+            if not allowed:
+                RATE_LIMIT_DECISIONS.inc(rule=rule.name, outcome="limited")
+                await self._release_all(counted)
+                await self._reject(send, retry_after)
+                return
+            RATE_LIMIT_DECISIONS.inc(rule=rule.name, outcome="allowed")
+            counted.append((f"{rule.name}:{subject}", rule.window_seconds))
+
+        await self.app(scope, receive, send)
+
+    async def _release_all(self, counted: list[tuple[str, float]]) -> None:
+        # Запрос отклонён следующим правилом — возвращаем уже списанные лимиты
+        for key, window in counted:
+            try:
+                await self.backend.release(key, window)
+            except Exception as e:
+                logger.error(f"Rate limit release failed: {str(e)}")
+
+    @staticmethod
+    async def _reject(send: Send, retry_after: float) -> None:
+        body = json.dumps(
+            {"detail": "Слишком много запросов. Попробуйте позже."}, ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def get_rate_limit_backend():
+    if settings.rate_limit_backend == "redis":
+        redis = get_redis()
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires REDIS_URL")
+        return RedisRateLimitBackend(redis)
+    return MemoryRateLimitBackend(max_keys=settings.rate_limit_max_keys)
@@ -0,0 +1,27 @@
+"""
+Shared Redis connection for multi-worker state (rate limits, sessions, caches).
+
+Redis is optional: get_redis() returns None when REDIS_URL is not set, and
+callers fall back to their in-process backends.
+"""
+from redis import asyncio as aioredis
+
+from src.config import settings
+
+_client: aioredis.Redis | None = None
+
+
+def get_redis() -> aioredis.Redis | None:
+    global _client
+    if settings.redis_url is None:
+        return None
+    if _client is None:
+        _client = aioredis.from_url(settings.redis_url, decode_responses=True)
+    return _client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,17 @@
+"""
+JSON responses.
+
+The app's default response class is ORJSONResponse. Handlers that build their
+response from trusted data, such as rows they just read or aggregates they
+computed, can return trusted_json(...). FastAPI then skips response_model
+validation and the jsonable_encoder pass, and orjson encodes the data once.
+Keep response_model on such routes so the OpenAPI schema stays accurate.
+"""
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+
+
+def trusted_json(content: Any, status_code: int = 200) -> ORJSONResponse:
+    """Plain dicts/lists (datetimes allowed); pydantic models must be dumped first."""
+    return ORJSONResponse(content, status_code=status_code)
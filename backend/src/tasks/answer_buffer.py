@@ -0,0 +1,230 @@
+"""
+Write-behind buffer for public answer submissions.
+
+In "buffered" write mode, submit_public_survey_answer puts the row into a
+bounded in-memory queue instead of committing it itself. A background task
+drains the queue and writes multi-row INSERTs every `answer_buffer_flush_ms`
+milliseconds or `answer_buffer_max_rows` rows, whichever comes first.
+
+Durability (`answer_buffer_durability`):
+  - "commit": the request waits until its batch is committed (group commit);
+    a crash loses nothing that was acknowledged. If the batch fails, submit()
+    raises BufferFlushError and the caller writes the row itself.
+  - "accepted": the request returns as soon as the row is queued; rows still
+    in the queue are lost if the process dies without a graceful shutdown.
+    Rows whose flush keeps failing are appended to answer_buffer_spill_path
+    (NDJSON) and written again when the buffer starts next time.
+"""
+import asyncio
+import collections
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.leaderboard.events import leaderboard_events
+from src.metrics import Counter, Gauge, Histogram
+from src.tasks.crud import SurveyDAO
+from src.tasks.schema import SurveyAnswer
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = Histogram(
+    "answer_buffer_batch_size", "Rows written per buffered flush",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+FLUSH_SECONDS = Histogram("answer_buffer_flush_seconds", "Latency of a buffered flush (INSERT + COMMIT)")
+QUEUE_WAIT_SECONDS = Histogram("answer_buffer_queue_wait_seconds", "Time a row spends in the buffer before commit")
+QUEUE_DEPTH = Gauge("answer_buffer_queue_depth", "Rows waiting in the write-behind buffer")
+FLUSH_FAILURES = Counter("answer_buffer_flush_failures_total", "Failed buffered flush attempts")
+SPILLED_ROWS = Counter("answer_buffer_spilled_rows_total", "Accepted rows written to the spill file after all flush retries failed")
+DROPPED_ROWS = Counter("answer_buffer_dropped_rows_total", "Rows lost because the spill file could not be written")
+REJECTED_ROWS = Counter("answer_buffer_full_total", "Submissions that found the buffer full")
+
+FLUSH_RETRIES = 3
+
+
+class BufferFullError(Exception):
+    """Raised when the write-behind queue is at capacity."""
+    pass
+
+
+class BufferFlushError(Exception):
+    """Raised to a "commit" submitter when its batch could not be written."""
+    pass
+
+
+class AnswerWriteBuffer:
+    def __init__(
+        self,
+        max_rows: int = 500,
+        flush_interval_ms: int = 50,
+        queue_size: int = 10000,
+        durability: str = "commit",
+        spill_path: str = "answer_buffer_spill.ndjson",
+    ):
+        if durability not in ("commit", "accepted"):
+            raise ValueError(f"Unknown answer buffer durability: {durability}")
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue_size = queue_size
+        self.durability = durability
+        self.spill_path = spill_path
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        QUEUE_DEPTH.set_function(lambda: self._queue.qsize() if self._queue else 0)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        await self._replay_spilled()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Answer write buffer started (max_rows={self.max_rows}, "
+            f"flush_interval={self.flush_interval}s, durability={self.durability})"
+        )
+
+    async def stop(self) -> None:
+        """Flush everything that is queued and stop the background task."""
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("Answer write buffer stopped")
+
+    async def submit(self, row: dict) -> None:
+        """
+        Queue a survey_answers row. Raises BufferFullError when the queue is full
+        and, in "commit" durability, BufferFlushError when the batch failed, so the
+        caller can fall back to a direct write.
+        """
+        future = asyncio.get_running_loop().create_future() if self.durability == "commit" else None
+        try:
+            self._queue.put_nowait((row, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            REJECTED_ROWS.inc()
+            raise BufferFullError()
+        if future is not None:
+            await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.flush_interval
+            while len(batch) < self.max_rows:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        # Graceful shutdown: drain whatever is left
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.max_rows):
+            await self._flush(remaining[start:start + self.max_rows])
+
+    async def _flush(self, batch: list[tuple], spill: bool = False) -> None:
+        rows = [row for row, _, _ in batch]
+        error = None
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(SurveyAnswer.__table__).values(rows))
+                    # Сортировка по id — одинаковый порядок блокировок строк surveys во всех воркерах
+                    for survey_id, count in sorted(collections.Counter(row["survey_id"] for row in rows).items()):
+                        await SurveyDAO.increment_answers_count(survey_id, count, db)
+                    await db.commit()
+                error = None
+                break
+            except Exception as e:
+                error = e
+                FLUSH_FAILURES.inc()
+                logger.error(f"Answer buffer flush failed (attempt {attempt}/{FLUSH_RETRIES}): {str(e)}")
+                await asyncio.sleep(0.1 * attempt)
+
+        if error is None:
+            for row in rows:
+                leaderboard_events.answer_recorded(row["survey_id"], row["answers"])
+
+        finished = time.perf_counter()
+        FLUSH_SECONDS.observe(finished - started)
+        BATCH_SIZE.observe(len(rows))
+        for _, future, queued_at in batch:
+            QUEUE_WAIT_SECONDS.observe(finished - queued_at)
+            if future is not None and not future.done():
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(BufferFlushError(str(error)))
+        if error is not None and (spill or self.durability == "accepted"):
+            await self._spill(rows)
+
+    def _write_spill(self, rows: list[dict]) -> None:
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _spill(self, rows: list[dict]) -> None:
+        try:
+            await asyncio.to_thread(self._write_spill, rows)
+        except OSError as e:
+            DROPPED_ROWS.inc(len(rows))
+            logger.error(f"Dropped {len(rows)} buffered answers, spill file failed: {str(e)}")
+            return
+        SPILLED_ROWS.inc(len(rows))
+        logger.error(f"Spilled {len(rows)} buffered answers to {self.spill_path} after {FLUSH_RETRIES} attempts")
+
+    async def _replay_spilled(self) -> None:
+        """Write rows spilled by an earlier run; rows that fail again are spilled again."""
+        replaying = self.spill_path + ".replaying"
+        if not os.path.exists(replaying):
+            if not os.path.exists(self.spill_path):
+                return
+            os.replace(self.spill_path, replaying)
+        with open(replaying, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        for row in rows:
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+        logger.info(f"Writing {len(rows)} spilled answers from {replaying}")
+        for start in range(0, len(rows), self.max_rows):
+            batch = rows[start:start + self.max_rows]
+            await self._flush([(row, None, time.perf_counter()) for row in batch], spill=True)
+        os.remove(replaying)
+
+
+answer_buffer = AnswerWriteBuffer(
+    max_rows=settings.answer_buffer_max_rows,
+    flush_interval_ms=settings.answer_buffer_flush_ms,
+    queue_size=settings.answer_buffer_queue_size,
+    durability=settings.answer_buffer_durability,
+    spill_path=settings.answer_buffer_spill_path,
+)
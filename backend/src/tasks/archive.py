@@ -0,0 +1,177 @@
+"""
+Cold storage of answers of long-archived surveys.
+
+Answers of surveys archived for more than `answer_archive_after_days` days are
+exported to zstd-compressed Parquet files and then deleted from Postgres.
+The files go to a local directory, or to Azure Blob Storage when
+AZURE_STORAGE_CONNECTION_STRING is set. Each run writes one file per survey:
+    survey_<id>/part-<first id>-<last id>.parquet
+surveys.answers_archived_through_id records the highest archived answer id,
+so a run that is interrupted and repeated neither loses nor duplicates rows.
+The analytics and answer-list endpoints read archived parts transparently,
+using memory-mapped local files.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.tasks.archive_store import get_archive_store, survey_archive_prefix
+from src.tasks.purge import delete_answers_batch
+from src.tasks.schema import Survey, SurveyAnswer
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 10000
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("answers", pa.string()),
+    ("respondent_id", pa.string()),
+    ("ip", pa.string()),
+    ("respondent_hash", pa.string()),
+    ("created_at", pa.timestamp("us")),
+])
+
+
+@dataclass
+class ArchivedAnswer:
+    """Row read back from the archive; has the same attributes analytics uses on SurveyAnswer."""
+    id: int
+    answers: str
+    respondent_id: str | None
+    ip: str | None
+    respondent_hash: str | None
+    created_at: datetime | None
+
+
+async def _export_parquet(survey_id: int, after_id: int, through_id: int, db: AsyncSession) -> str:
+    """Write answers with after_id < id <= through_id into a temporary Parquet file."""
+    fd, path = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    writer = pq.ParquetWriter(path, ARCHIVE_SCHEMA, compression="zstd")
+    try:
+        stream = await db.stream(
+            select(
+                SurveyAnswer.id,
+                SurveyAnswer.answers,
+                SurveyAnswer.respondent_id,
+                SurveyAnswer.ip,
+                SurveyAnswer.respondent_hash,
+                SurveyAnswer.created_at,
+            )
+            .where(
+                SurveyAnswer.survey_id == survey_id,
+                SurveyAnswer.id > after_id,
+                SurveyAnswer.id <= through_id,
+            )
+            .order_by(SurveyAnswer.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+        )
+        async for rows in stream.partitions(EXPORT_CHUNK_SIZE):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, ARCHIVE_SCHEMA)],
+                schema=ARCHIVE_SCHEMA,
+            ))
+    finally:
+        writer.close()
+    return path
+
+
+async def archive_survey_answers(survey_id: int, store=None) -> int:
+    """
+    Export the survey's answers that are still in Postgres, then delete them from the table.
+    Returns the number of archived answers.
+    """
+    store = store or get_archive_store()
+    prefix = survey_archive_prefix(survey_id)
+    async with AsyncSessionLocal() as db:
+        survey = await db.get(Survey, survey_id)
+        after_id = survey.answers_archived_through_id or 0
+        first_id, through_id, count = (await db.execute(
+            select(func.min(SurveyAnswer.id), func.max(SurveyAnswer.id), func.count(SurveyAnswer.id))
+            .where(SurveyAnswer.survey_id == survey_id, SurveyAnswer.id > after_id)
+        )).one()
+
+        if count:
+            local_file = await _export_parquet(survey_id, after_id, through_id, db)
+            await store.put(f"{prefix}/part-{first_id:012d}-{through_id:012d}.parquet", local_file)
+            # Фиксируем границу только после того, как файл записан в хранилище
+            survey.answers_archived_through_id = through_id
+            survey.answers_archive_uri = prefix
+            await db.commit()
+            logger.info(f"Archived {count} answers of survey {survey_id} to {prefix}")
+
+        # Удаляем из Postgres всё, что уже лежит в архиве (в т.ч. хвост прерванного запуска).
+        # answers_count не уменьшаем: архивные ответы по-прежнему принадлежат опросу
+        archived_through = through_id if count else after_id
+        while await delete_answers_batch(
+            survey_id, settings.survey_purge_batch_size, db, adjust_count=False, max_id=archived_through
+        ):
+            await db.commit()
+            await asyncio.sleep(settings.survey_purge_batch_delay_ms / 1000)
+    return count
+
+
+async def archive_cold_answers(older_than_days: int | None = None) -> dict[int, int]:
+    """Archive answers of every survey archived more than `older_than_days` days ago."""
+    if older_than_days is None:
+        older_than_days = settings.answer_archive_after_days
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Survey.id).where(
+                Survey.archived == True,
+                Survey.deleted_at.is_(None),
+                Survey.archived_at < cutoff,
+                # Лидерборд считается SQL-запросом по survey_answers — ответы шаблонов не архивируем
+                Survey.is_template_survey == False,
+                select(SurveyAnswer.id).where(SurveyAnswer.survey_id == Survey.id).exists(),
+            )
+        )
+        survey_ids = result.scalars().all()
+
+    store = get_archive_store()
+    archived = {}
+    for survey_id in survey_ids:
+        archived[survey_id] = await archive_survey_answers(survey_id, store)
+    return archived
+
+
+def _read_part(path: str) -> list[ArchivedAnswer]:
+    table = pq.read_table(path, memory_map=True)
+    return [ArchivedAnswer(**row) for row in table.to_pylist()]
+
+
+async def read_archived_answers(survey: Survey) -> list[ArchivedAnswer]:
+    """All archived answers of a survey, oldest first. Empty if nothing was archived."""
+    if not survey.answers_archive_uri:
+        return []
+    store = get_archive_store()
+    answers = []
+    for name in await store.list(survey.answers_archive_uri):
+        path = await store.local_path(name)
+        answers.extend(await asyncio.to_thread(_read_part, path))
+    return answers
+
+
+async def load_survey_answers(survey: Survey, db: AsyncSession) -> list:
+    """
+    Answers of a survey from Postgres plus the archive. Rows already archived
+    but not yet deleted from Postgres are taken from the archive only.
+    """
+    query = select(SurveyAnswer).where(SurveyAnswer.survey_id == survey.id)
+    if survey.answers_archived_through_id:
+        query = query.where(SurveyAnswer.id > survey.answers_archived_through_id)
+    result = await db.execute(query)
+    return await read_archived_answers(survey) + list(result.scalars().all())
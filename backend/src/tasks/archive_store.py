@@ -0,0 +1,97 @@
+"""
+Storage backends for answer archive parts (see src/tasks/archive.py).
+
+Parts are immutable files named <prefix>/part-*.parquet. Readers always get a
+local path, so the files can be memory-mapped: the local store returns the file
+itself, the Azure store downloads the blob into a cache directory once.
+"""
+import asyncio
+import os
+import shutil
+
+from src.config import settings
+
+
+class LocalArchiveStore:
+    """Archive parts stored as plain files under a directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    async def put(self, name: str, local_file: str) -> None:
+        target = self._path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        await asyncio.to_thread(shutil.move, local_file, target)
+
+    async def list(self, prefix: str) -> list[str]:
+        directory = self._path(prefix)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(f"{prefix}/{name}" for name in os.listdir(directory) if name.endswith(".parquet"))
+
+    async def local_path(self, name: str) -> str:
+        return self._path(name)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        await asyncio.to_thread(shutil.rmtree, self._path(prefix), True)
+
+
+class AzureBlobArchiveStore:
+    """Archive parts stored in an Azure Blob container; reads go through a local file cache."""
+
+    def __init__(self, connection_string: str, container: str, cache_dir: str):
+        from azure.storage.blob import BlobServiceClient
+
+        self.container = BlobServiceClient.from_connection_string(connection_string).get_container_client(container)
+        self.cache_dir = cache_dir
+
+    def _upload(self, name: str, local_file: str) -> None:
+        with open(local_file, "rb") as f:
+            self.container.upload_blob(name, f, overwrite=True)
+        os.remove(local_file)
+
+    async def put(self, name: str, local_file: str) -> None:
+        await asyncio.to_thread(self._upload, name, local_file)
+
+    async def list(self, prefix: str) -> list[str]:
+        blobs = await asyncio.to_thread(lambda: list(self.container.list_blobs(name_starts_with=f"{prefix}/")))
+        return sorted(blob.name for blob in blobs if blob.name.endswith(".parquet"))
+
+    def _download(self, name: str, target: str) -> None:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = f"{target}.partial"
+        with open(partial, "wb") as f:
+            self.container.download_blob(name).readinto(f)
+        os.replace(partial, target)
+
+    async def local_path(self, name: str) -> str:
+        # Части неизменяемы, поэтому скачанный файл можно переиспользовать без проверок
+        target = os.path.join(self.cache_dir, name)
+        if not os.path.exists(target):
+            await asyncio.to_thread(self._download, name, target)
+        return target
+
+    def _delete_prefix(self, prefix: str) -> None:
+        for blob in self.container.list_blobs(name_starts_with=f"{prefix}/"):
+            self.container.delete_blob(blob.name)
+        shutil.rmtree(os.path.join(self.cache_dir, prefix), True)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        await asyncio.to_thread(self._delete_prefix, prefix)
+
+
+def get_archive_store():
+    if settings.azure_storage_connection_string:
+        return AzureBlobArchiveStore(
+            settings.azure_storage_connection_string,
+            settings.answer_archive_container,
+            cache_dir=os.path.join(settings.answer_archive_dir, ".cache"),
+        )
+    return LocalArchiveStore(settings.answer_archive_dir)
+
+
+def survey_archive_prefix(survey_id: int) -> str:
+    return f"survey_{survey_id}"
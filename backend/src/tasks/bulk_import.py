@@ -0,0 +1,207 @@
+"""
+Bulk import of survey answers from NDJSON or CSV streams.
+
+Rows are validated against the survey questions and written in batches with
+PostgreSQL COPY (asyncpg `copy_records_to_table`), one transaction per batch.
+The follow-up subagent is not involved: imported responses are final.
+
+NDJSON: one object per line, {"answers": [...], "respondent_id": ..., "ip": ..., "created_at": ...}.
+CSV: a header row; respondent_id, ip and created_at columns are optional,
+every other column is treated as an answer, in column order.
+
+Soft-deleted surveys and surveys whose answers were moved to cold storage
+(answers_archive_uri) do not accept imports.
+"""
+import codecs
+import csv
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.leaderboard.events import leaderboard_events
+from src.leaderboard.ranking import leaderboard_ranking
+from src.tasks.crud import SurveyDAO
+from src.tasks.dedup import respondent_deduplicator, respondent_hash
+from src.tasks.schema import Survey, SurveyAnswer
+from src.tasks.validation import AnswerValidationError, validate_answers
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("ndjson", "csv")
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+_COPY_COLUMNS = ["survey_id", "public_id", "answers", "respondent_id", "ip", "respondent_hash", "created_at"]
+_CSV_META_COLUMNS = {"respondent_id", "ip", "created_at"}
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    rejected: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def reject(self, line_no: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line_no}: {message}")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into decoded text lines."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_file_lines(lines: Iterable[str]) -> AsyncIterator[str]:
+    for line in lines:
+        yield line.rstrip("\r\n")
+
+
+def _parse_created_at(value: Any) -> datetime:
+    if not value:
+        return datetime.now()
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        # created_at хранится как локальное время без таймзоны
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+async def _ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, Any]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, AnswerValidationError(f"invalid JSON: {e.msg}")
+
+
+async def _csv_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, Any]]:
+    header = None
+    line_no = 0
+    buffered = ""
+    async for line in lines:
+        line_no += 1
+        # Нечётное число кавычек — поле в кавычках продолжается на следующей строке
+        buffered = f"{buffered}\n{line}" if buffered else line
+        if buffered.count('"') % 2:
+            continue
+        row, buffered = next(csv.reader([buffered])), ""
+        if header is None:
+            header = [column.strip() for column in row]
+            continue
+        if not any(cell.strip() for cell in row):
+            continue
+        record = {"answers": []}
+        for column, value in zip(header, row):
+            if column in _CSV_META_COLUMNS:
+                record[column] = value or None
+            else:
+                record["answers"].append(value)
+        yield line_no, record
+
+
+class ImportNotAllowedError(Exception):
+    """Raised for surveys that cannot take imported answers (deleted or cold-archived)."""
+    pass
+
+
+class BulkAnswerImporter:
+    def __init__(self, survey: Survey, db: AsyncSession, batch_size: int = DEFAULT_BATCH_SIZE):
+        if survey.deleted_at is not None:
+            raise ImportNotAllowedError("survey is deleted")
+        if survey.answers_archive_uri is not None:
+            raise ImportNotAllowedError("survey answers are archived to cold storage")
+        self.survey = survey
+        self.db = db
+        self.batch_size = batch_size
+        self.questions = json.loads(survey.questions)
+
+    def _to_record(self, data: Any) -> tuple:
+        if isinstance(data, list):
+            data = {"answers": data}
+        if not isinstance(data, dict):
+            raise AnswerValidationError("expected an object with an 'answers' list")
+        answers = data.get("answers")
+        validate_answers(self.questions, answers)
+        try:
+            created_at = _parse_created_at(data.get("created_at"))
+        except ValueError:
+            raise AnswerValidationError("created_at must be an ISO 8601 timestamp")
+        respondent_id = data.get("respondent_id")
+        respondent_id = str(respondent_id) if respondent_id is not None else None
+        ip = data.get("ip")
+        if ip is not None:
+            if not isinstance(ip, str):
+                raise AnswerValidationError("ip must be a string")
+            ip = ip.strip() or None
+        return (
+            self.survey.id,
+            self.survey.public_id,
+            json.dumps(answers),
+            respondent_id,
+            ip,
+            respondent_hash(respondent_id, ip),
+            created_at,
+        )
+
+    async def _copy_batch(self, records: list[tuple]) -> None:
+        conn = await self.db.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            SurveyAnswer.__tablename__, records=records, columns=_COPY_COLUMNS
+        )
+        # Производные агрегаты обновляются один раз на батч, в той же транзакции
+        await SurveyDAO.increment_answers_count(self.survey.id, len(records), self.db)
+        await self.db.commit()
+        if leaderboard_ranking.is_ranked(self.survey.id):
+            for record in records:
+                leaderboard_events.answer_recorded(self.survey.id, record[2])
+        # Фильтры дубликатов этого опроса перечитаются из БД при следующей проверке
+        respondent_deduplicator.forget_survey(self.survey.id)
+
+    async def run(self, lines: AsyncIterator[str], fmt: str = "ndjson") -> ImportResult:
+        if fmt not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format: {fmt}")
+        records_iter = _ndjson_records(lines) if fmt == "ndjson" else _csv_records(lines)
+
+        result = ImportResult()
+        batch: list[tuple] = []
+        async for line_no, data in records_iter:
+            if isinstance(data, Exception):
+                result.reject(line_no, str(data))
+                continue
+            try:
+                batch.append(self._to_record(data))
+            except AnswerValidationError as e:
+                result.reject(line_no, str(e))
+                continue
+            if len(batch) >= self.batch_size:
+                await self._copy_batch(batch)
+                result.imported += len(batch)
+                batch = []
+        if batch:
+            await self._copy_batch(batch)
+            result.imported += len(batch)
+
+        logger.info(
+            f"Imported {result.imported} answers into survey {self.survey.id} "
+            f"({result.rejected} rejected)"
+        )
+        return result
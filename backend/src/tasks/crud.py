@@ -3,11 +3,13 @@ import json
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, inspect, update
 from sqlalchemy.future import select
 
 from src.auth.exceptions import (DatabaseException, UserAlreadyExistsException,
                                  UserNotFoundException)
-from src.tasks.schema import User, Survey
+from src.auth.revocation import revoke_user_access_tokens
+from src.tasks.schema import User, Survey, SurveyAnswer
 from src.tasks.models import SurveyOut
 
 
@@ -52,17 +54,26 @@ class UserDAO:
 
     @staticmethod
     async def update_user(user: User, db: AsyncSession) -> User:
-        """Update an existing user."""
+        """
+        Update an existing user.
+
+        Access tokens carry the user's name and email, so changing either
+        revokes the issued access tokens: clients refresh and get new claims.
+        """
+        state = inspect(user)
+        profile_changed = state.attrs.name.history.has_changes() or state.attrs.email.history.has_changes()
         try:
             await db.commit()
             await db.refresh(user)
-            return user
         except IntegrityError:
             await db.rollback()
             raise UserAlreadyExistsException(user.email)
         except Exception as e:
             await db.rollback()
             raise DatabaseException(f"update_user: {str(e)}")
+        if profile_changed:
+            await revoke_user_access_tokens(user.id)
+        return user
 
     @staticmethod
     async def delete_user(user: User, db: AsyncSession) -> bool:
@@ -126,10 +137,49 @@ class SurveyDAO:
             created_at=survey.created_at,
             public_id=survey.public_id,
             archived=survey.archived,
+            answers_count=survey.answers_count,
         )
 
     @staticmethod
     async def get_surveys_by_user(user_id: int, db: AsyncSession):
-        result = await db.execute(select(Survey).where(Survey.user_id == user_id))
+        result = await db.execute(
+            select(Survey).where(Survey.user_id == user_id, Survey.deleted_at.is_(None))
+        )
         surveys = result.scalars().all()
-        return surveys
\ No newline at end of file
+        return surveys
+
+    @staticmethod
+    async def increment_answers_count(survey_id: int, amount: int, db: AsyncSession) -> None:
+        """
+        Adjust the answers_count counter cache. Runs in the caller's transaction,
+        so the counter commits together with the answers it counts.
+        """
+        await db.execute(
+            update(Survey)
+            .where(Survey.id == survey_id)
+            .values(answers_count=Survey.answers_count + amount)
+        )
+
+    @staticmethod
+    async def reconcile_answers_count(db: AsyncSession, survey_id: int | None = None) -> int:
+        """
+        Recompute answers_count from survey_answers for one survey or all of them.
+        Surveys with answers in cold storage are skipped: their count includes archived rows.
+        Returns the number of surveys whose counter was corrected.
+        """
+        actual = func.coalesce(
+            select(func.count(SurveyAnswer.id))
+            .where(SurveyAnswer.survey_id == Survey.id)
+            .scalar_subquery(),
+            0,
+        )
+        stmt = (
+            update(Survey)
+            .where(Survey.answers_count != actual, Survey.answers_archive_uri.is_(None))
+            .values(answers_count=actual)
+        )
+        if survey_id is not None:
+            stmt = stmt.where(Survey.id == survey_id)
+        result = await db.execute(stmt.execution_options(synchronize_session=False))
+        await db.commit()
+        return result.rowcount
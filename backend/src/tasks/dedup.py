@@ -0,0 +1,124 @@
+"""
+Duplicate-submission detection for public survey answers.
+
+Every answer stores respondent_hash = sha256 of the respondent_id (or the IP
+when there is none). For each active survey a worker keeps a Bloom filter of
+the hashes it has seen. When the filter says "definitely not seen", which is
+the common case, no extra query runs. Only possible duplicates are confirmed
+with the (survey_id, respondent_hash) index.
+
+The filters are per worker process. A respondent who answered through another
+worker since the filter was loaded is only caught after that filter is
+reloaded, so the check is best-effort. Idempotency keys are the strict
+guarantee against retries.
+"""
+import hashlib
+import logging
+import math
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.metrics import Counter
+from src.tasks.schema import SurveyAnswer
+
+logger = logging.getLogger(__name__)
+
+DEDUP_CHECKS = Counter(
+    "answer_dedup_checks_total", "Duplicate checks by outcome (bloom_negative, confirmed_new, duplicate)", ["outcome"]
+)
+
+
+def respondent_hash(respondent_id: str | None, ip: str | None) -> str | None:
+    if respondent_id:
+        source = f"r:{respondent_id}"
+    elif ip:
+        source = f"ip:{ip}"
+    else:
+        return None
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Двойное хеширование: k позиций из двух 64-битных половин одного дайджеста
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RespondentDeduplicator:
+    """Keeps one Bloom filter per recently active survey (LRU-bounded)."""
+
+    def __init__(self, max_surveys: int, capacity: int, error_rate: float):
+        self.max_surveys = max_surveys
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filters: OrderedDict[int, BloomFilter] = OrderedDict()
+
+    async def _filter_for(self, survey_id: int, db: AsyncSession) -> BloomFilter:
+        bloom = self._filters.get(survey_id)
+        if bloom is not None:
+            self._filters.move_to_end(survey_id)
+            return bloom
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        result = await db.execute(
+            select(SurveyAnswer.respondent_hash).where(
+                SurveyAnswer.survey_id == survey_id,
+                SurveyAnswer.respondent_hash.is_not(None),
+            )
+        )
+        for (value,) in result:
+            bloom.add(value)
+        self._filters[survey_id] = bloom
+        if len(self._filters) > self.max_surveys:
+            self._filters.popitem(last=False)
+        return bloom
+
+    async def is_duplicate(self, survey_id: int, value: str, db: AsyncSession) -> bool:
+        bloom = await self._filter_for(survey_id, db)
+        if value not in bloom:
+            DEDUP_CHECKS.inc(outcome="bloom_negative")
+            return False
+        result = await db.execute(
+            select(SurveyAnswer.id).where(
+                SurveyAnswer.survey_id == survey_id,
+                SurveyAnswer.respondent_hash == value,
+            ).limit(1)
+        )
+        if result.first() is None:
+            DEDUP_CHECKS.inc(outcome="confirmed_new")
+            return False
+        DEDUP_CHECKS.inc(outcome="duplicate")
+        return True
+
+    def remember(self, survey_id: int, value: str) -> None:
+        bloom = self._filters.get(survey_id)
+        if bloom is not None:
+            bloom.add(value)
+
+    def forget_survey(self, survey_id: int) -> None:
+        self._filters.pop(survey_id, None)
+
+
+respondent_deduplicator = RespondentDeduplicator(
+    max_surveys=settings.answer_dedup_max_surveys,
+    capacity=settings.answer_dedup_bloom_capacity,
+    error_rate=settings.answer_dedup_bloom_error_rate,
+)
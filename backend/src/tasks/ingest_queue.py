@@ -0,0 +1,328 @@
+"""
+Durable local queue for asynchronous ("queued") answer ingestion.
+
+In answer_write_mode="queued", submit_public_survey_answer validates the
+answer, appends it to a SQLite database in WAL mode and returns 202 with a
+ticket. The follow-up subagent is skipped, so this path is only taken when
+the last answered question cannot trigger a follow-up. A consumer task claims
+queued rows in batches and writes them to Postgres with one multi-row INSERT.
+In the same transaction it increments answers_count. Then it marks the rows
+saved and reports them to the leaderboard (src/leaderboard/events.py). Clients poll
+GET /s/{public_id}/answer-status/{ticket}. A ticket is "<survey_id>:<hex>", the hex
+being a hash of the Idempotency-Key or a random id, so it is URL-safe and the
+status endpoint can check that it belongs to the survey.
+
+A batch that Postgres rejects because of its data (e.g. an answer to a survey
+purged meanwhile) is split in halves and retried until the offending rows are
+isolated; only those are retried later or marked failed. Connection errors
+retry the whole batch.
+
+Each queued answer carries an idempotency key: the client's Idempotency-Key,
+or "queue:<ticket>" when there is none. It is written to
+survey_answer_idempotency_keys inside the INSERT transaction. If the process
+dies between the Postgres commit and marking the rows saved, replaying the
+batch does not duplicate answers. The key row also stores the 202 response,
+so a retried request with the same Idempotency-Key gets the same ticket back,
+both while the answer is queued and after it was written.
+
+The queue file is local to the host. Ticket status is only visible to
+workers that share the file (answer_queue_path).
+"""
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.leaderboard.events import leaderboard_events
+from src.metrics import Counter, Gauge, Histogram
+from src.tasks.crud import SurveyDAO
+from src.tasks.schema import SurveyAnswer, SurveyAnswerIdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = Gauge("answer_queue_depth", "Answers waiting in the durable ingestion queue")
+INGESTED = Counter("answer_queue_ingested_total", "Queued answers by final status (saved, failed)", ["status"])
+INGEST_LAG = Histogram("answer_queue_lag_seconds", "Time from enqueue to Postgres commit")
+
+_HOUSEKEEPING_SECONDS = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answer_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_answer_queue_status_id ON answer_queue (status, id);
+"""
+
+
+QUEUED_ANSWER_MESSAGE = "Ответ принят!"
+
+
+def queued_response_body(ticket: str) -> str:
+    """Body of the 202 response to a queued answer (PublicSurveyAnswerOut)."""
+    return json.dumps({"ok": True, "message": QUEUED_ANSWER_MESSAGE, "ticket": ticket}, ensure_ascii=False)
+
+
+def answer_ticket(survey_id: int, idempotency_key: str | None = None) -> str:
+    """Ticket of a queued answer: derived from the Idempotency-Key, random without one."""
+    if idempotency_key:
+        return f"{survey_id}:{hashlib.sha256(idempotency_key.encode()).hexdigest()[:32]}"
+    return f"{survey_id}:{uuid.uuid4().hex}"
+
+
+class DurableAnswerQueue:
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 500,
+        poll_seconds: float = 1.0,
+        max_attempts: int = 5,
+        retention_seconds: float = 86400,
+        processing_timeout_seconds: float = 300,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self.processing_timeout = processing_timeout_seconds
+        # Одно соединение и один поток: SQLite-вызовы сериализуются и не блокируют event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="answer-queue")
+        self._conn: sqlite3.Connection | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # --- SQLite side (runs in the queue thread) ---
+
+    def _open(self) -> None:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: каждая запись в очередь переживает падение ОС, а не только процесса
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    def _enqueue(self, ticket: str, payload: str) -> str:
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR IGNORE INTO answer_queue (ticket, payload, enqueued_at, updated_at) VALUES (?, ?, ?, ?)",
+            (ticket, payload, now, now),
+        )
+        return ticket
+
+    def _claim(self) -> list[tuple]:
+        now = time.time()
+        return self._conn.execute(
+            "UPDATE answer_queue SET status = 'processing', attempts = attempts + 1, updated_at = ? "
+            "WHERE id IN (SELECT id FROM answer_queue WHERE status = 'queued' ORDER BY id LIMIT ?) "
+            "RETURNING id, ticket, payload, attempts, enqueued_at",
+            (now, self.batch_size),
+        ).fetchall()
+
+    def _finish(self, ids: list[int], status: str, error: str | None = None) -> None:
+        placeholders = ",".join("?" * len(ids))
+        self._conn.execute(
+            f"UPDATE answer_queue SET status = ?, error = ?, updated_at = ? WHERE id IN ({placeholders})",
+            (status, error, time.time(), *ids),
+        )
+
+    def _housekeeping(self) -> int:
+        now = time.time()
+        # Строки, захваченные упавшим процессом, возвращаются в очередь
+        self._conn.execute(
+            "UPDATE answer_queue SET status = 'queued' WHERE status = 'processing' AND updated_at < ?",
+            (now - self.processing_timeout,),
+        )
+        self._conn.execute(
+            "DELETE FROM answer_queue WHERE status IN ('saved', 'failed') AND updated_at < ?",
+            (now - self.retention_seconds,),
+        )
+        return self._depth()
+
+    def _depth(self) -> int:
+        return self._conn.execute("SELECT count(*) FROM answer_queue WHERE status = 'queued'").fetchone()[0]
+
+    def _status(self, ticket: str) -> dict | None:
+        row = self._conn.execute(
+            "SELECT status, error, enqueued_at, updated_at FROM answer_queue WHERE ticket = ?", (ticket,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, error, enqueued_at, updated_at = row
+        return {
+            "status": status,
+            "error": error,
+            "enqueued_at": datetime.fromtimestamp(enqueued_at).isoformat(),
+            "updated_at": datetime.fromtimestamp(updated_at).isoformat(),
+        }
+
+    # --- asyncio side ---
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        await self._call(self._open)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        QUEUE_DEPTH.set(await self._call(self._housekeeping))
+        logger.info(f"Answer ingestion queue started ({self.path})")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._call(self._conn.close)
+        self._conn = None
+        logger.info("Answer ingestion queue stopped")
+
+    async def enqueue(self, row: dict, idempotency_key: str | None = None) -> str:
+        """Durably store a survey_answers row and return its ticket."""
+        ticket = answer_ticket(row["survey_id"], idempotency_key)
+        if not idempotency_key:
+            idempotency_key = f"queue:{ticket}"
+        payload = json.dumps({
+            "row": {**row, "created_at": row["created_at"].isoformat()},
+            "idempotency_key": idempotency_key,
+        })
+        await self._call(self._enqueue, ticket, payload)
+        QUEUE_DEPTH.inc()
+        self._wakeup.set()
+        return ticket
+
+    async def status(self, ticket: str) -> dict | None:
+        if self._conn is None:
+            return None
+        return await self._call(self._status, ticket)
+
+    async def _run(self) -> None:
+        last_housekeeping = time.monotonic()
+        while True:
+            try:
+                claimed = await self._call(self._claim)
+                if claimed:
+                    await self._persist(claimed)
+                if time.monotonic() - last_housekeeping > _HOUSEKEEPING_SECONDS:
+                    QUEUE_DEPTH.set(await self._call(self._housekeeping))
+                    last_housekeeping = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Answer queue consumer failed: {str(e)}")
+                claimed = None
+            if not claimed:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _persist(self, claimed: list[tuple]) -> None:
+        try:
+            new_rows = await self._write(claimed)
+        except (IntegrityError, DataError) as e:
+            if len(claimed) > 1:
+                # Ошибка в данных: делим батч пополам, пока не найдём виновные строки
+                middle = len(claimed) // 2
+                await self._persist(claimed[:middle])
+                await self._persist(claimed[middle:])
+                return
+            await self._retry_or_fail(claimed, e)
+            return
+        except Exception as e:
+            await self._retry_or_fail(claimed, e)
+            await asyncio.sleep(self.poll_seconds)
+            return
+
+        ids = [row_id for row_id, *_ in claimed]
+        for row in new_rows:
+            leaderboard_events.answer_recorded(row["survey_id"], row["answers"])
+        await self._call(self._finish, ids, "saved")
+        INGESTED.inc(len(ids), status="saved")
+        QUEUE_DEPTH.dec(len(ids))
+        now = time.time()
+        for *_, enqueued_at in claimed:
+            INGEST_LAG.observe(now - enqueued_at)
+
+    async def _write(self, claimed: list[tuple]) -> list[dict]:
+        """Write claimed rows to Postgres in one transaction; returns the rows that were not written before."""
+        rows = {}
+        tickets = {}
+        for _, ticket, payload, _, _ in claimed:
+            item = json.loads(payload)
+            row = item["row"]
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+            rows[(row["survey_id"], item["idempotency_key"])] = row
+            tickets[(row["survey_id"], item["idempotency_key"])] = ticket
+        async with AsyncSessionLocal() as db:
+            # Ключи идемпотентности: повтор батча после сбоя не создаёт дублей
+            inserted = await db.execute(
+                pg_insert(SurveyAnswerIdempotencyKey)
+                .values([
+                    {
+                        "survey_id": survey_id,
+                        "key": key,
+                        "created_at": datetime.now(),
+                        "response_status": 202,
+                        "response_body": queued_response_body(tickets[(survey_id, key)]),
+                    }
+                    for survey_id, key in rows
+                ])
+                .on_conflict_do_nothing(index_elements=["survey_id", "key"])
+                .returning(SurveyAnswerIdempotencyKey.survey_id, SurveyAnswerIdempotencyKey.key)
+            )
+            new_rows = [rows[(survey_id, key)] for survey_id, key in inserted]
+            if new_rows:
+                await db.execute(insert(SurveyAnswer.__table__).values(new_rows))
+                for survey_id, count in sorted(collections.Counter(row["survey_id"] for row in new_rows).items()):
+                    await SurveyDAO.increment_answers_count(survey_id, count, db)
+            await db.commit()
+        return new_rows
+
+    async def _retry_or_fail(self, claimed: list[tuple], error: Exception) -> None:
+        logger.error(f"Failed to persist {len(claimed)} queued answers: {str(error)}")
+        retry = [row_id for row_id, _, _, attempts, _ in claimed if attempts < self.max_attempts]
+        failed = [row_id for row_id, _, _, attempts, _ in claimed if attempts >= self.max_attempts]
+        if retry:
+            await self._call(self._finish, retry, "queued", str(error))
+        if failed:
+            await self._call(self._finish, failed, "failed", str(error))
+            INGESTED.inc(len(failed), status="failed")
+            QUEUE_DEPTH.dec(len(failed))
+
+
+answer_queue = DurableAnswerQueue(
+    path=settings.answer_queue_path,
+    batch_size=settings.answer_queue_batch_size,
+    poll_seconds=settings.answer_queue_poll_seconds,
+    max_attempts=settings.answer_queue_max_attempts,
+)
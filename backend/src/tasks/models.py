@@ -11,8 +11,8 @@ class User(BaseModel):
     id: int
     email: EmailStr
     name: str
-    created_at: datetime
-    updated_at: datetime
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
     tg_user_id: str | None = None
     tg_link_code: str | None = None
 
@@ -24,6 +24,10 @@ class Token(BaseModel):
     token_type: str
 
 
+class RefreshTokenIn(BaseModel):
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     email: str | None = None
 
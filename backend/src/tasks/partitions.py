@@ -0,0 +1,168 @@
+"""
+Maintenance of the monthly partitions of the survey_answers table.
+
+survey_answers is partitioned by RANGE (created_at), one partition per month
+named survey_answers_pYYYYMM, plus a DEFAULT partition as a safety net.
+Partitions are created ahead of time so inserts never land in the default one.
+If rows of a month did land there (a created_at far in the future, an import),
+CREATE ... PARTITION OF would fail on them, so the default partition is
+detached, the month's partition created, the rows moved and the default
+attached again, all in the caller's transaction. Old partitions can be
+detached and moved to an archive schema or dropped.
+A partition moved to the archive schema loses its foreign key to surveys:
+the key is inherited from the parent and would otherwise keep blocking the
+hard delete of surveys (src/tasks/purge.py) and of users.
+"""
+import logging
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "survey_answers"
+DEFAULT_PARTITION = "survey_answers_default"
+ARCHIVE_SCHEMA = "answers_archive"
+_PARTITION_RE = re.compile(r"^survey_answers_p(\d{4})(\d{2})$")
+# Ключ advisory-lock, чтобы несколько воркеров не создавали партиции одновременно
+_LOCK_KEY = "survey_answers_partitions"
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+async def list_answer_partitions(conn: AsyncConnection) -> list[tuple[str, date]]:
+    """Return (partition name, month) for every monthly partition, oldest first."""
+    result = await conn.execute(
+        text(
+            """
+            SELECT child.relname
+              FROM pg_inherits
+              JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+              JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+             WHERE parent.relname = :parent
+            """
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    partitions = []
+    for (name,) in result:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+async def ensure_answer_partitions(
+    conn: AsyncConnection,
+    months_ahead: int | None = None,
+    today: date | None = None,
+) -> list[str]:
+    """
+    Create partitions for the current month and `months_ahead` months after it.
+    Returns names of the partitions that were created.
+    """
+    if months_ahead is None:
+        months_ahead = settings.answer_partition_months_ahead
+    current = month_start(today or datetime.now().date())
+
+    await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": _LOCK_KEY})
+    existing = {name for name, _ in await list_answer_partitions(conn)}
+
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        await _create_partition(conn, name, month)
+        created.append(name)
+    return created
+
+
+async def _create_partition(conn: AsyncConnection, name: str, month: date) -> None:
+    start, end = month, add_months(month, 1)
+    bounds = {"start": start, "end": end}
+    create = text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    in_month = "created_at >= :start AND created_at < :end"
+    result = await conn.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+    moved = result.scalar()
+    if not moved:
+        await conn.execute(create)
+        logger.info(f"Created partition {name}")
+        return
+
+    # Строки месяца уже лежат в DEFAULT: без переноса CREATE ... PARTITION OF падает
+    await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    await conn.execute(create)
+    await conn.execute(text(f'INSERT INTO "{name}" SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}'), bounds)
+    await conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+    await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    logger.warning(f"Created partition {name} and moved {moved} rows into it from {DEFAULT_PARTITION}")
+
+
+async def drop_foreign_keys(conn: AsyncConnection, schema: str, table: str) -> None:
+    result = await conn.execute(
+        text(
+            """
+            SELECT con.conname
+              FROM pg_constraint con
+              JOIN pg_class rel ON rel.oid = con.conrelid
+              JOIN pg_namespace nsp ON nsp.oid = rel.relnamespace
+             WHERE con.contype = 'f' AND nsp.nspname = :schema AND rel.relname = :table
+            """
+        ),
+        {"schema": schema, "table": table},
+    )
+    for (constraint,) in result.all():
+        await conn.execute(text(f'ALTER TABLE {schema}."{table}" DROP CONSTRAINT "{constraint}"'))
+
+
+async def detach_answer_partitions(
+    conn: AsyncConnection,
+    older_than_months: int,
+    drop: bool = False,
+    today: date | None = None,
+) -> list[str]:
+    """
+    Detach partitions whose month ended more than `older_than_months` ago.
+    Detached partitions are moved to the answers_archive schema, or dropped if `drop` is set.
+    Returns names of the detached partitions.
+    """
+    cutoff = add_months(month_start(today or datetime.now().date()), -older_than_months)
+
+    await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": _LOCK_KEY})
+    if not drop:
+        await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+
+    detached = []
+    for name, month in await list_answer_partitions(conn):
+        if month >= cutoff:
+            break
+        await conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+        if drop:
+            await conn.execute(text(f'DROP TABLE "{name}"'))
+            logger.info(f"Dropped partition {name}")
+        else:
+            await conn.execute(text(f'ALTER TABLE "{name}" SET SCHEMA {ARCHIVE_SCHEMA}'))
+            await drop_foreign_keys(conn, ARCHIVE_SCHEMA, name)
+            logger.info(f"Detached partition {name} into schema {ARCHIVE_SCHEMA}")
+        detached.append(name)
+    return detached
@@ -0,0 +1,120 @@
+"""
+Static snapshots of public survey definitions.
+
+When PUBLIC_SURVEY_SNAPSHOT_DIR is set, active surveys are published as
+<public_id>.json and <public_id>.json.gz in that directory. The body is the
+same as GET /api/surveys/s/{public_id}, including its "version". The reverse
+proxy serves the file directly and proxies to the API when there is no file
+(Caddyfile, nginx/nginx.conf).
+
+Create, update, restore and template creation publish a snapshot. Archive
+and delete unpublish it. A snapshot is written to a temporary file and then
+renamed into place, so the proxy never serves a partial file. A snapshot
+whose version is already on disk is not rewritten, so its mtime (and the
+proxy's ETag/Last-Modified) stays the same across republishing. The
+publish-surveys CLI command rebuilds the whole directory.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import tempfile
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.tasks.schema import Survey
+from src.tasks.survey_cache import encode_public_survey
+
+logger = logging.getLogger(__name__)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _snapshot_path(public_id: str) -> str:
+    return os.path.join(settings.public_survey_snapshot_dir, f"{public_id}.json")
+
+
+def _published_version(path: str) -> str | None:
+    try:
+        with open(path, "rb") as f:
+            return json.load(f).get("version")
+    except (OSError, ValueError):
+        return None
+
+
+def _publish(public_id: str, topic: str, questions: list[Any]) -> None:
+    os.makedirs(settings.public_survey_snapshot_dir, exist_ok=True)
+    version, body = encode_public_survey(topic, questions)
+    path = _snapshot_path(public_id)
+    if _published_version(path) == version and os.path.exists(f"{path}.gz"):
+        return
+    # Сначала .gz: прокси выбирает его только при наличии несжатого файла той же версии
+    _write_atomic(f"{path}.gz", gzip.compress(body, compresslevel=9, mtime=0))
+    _write_atomic(path, body)
+
+
+def _unpublish(public_id: str) -> None:
+    path = _snapshot_path(public_id)
+    # Сначала .json: без него прокси уходит в API и не смотрит на .gz
+    for name in (path, f"{path}.gz"):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+async def publish_survey(public_id: str, topic: str, questions: list[Any]) -> None:
+    """Write the snapshot of an active survey. Errors are logged: the API remains the fallback."""
+    if not settings.public_survey_snapshot_dir:
+        return
+    try:
+        await asyncio.to_thread(_publish, public_id, topic, questions)
+    except OSError as e:
+        logger.error(f"Failed to publish survey {public_id}: {str(e)}")
+
+
+async def unpublish_survey(public_id: str) -> None:
+    if not settings.public_survey_snapshot_dir:
+        return
+    try:
+        await asyncio.to_thread(_unpublish, public_id)
+    except OSError as e:
+        logger.error(f"Failed to unpublish survey {public_id}: {str(e)}")
+
+
+async def republish_all(db: AsyncSession) -> tuple[int, int]:
+    """
+    Publish every active survey and remove snapshots of everything else.
+    Returns (published, removed).
+    """
+    result = await db.execute(
+        select(Survey.public_id, Survey.topic, Survey.questions).where(
+            Survey.archived == False, Survey.deleted_at.is_(None)
+        )
+    )
+    active = {public_id: (topic, json.loads(questions)) for public_id, topic, questions in result}
+    for public_id, (topic, questions) in active.items():
+        await asyncio.to_thread(_publish, public_id, topic, questions)
+
+    stale = set()
+    for name in await asyncio.to_thread(os.listdir, settings.public_survey_snapshot_dir):
+        public_id = name.removesuffix(".gz").removesuffix(".json")
+        if name.endswith((".json", ".json.gz")) and public_id not in active:
+            stale.add(public_id)
+    for public_id in stale:
+        await asyncio.to_thread(_unpublish, public_id)
+    return len(active), len(stale)
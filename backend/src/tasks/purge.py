@@ -0,0 +1,179 @@
+"""
+Background purger for soft-deleted surveys.
+
+delete_survey only sets surveys.deleted_at. This purger then removes the
+survey's answers in bounded batches, one short transaction per batch, with a
+pause between batches. It deletes the survey row itself once no answers are
+left. All of its state is in the database (deleted_at plus the remaining
+rows), so it resumes where it stopped after a restart. Archived answer files
+(src/tasks/archive.py) are removed together with the survey row. answers_count is
+decremented per batch and doubles as the progress indicator. A transaction
+advisory lock keeps several workers from purging the same batch.
+
+A survey whose purge step fails is not retried on every poll: purge_attempts
+is incremented and purge_retry_at pushed out exponentially (poll interval
+doubled per attempt, up to survey_purge_max_backoff_seconds), and the purger
+moves on to the next survey. A purged survey leaves a survey_purges row so
+GET /{survey_id}/deletion-status can tell its owner the purge finished.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.metrics import Counter, Gauge
+from src.tasks.archive_store import get_archive_store
+from src.tasks.crud import SurveyDAO
+from src.tasks.schema import Survey, SurveyAnswer, SurveyAnswerIdempotencyKey, SurveyPurge, SurveyResponseInProgress
+
+logger = logging.getLogger(__name__)
+
+PURGED_ANSWERS = Counter("survey_purge_deleted_answers_total", "Answers removed by the survey purger")
+PURGED_SURVEYS = Counter("survey_purge_deleted_surveys_total", "Soft-deleted surveys fully purged")
+PENDING_SURVEYS = Gauge("survey_purge_pending_surveys", "Soft-deleted surveys waiting to be purged")
+PURGE_FAILURES = Counter("survey_purge_failures_total", "Purge steps that failed and were postponed")
+
+_LOCK_KEY = "survey_purge"
+
+
+async def delete_answers_batch(
+    survey_id: int, batch_size: int, db: AsyncSession, adjust_count: bool = True, max_id: int | None = None
+) -> int:
+    """
+    Delete up to `batch_size` answers of a survey (only ids <= max_id, if given)
+    in the caller's transaction. Returns the number of deleted rows.
+    """
+    batch_ids = select(SurveyAnswer.id).where(SurveyAnswer.survey_id == survey_id)
+    if max_id is not None:
+        batch_ids = batch_ids.where(SurveyAnswer.id <= max_id)
+    batch_ids = batch_ids.limit(batch_size).scalar_subquery()
+    result = await db.execute(
+        delete(SurveyAnswer)
+        .where(SurveyAnswer.survey_id == survey_id, SurveyAnswer.id.in_(batch_ids))
+        .execution_options(synchronize_session=False)
+    )
+    deleted = result.rowcount or 0
+    if deleted and adjust_count:
+        await SurveyDAO.increment_answers_count(survey_id, -deleted, db)
+    return deleted
+
+
+async def delete_survey_dependents(survey_id: int, db: AsyncSession) -> None:
+    """Delete small per-survey rows that reference the survey (everything except answers)."""
+    await db.execute(delete(SurveyAnswerIdempotencyKey).where(SurveyAnswerIdempotencyKey.survey_id == survey_id))
+    await db.execute(delete(SurveyResponseInProgress).where(SurveyResponseInProgress.survey_id == survey_id))
+
+
+class SurveyPurger:
+    def __init__(self, batch_size: int, batch_delay_ms: int, poll_seconds: float, max_backoff_seconds: float):
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay_ms / 1000
+        self.poll_seconds = poll_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._task: asyncio.Task | None = None
+
+    async def purge_step(self) -> bool:
+        """
+        Process one batch of the oldest soft-deleted survey that is not waiting
+        for a retry. Returns True if there may be more work right away.
+        """
+        async with AsyncSessionLocal() as db:
+            locked = await db.scalar(text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"), {"key": _LOCK_KEY})
+            if not locked:
+                return False
+            PENDING_SURVEYS.set(
+                await db.scalar(select(func.count(Survey.id)).where(Survey.deleted_at.is_not(None))) or 0
+            )
+            pending = await db.scalar(
+                select(Survey.id)
+                .where(
+                    Survey.deleted_at.is_not(None),
+                    or_(Survey.purge_retry_at.is_(None), Survey.purge_retry_at <= datetime.now()),
+                )
+                .order_by(Survey.deleted_at)
+                .limit(1)
+            )
+            if pending is None:
+                return False
+            try:
+                return await self._purge_batch(pending, db)
+            except Exception as e:
+                # Сбойный опрос не должен блокировать остальные — откладываем его с нарастающей паузой
+                await db.rollback()
+                await self._postpone(pending, db)
+                logger.error(f"Purge of survey {pending} failed, postponed: {str(e)}")
+                return True
+
+    async def _purge_batch(self, pending: int, db: AsyncSession) -> bool:
+        deleted = await delete_answers_batch(pending, self.batch_size, db)
+        if deleted:
+            await db.commit()
+            PURGED_ANSWERS.inc(deleted)
+            remaining = await db.scalar(select(Survey.answers_count).where(Survey.id == pending))
+            logger.info(f"Purged {deleted} answers of survey {pending}, ~{remaining} remaining")
+            return True
+
+        await delete_survey_dependents(pending, db)
+        survey = (await db.execute(
+            select(Survey.user_id, Survey.deleted_at, Survey.answers_archive_uri).where(Survey.id == pending)
+        )).one()
+        if survey.answers_archive_uri:
+            await get_archive_store().delete_prefix(survey.answers_archive_uri)
+        db.add(SurveyPurge(
+            survey_id=pending, user_id=survey.user_id, deleted_at=survey.deleted_at, purged_at=datetime.now()
+        ))
+        await db.execute(delete(Survey).where(Survey.id == pending))
+        await db.commit()
+        PURGED_SURVEYS.inc()
+        logger.info(f"Survey {pending} purged")
+        return True
+
+    async def _postpone(self, survey_id: int, db: AsyncSession) -> None:
+        attempts = (await db.scalar(select(Survey.purge_attempts).where(Survey.id == survey_id)) or 0) + 1
+        backoff = min(self.poll_seconds * 2 ** min(attempts, 20), self.max_backoff_seconds)
+        await db.execute(
+            update(Survey)
+            .where(Survey.id == survey_id)
+            .values(purge_attempts=attempts, purge_retry_at=datetime.now() + timedelta(seconds=backoff))
+        )
+        await db.commit()
+        PURGE_FAILURES.inc()
+
+    async def run_until_idle(self) -> None:
+        while await self.purge_step():
+            await asyncio.sleep(self.batch_delay)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_until_idle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Survey purge failed: {str(e)}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+survey_purger = SurveyPurger(
+    batch_size=settings.survey_purge_batch_size,
+    batch_delay_ms=settings.survey_purge_batch_delay_ms,
+    poll_seconds=settings.survey_purge_poll_seconds,
+    max_backoff_seconds=settings.survey_purge_max_backoff_seconds,
+)
@@ -0,0 +1,112 @@
+"""
+Respondent session store used by the follow-up subagent.
+
+The follow-up subagent keeps followup_count in a session dict. The store
+persists that dict per respondent and survey, so followup_limit caps
+follow-ups (and their LLM calls) across requests instead of per request.
+
+A respondent is identified, in order of preference, by:
+  - a random token in the signed session cookie (web client);
+  - the respondent_id sent by the client (Telegram bot);
+  - the client IP (the real one, uvicorn runs with --proxy-headers). A token
+    cookie is issued at the same time and the session is stored under both
+    the new token and the IP, so the browser's next request (token) sees this
+    request's count, and a client that drops cookies (a new token every time)
+    is still read from the IP key and stays capped.
+
+Backends:
+  - "memory": per worker process, LRU-bounded, entries expire after the TTL;
+  - "redis": shared by all workers (REDIS_URL), the TTL is the key expiry.
+"""
+import json
+import secrets
+import time
+from collections import OrderedDict
+
+from starlette.requests import Request
+
+from src.config import settings
+from src.metrics import Gauge
+from src.redis import get_redis
+
+SESSION_COOKIE_KEY = "respondent_token"
+
+MEMORY_SESSIONS = Gauge("respondent_sessions_in_memory", "Respondent sessions held by the in-memory store")
+
+
+def respondent_session_keys(public_id: str, request: Request | None, respondent_id: str | None = None) -> list[str]:
+    """Keys of the respondent's session: it is read from the first one that exists and written to all."""
+    has_session = request is not None and "session" in request.scope
+    token = request.session.get(SESSION_COOKIE_KEY) if has_session else None
+    if token:
+        return [f"{public_id}:t:{token}"]
+    if respondent_id:
+        return [f"{public_id}:r:{respondent_id}"]
+    ip = request.client.host if request is not None and request.client else "unknown"
+    if has_session:
+        new_token = secrets.token_urlsafe(16)
+        request.session[SESSION_COOKIE_KEY] = new_token
+        return [f"{public_id}:t:{new_token}", f"{public_id}:ip:{ip}"]
+    return [f"{public_id}:ip:{ip}"]
+
+
+async def load_respondent_session(keys: list[str]) -> dict:
+    for key in keys:
+        session = await respondent_sessions.get(key)
+        if session:
+            return session
+    return {}
+
+
+async def save_respondent_session(keys: list[str], session: dict) -> None:
+    for key in keys:
+        await respondent_sessions.set(key, session)
+
+
+class MemorySessionStore:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._sessions: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        MEMORY_SESSIONS.set_function(lambda: len(self._sessions))
+
+    async def get(self, key: str) -> dict:
+        item = self._sessions.get(key)
+        if item is None:
+            return {}
+        expires_at, data = item
+        if expires_at <= time.monotonic():
+            del self._sessions[key]
+            return {}
+        return dict(data)
+
+    async def set(self, key: str, data: dict) -> None:
+        self._sessions[key] = (time.monotonic() + self.ttl_seconds, dict(data))
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+
+class RedisSessionStore:
+    def __init__(self, redis, ttl_seconds: float):
+        self.redis = redis
+        self.ttl_seconds = int(ttl_seconds)
+
+    async def get(self, key: str) -> dict:
+        value = await self.redis.get(f"rs:{key}")
+        return json.loads(value) if value else {}
+
+    async def set(self, key: str, data: dict) -> None:
+        await self.redis.set(f"rs:{key}", json.dumps(data), ex=self.ttl_seconds)
+
+
+def _create_store():
+    if settings.respondent_session_backend == "redis":
+        redis = get_redis()
+        if redis is None:
+            raise RuntimeError("RESPONDENT_SESSION_BACKEND=redis requires REDIS_URL")
+        return RedisSessionStore(redis, settings.respondent_session_ttl_seconds)
+    return MemorySessionStore(settings.respondent_session_ttl_seconds, settings.respondent_session_max_entries)
+
+
+respondent_sessions = _create_store()
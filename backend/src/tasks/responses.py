@@ -0,0 +1,142 @@
+"""
+Question-by-question responses.
+
+Instead of sending the whole answers list at the end, a client starts a
+response, gets a respondent token and sends one answer per call. The server
+keeps the answers collected so far in survey_responses_in_progress. Each
+call validates only the new answer, and the follow-up check only looks at
+that answer. The follow-up counter is stored with the response, so
+followup_limit holds across calls.
+
+A response becomes a regular survey_answers row once the last question is
+answered, or when the client completes it early. The in-progress row stays
+with completed_at set, so unfinished rows show where respondents drop off.
+"""
+import json
+import secrets
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import JSON, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.tasks.crud import SurveyDAO
+from src.tasks.dedup import respondent_hash
+from src.tasks.schema import SurveyAnswer, SurveyResponseInProgress
+from src.tasks.validation import AnswerValidationError, validate_answer
+
+
+def new_respondent_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+async def get_response(
+    survey_id: int, token: str, db: AsyncSession, for_update: bool = False
+) -> SurveyResponseInProgress | None:
+    query = select(SurveyResponseInProgress).where(
+        SurveyResponseInProgress.survey_id == survey_id,
+        SurveyResponseInProgress.respondent_token == token,
+    )
+    if for_update:
+        # Параллельные ответы одного респондента применяются по очереди;
+        # populate_existing — строка могла измениться после чтения без блокировки
+        query = query.with_for_update().execution_options(populate_existing=True)
+    return (await db.execute(query)).scalar_one_or_none()
+
+
+def merge_answer(response: SurveyResponseInProgress, questions: list[Any], index: int, answer: Any) -> list[Any]:
+    """
+    Validate the answer to question `index` and return the response's answers with it,
+    without changing the response. Answering the next question appends; answering an
+    earlier one replaces it. Raises AnswerValidationError.
+    """
+    answers = json.loads(response.answers)
+    if not 0 <= index < len(questions):
+        raise AnswerValidationError(f"question index must be between 0 and {len(questions) - 1}")
+    if index > len(answers):
+        raise AnswerValidationError(f"answer question {len(answers) + 1} first")
+    validate_answer(questions[index], answer, index)
+    if index == len(answers):
+        answers.append(answer)
+    else:
+        answers[index] = answer
+    return answers
+
+
+def set_answer(response: SurveyResponseInProgress, questions: list[Any], index: int, answer: Any) -> list[Any]:
+    """Validate and store the answer to question `index` (see merge_answer). Raises AnswerValidationError."""
+    answers = merge_answer(response, questions, index, answer)
+    response.answers = json.dumps(answers)
+    response.updated_at = datetime.now()
+    return answers
+
+
+async def complete_response(
+    response: SurveyResponseInProgress, public_id: str, db: AsyncSession
+) -> SurveyAnswer | None:
+    """
+    Turn the response into a survey_answers row in the caller's transaction.
+    Returns None if it was already completed. Raises AnswerValidationError if
+    nothing was answered yet.
+    """
+    if response.completed_at is not None:
+        return None
+    if not json.loads(response.answers):
+        raise AnswerValidationError("answer at least one question first")
+    now = datetime.now()
+    answer = SurveyAnswer(
+        survey_id=response.survey_id,
+        public_id=public_id,
+        answers=response.answers,
+        respondent_id=response.respondent_id,
+        ip=response.ip,
+        respondent_hash=respondent_hash(response.respondent_id, response.ip),
+        created_at=now,
+    )
+    db.add(answer)
+    await SurveyDAO.increment_answers_count(response.survey_id, 1, db)
+    response.completed_at = now
+    response.updated_at = now
+    return answer
+
+
+async def drop_off_stats(survey_id: int, question_count: int, db: AsyncSession) -> dict:
+    """
+    Funnel of question-by-question responses: how many were started and completed,
+    how many answered each question, and where unfinished responses stopped.
+    """
+    answered = func.json_array_length(SurveyResponseInProgress.answers.cast(JSON))
+    completed = SurveyResponseInProgress.completed_at.is_not(None)
+    result = await db.execute(
+        select(answered, completed, func.count())
+        .where(SurveyResponseInProgress.survey_id == survey_id)
+        .group_by(answered, completed)
+    )
+
+    started = 0
+    finished = 0
+    answered_per_question = [0] * question_count
+    stopped_after = [0] * (question_count + 1)  # stopped_after[i]: unfinished with i answers
+    for answers_count, is_completed, count in result:
+        started += count
+        if is_completed:
+            finished += count
+        else:
+            stopped_after[min(answers_count, question_count)] += count
+        for i in range(min(answers_count, question_count)):
+            answered_per_question[i] += count
+
+    return {
+        "started": started,
+        "completed": finished,
+        "completion_rate": round(finished / started * 100, 2) if started else None,
+        "questions": [
+            {
+                "index": i,
+                "answered": answered_per_question[i],
+                "dropped_after": stopped_after[i + 1],
+            }
+            for i in range(question_count)
+        ],
+        "dropped_before_first_answer": stopped_after[0],
+    }
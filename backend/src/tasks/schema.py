@@ -1,7 +1,7 @@
 from datetime import datetime
 import secrets
 
-from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Text, Boolean, JSON
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Text, Boolean, JSON, Index, UniqueConstraint, func
 
 from src.database import Base
 
@@ -18,6 +18,8 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.now)
     tg_user_id = Column(String, unique=True, index=True, nullable=True)
     tg_link_code = Column(String, unique=True, index=True, nullable=True)
+    # Последний «выход со всех устройств»; старые токены без срока после него не обмениваются
+    sessions_revoked_at = Column(DateTime, nullable=True)
 
 
 class Survey(Base):
@@ -30,10 +32,38 @@ class Survey(Base):
     created_at = Column(DateTime, default=datetime.now)
     public_id = Column(String, unique=True, index=True, nullable=False, default=lambda: secrets.token_urlsafe(6))
     archived = Column(Boolean, default=False, nullable=False)
+    answers_count = Column(Integer, default=0, server_default="0", nullable=False)  # Counter cache of survey_answers rows
+    deleted_at = Column(DateTime, nullable=True, index=True)  # Soft delete; rows are purged in the background
+    purge_attempts = Column(Integer, default=0, server_default="0", nullable=False)  # Failed purge attempts so far
+    purge_retry_at = Column(DateTime, nullable=True)  # After a failed purge attempt: not before this time
+    archived_at = Column(DateTime, nullable=True)  # When the survey was last archived
+    answers_archive_uri = Column(String, nullable=True)  # Prefix of the cold-storage Parquet parts, see src/tasks/archive.py
+    answers_archived_through_id = Column(Integer, nullable=True)  # Answers with id <= this are in cold storage
+    # Опросы-шаблоны «отзыв о приложении» (src/assistant/template_survey.py), участвуют в лидерборде
+    is_template_survey = Column(Boolean, default=False, server_default="false", nullable=False, index=True)
+    app_name = Column(String, nullable=True)
+    app_purpose = Column(Text, nullable=True)
+    app_functionality = Column(Text, nullable=True)
+
+
+class SurveyPurge(Base):
+    """Record of a purged survey, so its owner can still see that the purge finished."""
+    __tablename__ = "survey_purges"
+
+    survey_id = Column(Integer, primary_key=True)  # Без внешнего ключа: строки опроса уже нет
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    deleted_at = Column(DateTime, nullable=True)
+    purged_at = Column(DateTime, default=datetime.now, nullable=False)
 
 
 class SurveyAnswer(Base):
     __tablename__ = "survey_answers"
+    # Таблица партиционирована по месяцам (см. src/tasks/partitions.py).
+    # В БД первичный ключ (id, created_at), для ORM достаточно id — он уникален за счёт sequence.
+    __table_args__ = (
+        Index("ix_survey_answers_survey_id_respondent_hash", "survey_id", "respondent_hash"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False, index=True)
@@ -41,5 +71,64 @@ class SurveyAnswer(Base):
     answers = Column(Text, nullable=False)  # Store as JSON string
     respondent_id = Column(String, nullable=True)
     ip = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.now)
+    respondent_hash = Column(String(64), nullable=True)  # sha256 of respondent_id or ip, for duplicate checks
+    created_at = Column(DateTime, default=datetime.now, server_default=func.now(), nullable=False)
+
+
+class SurveyAnswerIdempotencyKey(Base):
+    """
+    Idempotency keys of answer submissions. Kept in a separate table because a unique
+    index on the partitioned survey_answers table would have to include created_at.
+    """
+    __tablename__ = "survey_answer_idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("survey_id", "key", name="uq_survey_answer_idempotency_keys_survey_id_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    # Ответ на исходный запрос; повтор с тем же ключом получает его же
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+
+
+
+class SurveyResponseInProgress(Base):
+    """
+    A response being filled in question by question (see src/tasks/responses.py).
+    Rows stay after completion (completed_at is set) for drop-off analytics.
+    """
+    __tablename__ = "survey_responses_in_progress"
+    __table_args__ = (
+        UniqueConstraint("survey_id", "respondent_token", name="uq_survey_responses_in_progress_survey_id_token"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False, index=True)
+    respondent_token = Column(String(64), nullable=False)
+    respondent_id = Column(String, nullable=True)
+    ip = Column(String, nullable=True)
+    answers = Column(Text, nullable=False, default="[]")  # JSON list, by question index
+    followup_count = Column(Integer, default=0, nullable=False)
+    started_at = Column(DateTime, default=datetime.now, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+
+class RefreshToken(Base):
+    """
+    Server-side refresh token (see src/auth/tokens.py). Only the SHA-256 of the
+    token is stored. Each refresh revokes the presented token and issues a new one
+    in the same family; presenting a revoked token revokes the whole family.
+    """
+    __tablename__ = "refresh_tokens"
 
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
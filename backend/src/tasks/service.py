@@ -11,7 +11,9 @@ from src.auth.exceptions import (InvalidCredentialsException,
                              UserAlreadyExistsException)
 from src.tasks.models import UserCredentials
 from src.tasks.schema import User as DBUser
-from src.auth.utils import create_access_token, get_password_hash, verify_password
+from src.auth.revocation import revoke_user_access_tokens
+from src.auth.tokens import issue_tokens, revoke_user_sessions
+from src.auth.utils import create_user_access_token, hash_password, verify_and_update_password
 
 
 class AuthService:
@@ -22,18 +24,18 @@ class AuthService:
         db: AsyncSession
     ) -> Dict[str, str]:
         user = await UserDAO.get_user_by_email(email, db)
-
-        if not user or not verify_password(password, user.hashed_password):
+        if not user:
             raise InvalidCredentialsException()
 
-        access_token = create_access_token(
-            data={"sub": user.email}
-        )
+        valid, new_hash = await verify_and_update_password(password, user.hashed_password)
+        if not valid:
+            raise InvalidCredentialsException()
+        if new_hash:
+            # Параметры хэширования изменились — сохраняем хэш с текущими
+            user.hashed_password = new_hash
+            await UserDAO.update_user(user, db)
 
-        return {
-            "access_token": access_token,
-            "token_type": "bearer"
-        }
+        return await issue_tokens(user, db)
 
     @staticmethod
     async def register_user(
@@ -42,14 +44,14 @@ class AuthService:
     ) -> Dict[str, str]:
         """
         Register a new user.
-        Returns access token if successful.
+        Returns access and refresh tokens if successful.
         """
         # Check if user already exists
         if await UserDAO.user_exists(credentials.email, db):
             raise UserAlreadyExistsException(credentials.email)
 
         # Create new user
-        hashed_password = get_password_hash(credentials.password)
+        hashed_password = await hash_password(credentials.password)
         new_user = DBUser(
             email=credentials.email,
             hashed_password=hashed_password,
@@ -58,16 +60,7 @@ class AuthService:
 
         created_user = await UserDAO.create_user(new_user, db)
 
-        # Generate access token
-        access_token = create_access_token(
-            data={"sub": created_user.email}
-        )
-
-        return {
-            "access_token": access_token,
-            "token_type": "bearer",
-            "refresh_token": ""  # or generate if you use refresh tokens
-        }
+        return await issue_tokens(created_user, db)
 
     @staticmethod
     async def get_user_profile(user_id: int, db: AsyncSession) -> DBUser:
@@ -82,18 +75,23 @@ class AuthService:
     ) -> bool:
         """Update user password."""
         user = await UserDAO.get_user_by_id_or_raise(user_id, db)
-        user.hashed_password = get_password_hash(new_password)
+        user.hashed_password = await hash_password(new_password)
         await UserDAO.update_user(user, db)
+        # Старый пароль мог утечь — завершаем все сессии
+        await revoke_user_sessions(user_id, db)
         return True
 
     @staticmethod
     async def delete_user_account(user_id: int, db: AsyncSession) -> bool:
         """Delete user account."""
         user = await UserDAO.get_user_by_id_or_raise(user_id, db)
-        return await UserDAO.delete_user(user, db)
+        deleted = await UserDAO.delete_user(user, db)
+        # Refresh-токены удаляются каскадом, уже выданные access-токены — через denylist
+        await revoke_user_access_tokens(user_id)
+        return deleted
     
     @staticmethod
     async def create_access_token(user_id: int, db: AsyncSession) -> str:
         """Create access token for user."""
         user = await UserDAO.get_user_by_id_or_raise(user_id, db)
-        return create_access_token(data={"sub": user.email})
\ No newline at end of file
+        return create_user_access_token(user)
\ No newline at end of file
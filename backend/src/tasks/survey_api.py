@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, Body, HTTPException, Request
+from fastapi import APIRouter, Depends, Body, HTTPException, Request, Query, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.auth.dependencies import get_current_user
-from src.database import get_async_db
+from src.database import get_async_db, get_read_db
 from src.tasks.models import SurveyCreate, SurveyOut, User
 from src.tasks.crud import SurveyDAO
-from src.tasks.schema import Survey, SurveyAnswer
+from src.tasks.schema import Survey, SurveyAnswer, SurveyAnswerIdempotencyKey, SurveyPurge, SurveyResponseInProgress
 from src.assistant.openai_assistant import (
     ai_generate_first_question, 
     ai_generate_followup_question, 
@@ -13,28 +13,64 @@ from src.assistant.openai_assistant import (
     ai_generate_advanced_questions_for_context,
     ai_is_meaningful_context
 )
+import asyncio
 import json
 from pydantic import BaseModel
 from typing import Any
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from collections import Counter
 from src.leaderboard.api import broadcast_leaderboard_update
+from src.leaderboard.events import leaderboard_events
+from src.leaderboard.ranking import leaderboard_ranking
 import os
-from src.assistant.followup_subagent import followup_subagent
+from src.assistant.followup_subagent import followup_subagent, may_need_followup
+from src.tasks.bulk_import import BulkAnswerImporter, IMPORT_FORMATS, ImportNotAllowedError, iter_lines
+from src.tasks.answer_buffer import answer_buffer, BufferFlushError, BufferFullError
+from src.tasks.ingest_queue import QUEUED_ANSWER_MESSAGE, answer_queue, answer_ticket, queued_response_body
+from src.tasks.validation import AnswerValidationError, validate_answers
+from src.tasks.respondent_sessions import load_respondent_session, respondent_session_keys, save_respondent_session
+from src.tasks.responses import (
+    complete_response, drop_off_stats, get_response, merge_answer, new_respondent_token, set_answer
+)
+from src.tasks.dedup import respondent_deduplicator, respondent_hash
+from src.tasks.archive import load_survey_answers
+from src.tasks.survey_cache import invalidate_public_survey, public_survey_cache
+from src.tasks.publish import publish_survey, unpublish_survey
+from src.config import settings
+from src.responses import trusted_json
+from datetime import datetime
 
 router = APIRouter(tags=["surveys"])
 
 class PublicSurveyOut(BaseModel):
     topic: str
     questions: list[Any]
+    version: str  # Hash of the definition; also the ETag
 
 class PublicSurveyAnswerIn(BaseModel):
     answers: list[str]
     respondent_id: str | None = None  # Optional, for future
+    idempotency_key: str | None = None  # Alternative to the Idempotency-Key header
 
 class PublicSurveyAnswerOut(BaseModel):
     ok: bool
     message: str
+    ticket: str | None = None  # Set when the answer was queued (202), see /s/{public_id}/answer-status/{ticket}
+
+class ResponseStartIn(BaseModel):
+    respondent_id: str | None = None
+
+class ResponseAnswerIn(BaseModel):
+    answer: Any
+
+class ResponseStateOut(BaseModel):
+    respondent_token: str
+    answers: list[Any]
+    next_index: int
+    completed: bool
+    action: str = "next"  # next | followup
+    message: str | None = None
 
 class GenerateQuestionIn(BaseModel):
     topic: str
@@ -56,6 +92,11 @@ class ValidateContextOut(BaseModel):
     is_valid: bool
     reason: str | None = None
 
+class AnswerImportOut(BaseModel):
+    imported: int
+    rejected: int
+    errors: list[str]
+
 class SurveyAnalytics(BaseModel):
     total_responses: int
     question_analytics: dict[str, Any]
@@ -83,6 +124,7 @@ async def create_survey(
             detail="У вас уже есть активный опрос. Пожалуйста, архивируйте его перед созданием нового."
         )
     survey_obj = await SurveyDAO.create_survey(current_user.id, survey.topic, survey.questions, db)
+    await publish_survey(survey_obj.public_id, survey_obj.topic, survey_obj.questions)
     frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
     public_url = f"{frontend_url}/s/{survey_obj.public_id}"
     # Return all SurveyOut fields plus public_url
@@ -92,45 +134,27 @@ async def create_survey(
 async def list_surveys(
     archived: bool = None,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    # Subquery to count answers for each survey
-    answers_count_subquery = (
-        select(
-            SurveyAnswer.survey_id,
-            func.count(SurveyAnswer.id).label("answers_count")
-        )
-        .group_by(SurveyAnswer.survey_id)
-        .subquery()
-    )
-
-    # Main query to select surveys and join with the answer count
-    query = (
-        select(
-            Survey.__table__,
-            answers_count_subquery.c.answers_count
-        )
-        .outerjoin(answers_count_subquery, Survey.id == answers_count_subquery.c.survey_id)
-        .where(Survey.user_id == current_user.id)
-    )
-    
+    # answers_count — счётчик в самой таблице surveys, агрегировать survey_answers не нужно
+    query = select(Survey).where(Survey.user_id == current_user.id, Survey.deleted_at.is_(None))
     if archived is not None:
         query = query.where(Survey.archived == archived)
-        
+
     result = await db.execute(query)
-    surveys = result.fetchall()
-    
-    return [
-        SurveyOut(
-            id=s.id,
-            topic=s.topic,
-            questions=json.loads(s.questions),
-            created_at=s.created_at,
-            public_id=s.public_id,
-            archived=s.archived,
-            answers_count=s.answers_count or 0,
-        ) for s in surveys
-    ]
+    surveys = result.scalars().all()
+
+    return trusted_json([
+        {
+            "id": s.id,
+            "topic": s.topic,
+            "questions": json.loads(s.questions),
+            "created_at": s.created_at,
+            "public_id": s.public_id,
+            "archived": s.archived,
+            "answers_count": s.answers_count or 0,
+        } for s in surveys
+    ])
 
 @router.delete("/{survey_id}")
 async def delete_survey(
@@ -139,16 +163,43 @@ async def delete_survey(
     db: AsyncSession = Depends(get_async_db)
 ):
     survey = await db.get(Survey, survey_id)
-    if not survey or survey.user_id != current_user.id:
+    if not survey or survey.user_id != current_user.id or survey.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Survey not found")
-    # Удаляем все связанные ответы
-    await db.execute(
-        SurveyAnswer.__table__.delete().where(SurveyAnswer.survey_id == survey_id)
-    )
-    await db.delete(survey)
+    # Мягкое удаление: опрос сразу скрыт, ответы удаляет фоновый purger (src/tasks/purge.py)
+    survey.deleted_at = datetime.now()
+    survey.archived = True
+    survey.archived_at = survey.archived_at or survey.deleted_at
     await db.commit()
+    respondent_deduplicator.forget_survey(survey_id)
+    await invalidate_public_survey(survey.public_id)
+    if leaderboard_ranking.is_ranked(survey_id):
+        leaderboard_ranking.remove_app(survey_id)
+        await leaderboard_events.apps_changed()
+    await unpublish_survey(survey.public_id)
     return {"ok": True}
 
+@router.get("/{survey_id}/deletion-status")
+async def get_survey_deletion_status(
+    survey_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Progress of the background purge of a deleted survey."""
+    survey = await db.get(Survey, survey_id)
+    if not survey:
+        purge = await db.get(SurveyPurge, survey_id)
+        if not purge or purge.user_id != current_user.id:
+            raise HTTPException(status_code=404, detail="Survey not found")
+        return {"deleted": True, "purged": True, "remaining_answers": 0}
+    if survey.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    return {
+        "deleted": survey.deleted_at is not None,
+        "purged": False,
+        "remaining_answers": survey.answers_count,
+        "purge_attempts": survey.purge_attempts,
+    }
+
 @router.get("/{survey_id}", response_model=SurveyOut)
 async def get_survey(
     survey_id: int,
@@ -156,7 +207,7 @@ async def get_survey(
     db: AsyncSession = Depends(get_async_db)
 ):
     survey = await db.get(Survey, survey_id)
-    if not survey or survey.user_id != current_user.id:
+    if not survey or survey.user_id != current_user.id or survey.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Survey not found")
     return SurveyOut(
         id=survey.id,
@@ -165,82 +216,163 @@ async def get_survey(
         created_at=survey.created_at,
         public_id=survey.public_id,
         archived=survey.archived,
+        answers_count=survey.answers_count,
     )
 
 @router.get("/s/{public_id}", response_model=PublicSurveyOut)
 async def get_public_survey(
     public_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_async_db)
 ):
-    result = await db.execute(
-        Survey.__table__.select().where(Survey.public_id == public_id)
-    )
-    survey = result.first()
+    survey = await public_survey_cache.get(public_id, db)
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
-    survey = survey._mapping  # SQLAlchemy 2.x returns Row, get dict-like
-    return PublicSurveyOut(
-        topic=survey["topic"],
-        questions=json.loads(survey["questions"])
+    # Тело ответа закодировано заранее; клиенты без изменений получают 304
+    gzip_encoded = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": survey.gzip_etag if gzip_encoded else survey.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if survey.etag_matches(request.headers.get("if-none-match"), gzip_encoded):
+        return Response(status_code=304, headers=headers)
+    if gzip_encoded:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=survey.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=survey.body, media_type="application/json", headers=headers)
+
+SAVED_ANSWER_RESPONSE = PublicSurveyAnswerOut(ok=True, message="Ответ успешно сохранён!")
+
+
+async def _replay_answer_response(survey_id: int, idempotency_key: str, db: AsyncSession) -> Response | None:
+    """The response to an earlier submission with this Idempotency-Key, or None if there was none."""
+    ticket = answer_ticket(survey_id, idempotency_key)
+    if answer_queue.running and await answer_queue.status(ticket) is not None:
+        # Ответ ещё в локальной очереди (или уже записан из неё)
+        status_code, body = 202, queued_response_body(ticket)
+    else:
+        result = await db.execute(
+            select(SurveyAnswerIdempotencyKey.response_status, SurveyAnswerIdempotencyKey.response_body)
+            .where(SurveyAnswerIdempotencyKey.survey_id == survey_id, SurveyAnswerIdempotencyKey.key == idempotency_key)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        # Ключи, сохранённые до появления response_body, получают стандартный ответ
+        status_code = row.response_status or 200
+        body = row.response_body or SAVED_ANSWER_RESPONSE.model_dump_json()
+    return Response(
+        content=body, status_code=status_code, media_type="application/json", headers={"Idempotent-Replayed": "true"}
     )
 
+
 @router.post("/s/{public_id}/answer", response_model=PublicSurveyAnswerOut)
 async def submit_public_survey_answer(
     public_id: str,
     data: PublicSurveyAnswerIn = Body(...),
     request: Request = None,
+    response: Response = None,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
     db: AsyncSession = Depends(get_async_db)
 ):
     # Получаем опрос
-    result = await db.execute(Survey.__table__.select().where(Survey.public_id == public_id))
-    survey = result.first()
+    survey = await public_survey_cache.get(public_id, db)
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
-    survey = survey._mapping
-    
-    # Check if this IP has already answered
-    # if request and request.client:
-    #     existing_answer = await db.execute(
-    #         select(SurveyAnswer).where(
-    #             and_(
-    #                 SurveyAnswer.survey_id == survey["id"],
-    #                 SurveyAnswer.ip == request.client.host
-    #             )
-    #         )
-    #     )
-    #     if existing_answer.first():
-    #         raise HTTPException(
-    #             status_code=403,
-    #             detail="You have already submitted a response for this survey from this IP address."
-    #         )
 
     # Проверяем, не архивирован ли опрос
-    if survey["archived"]:
+    if survey.archived:
         raise HTTPException(
             status_code=403,
             detail="Этот опрос находится в архиве и больше не принимает ответы."
         )
-    
+
+    # Повтор с тем же Idempotency-Key получает исходный ответ, а не 409 от проверки дубликатов
+    idempotency_key = idempotency_key or data.idempotency_key
+    if idempotency_key:
+        replay = await _replay_answer_response(survey.id, idempotency_key, db)
+        if replay is not None:
+            return replay
+
+    ip = request.client.host if request and request.client else None
+    answer_hash = respondent_hash(data.respondent_id, ip)
+
+    # Check if this respondent (respondent_id or IP) has already answered
+    if settings.answer_duplicate_check and answer_hash:
+        if await respondent_deduplicator.is_duplicate(survey.id, answer_hash, db):
+            raise HTTPException(
+                status_code=409,
+                detail="Вы уже отправили ответ на этот опрос."
+            )
+
     # Save answer to DB
-    db_answer = SurveyAnswer(
-        survey_id=survey["id"],
+    answer_row = dict(
+        survey_id=survey.id,
         public_id=public_id,
         answers=json.dumps(data.answers),
         respondent_id=data.respondent_id,
-        ip=request.client.host if request else None
+        ip=ip,
+        respondent_hash=answer_hash,
+        created_at=datetime.now()
     )
-    db.add(db_answer)
-    await db.commit()
+
+    # Если уточнение от subagent невозможно, ответ ставится в очередь и клиент сразу получает 202
+    answered = len(data.answers)
+    last_question = survey.questions[answered - 1] if 0 < answered <= len(survey.questions) else None
+    if answer_queue.running and not may_need_followup(last_question):
+        try:
+            validate_answers(survey.questions, data.answers)
+        except AnswerValidationError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        ticket = await answer_queue.enqueue(answer_row, idempotency_key)
+        if answer_hash:
+            respondent_deduplicator.remember(survey.id, answer_hash)
+        response.status_code = 202
+        return PublicSurveyAnswerOut(ok=True, message=QUEUED_ANSWER_MESSAGE, ticket=ticket)
+
+    buffered = False
+    idempotency_row_id = None
+    if idempotency_key:
+        # Ключ, ответ и тело ответа клиенту пишутся в одной транзакции; повтор с тем же ключом ничего не создаёт
+        inserted = await db.execute(
+            pg_insert(SurveyAnswerIdempotencyKey)
+            .values(
+                survey_id=survey.id,
+                key=idempotency_key,
+                created_at=datetime.now(),
+                response_status=200,
+                response_body=SAVED_ANSWER_RESPONSE.model_dump_json(),
+            )
+            .on_conflict_do_nothing(index_elements=["survey_id", "key"])
+            .returning(SurveyAnswerIdempotencyKey.id)
+        )
+        idempotency_row_id = inserted.scalar_one_or_none()
+        if idempotency_row_id is None:
+            # Параллельный запрос с тем же ключом успел раньше
+            await db.rollback()
+            return await _replay_answer_response(survey.id, idempotency_key, db) or SAVED_ANSWER_RESPONSE
+    elif answer_buffer.running:
+        try:
+            await answer_buffer.submit(answer_row)
+            buffered = True
+        except (BufferFullError, BufferFlushError):
+            pass  # буфер переполнен или батч не записался — пишем напрямую
+    if not buffered:
+        db.add(SurveyAnswer(**answer_row))
+        await SurveyDAO.increment_answers_count(survey.id, 1, db)
+        await db.commit()
+        leaderboard_events.answer_recorded(survey.id, answer_row["answers"])
+    if answer_hash:
+        respondent_deduplicator.remember(survey.id, answer_hash)
 
     # --- FOLLOWUP SUBAGENT INTEGRATION ---
-    # Try to get session dict from request.state, fallback to in-memory (demo only)
-    session = getattr(request.state, 'session', None)
-    if session is None:
-        session = {}
-        setattr(request.state, 'session', session)
+    # Сессия респондента живёт между запросами, поэтому followup_limit действительно ограничивает вызовы LLM
+    session_keys = respondent_session_keys(public_id, request, data.respondent_id)
+    session = await load_respondent_session(session_keys)
     # Prepare context for followup_subagent
     # Load survey questions
-    questions = json.loads(survey["questions"])
+    questions = survey.questions
     # Find the last answered question (assume answers are in order)
     if questions and data.answers:
         last_q_idx = len(data.answers) - 1
@@ -257,18 +389,205 @@ async def submit_public_survey_answer(
                     })
             # Call followup_subagent
             result = followup_subagent(
-                topic=survey["topic"],
+                topic=survey.topic,
                 question=last_question,
                 answer=last_answer,
                 history=history,
                 session=session,
-                followup_limit=2
+                followup_limit=settings.followup_limit
             )
             if result['action'] == 'followup':
-                return PublicSurveyAnswerOut(ok=False, message=result['message'])
+                await save_respondent_session(session_keys, session)
+                followup = PublicSurveyAnswerOut(ok=False, message=result['message'])
+                if idempotency_row_id is not None:
+                    await db.execute(
+                        update(SurveyAnswerIdempotencyKey)
+                        .where(SurveyAnswerIdempotencyKey.id == idempotency_row_id)
+                        .values(response_body=followup.model_dump_json())
+                    )
+                    await db.commit()
+                return followup
     # --- END FOLLOWUP SUBAGENT INTEGRATION ---
 
-    return PublicSurveyAnswerOut(ok=True, message="Ответ успешно сохранён!")
+    return SAVED_ANSWER_RESPONSE
+
+@router.get("/s/{public_id}/answer-status/{ticket}")
+async def get_public_answer_status(public_id: str, ticket: str, db: AsyncSession = Depends(get_async_db)):
+    """Status of an answer accepted with 202: queued, processing, saved or failed."""
+    survey = await public_survey_cache.get(public_id, db)
+    if not survey or not ticket.startswith(f"{survey.id}:"):
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    status = await answer_queue.status(ticket)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return {"ticket": ticket, **status}
+
+async def _get_open_public_survey(public_id: str, db: AsyncSession):
+    survey = await public_survey_cache.get(public_id, db)
+    if not survey:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    if survey.archived:
+        raise HTTPException(
+            status_code=403,
+            detail="Этот опрос находится в архиве и больше не принимает ответы."
+        )
+    return survey
+
+def _response_state(response, answers: list[Any], action: str = "next", message: str | None = None):
+    return ResponseStateOut(
+        respondent_token=response.respondent_token,
+        answers=answers,
+        next_index=len(answers),
+        completed=response.completed_at is not None,
+        action=action,
+        message=message,
+    )
+
+@router.post("/s/{public_id}/responses", response_model=ResponseStateOut)
+async def start_public_response(
+    public_id: str,
+    data: ResponseStartIn | None = Body(None),
+    request: Request = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Start a question-by-question response; the returned token identifies it in later calls."""
+    survey = await _get_open_public_survey(public_id, db)
+    response = SurveyResponseInProgress(
+        survey_id=survey.id,
+        respondent_token=new_respondent_token(),
+        respondent_id=data.respondent_id if data else None,
+        ip=request.client.host if request and request.client else None,
+        answers="[]",
+    )
+    db.add(response)
+    await db.commit()
+    return _response_state(response, [])
+
+@router.get("/s/{public_id}/responses/{token}", response_model=ResponseStateOut)
+async def get_public_response(public_id: str, token: str, db: AsyncSession = Depends(get_async_db)):
+    """Answers collected so far, to resume an interrupted response."""
+    survey = await public_survey_cache.get(public_id, db)
+    response = await get_response(survey.id, token, db) if survey else None
+    if not response:
+        raise HTTPException(status_code=404, detail="Response not found")
+    return _response_state(response, json.loads(response.answers))
+
+async def _complete_unique_response(survey, response, public_id: str, db: AsyncSession):
+    """
+    complete_response with the duplicate check of one-shot answers. Returns the new
+    survey_answers row (or None) and the respondent hash to remember after commit.
+    """
+    answer_hash = respondent_hash(response.respondent_id, response.ip)
+    if settings.answer_duplicate_check and answer_hash:
+        if await respondent_deduplicator.is_duplicate(survey.id, answer_hash, db):
+            raise HTTPException(status_code=409, detail="Вы уже отправили ответ на этот опрос.")
+    try:
+        completed = await complete_response(response, public_id, db)
+    except AnswerValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return completed, answer_hash
+
+def _remember_completed(survey_id: int, completed, answer_hash: str | None) -> None:
+    if completed is None:
+        return
+    if answer_hash:
+        respondent_deduplicator.remember(survey_id, answer_hash)
+    leaderboard_events.answer_recorded(survey_id, completed.answers)
+
+@router.put("/s/{public_id}/responses/{token}/answers/{index}", response_model=ResponseStateOut)
+async def submit_public_response_answer(
+    public_id: str,
+    token: str,
+    index: int,
+    data: ResponseAnswerIn = Body(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Answer one question. Only this answer is validated and checked by the follow-up subagent.
+    Answering the last question completes the response.
+    """
+    survey = await _get_open_public_survey(public_id, db)
+    response = await get_response(survey.id, token, db)
+    if not response:
+        raise HTTPException(status_code=404, detail="Response not found")
+    if response.completed_at is not None:
+        raise HTTPException(status_code=409, detail="Response is already completed")
+    try:
+        answers = merge_answer(response, survey.questions, index, data.answer)
+    except AnswerValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    question = survey.questions[index]
+    result = None
+    followups_before = response.followup_count
+    session = {"followup_count": followups_before}
+    if may_need_followup(question):
+        history = [
+            {
+                "question": q["text"] if isinstance(q, dict) else str(q),
+                "answer": a,
+            }
+            for q, a in zip(survey.questions[:index], answers[:index])
+        ]
+        # Вызов LLM занимает секунды: не держим ни блокировку строки, ни соединение из пула,
+        # и не блокируем event loop
+        await db.rollback()
+        result = await asyncio.to_thread(
+            followup_subagent,
+            topic=survey.topic,
+            question=question,
+            answer=data.answer,
+            history=history,
+            session=session,
+            followup_limit=settings.followup_limit
+        )
+
+    # Ответ применяется под блокировкой строки: параллельные ответы одного респондента — по очереди
+    response = await get_response(survey.id, token, db, for_update=True)
+    if not response:
+        raise HTTPException(status_code=404, detail="Response not found")
+    if response.completed_at is not None:
+        raise HTTPException(status_code=409, detail="Response is already completed")
+    try:
+        answers = set_answer(response, survey.questions, index, data.answer)
+    except AnswerValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Прибавляем, а не присваиваем: счётчик мог вырасти, пока работал subagent
+    response.followup_count += session.get("followup_count", 0) - followups_before
+    if result is not None and result["action"] == "followup":
+        await db.commit()
+        return _response_state(response, answers, "followup", result["message"])
+
+    completed, answer_hash = None, None
+    if len(answers) == len(survey.questions):
+        completed, answer_hash = await _complete_unique_response(survey, response, public_id, db)
+    await db.commit()
+    _remember_completed(survey.id, completed, answer_hash)
+    return _response_state(response, answers)
+
+@router.post("/s/{public_id}/responses/{token}/complete", response_model=ResponseStateOut)
+async def complete_public_response(public_id: str, token: str, db: AsyncSession = Depends(get_async_db)):
+    """Finish a response before the last question (remaining questions stay unanswered)."""
+    survey = await _get_open_public_survey(public_id, db)
+    response = await get_response(survey.id, token, db, for_update=True)
+    if not response:
+        raise HTTPException(status_code=404, detail="Response not found")
+    completed, answer_hash = await _complete_unique_response(survey, response, public_id, db)
+    await db.commit()
+    _remember_completed(survey.id, completed, answer_hash)
+    return _response_state(response, json.loads(response.answers))
+
+@router.get("/{survey_id}/analytics/drop-off")
+async def get_survey_drop_off(
+    survey_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Where respondents of question-by-question responses stop answering."""
+    survey = await db.get(Survey, survey_id)
+    if not survey or survey.user_id != current_user.id or survey.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    return await drop_off_stats(survey_id, len(json.loads(survey.questions)), db)
 
 @router.post("/s/{public_id}/next-question")
 async def get_next_ai_question(
@@ -276,12 +595,10 @@ async def get_next_ai_question(
     data: dict = Body(...),
     db: AsyncSession = Depends(get_async_db)
 ):
-    result = await db.execute(Survey.__table__.select().where(Survey.public_id == public_id))
-    survey = result.first()
+    survey = await public_survey_cache.get(public_id, db)
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
-    survey = survey._mapping
-    topic = survey["topic"]
+    topic = survey.topic
     history = data.get("history", [])
     last_answer = data.get("last_answer", "")
     last_question = history[-1]["question"] if history else ""
@@ -314,7 +631,7 @@ async def update_survey(
     db: AsyncSession = Depends(get_async_db)
 ):
     survey = await db.get(Survey, survey_id)
-    if not survey or survey.user_id != current_user.id:
+    if not survey or survey.user_id != current_user.id or survey.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Survey not found")
     # Обновляем вопросы
     questions = data.get("questions")
@@ -322,6 +639,9 @@ async def update_survey(
         survey.questions = json.dumps(questions)
     await db.commit()
     await db.refresh(survey)
+    await invalidate_public_survey(survey.public_id)
+    if not survey.archived:
+        await publish_survey(survey.public_id, survey.topic, json.loads(survey.questions))
     return SurveyOut(
         id=survey.id,
         topic=survey.topic,
@@ -338,10 +658,13 @@ async def archive_survey(
     db: AsyncSession = Depends(get_async_db)
 ):
     survey = await db.get(Survey, survey_id)
-    if not survey or survey.user_id != current_user.id:
+    if not survey or survey.user_id != current_user.id or survey.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Survey not found")
     survey.archived = True
+    survey.archived_at = datetime.now()
     await db.commit()
+    await invalidate_public_survey(survey.public_id)
+    await unpublish_survey(survey.public_id)
     return {"ok": True}
 
 @router.post("/{survey_id}/restore")
@@ -351,7 +674,7 @@ async def restore_survey(
     db: AsyncSession = Depends(get_async_db)
 ):
     survey = await db.get(Survey, survey_id)
-    if not survey or survey.user_id != current_user.id:
+    if not survey or survey.user_id != current_user.id or survey.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Survey not found")
     
     # Check if user already has an active survey
@@ -364,7 +687,10 @@ async def restore_survey(
         )
     
     survey.archived = False
+    survey.archived_at = None
     await db.commit()
+    await invalidate_public_survey(survey.public_id)
+    await publish_survey(survey.public_id, survey.topic, json.loads(survey.questions))
     return {"ok": True}
 
 @router.post("/archive-all-active", tags=["temporary"])
@@ -385,8 +711,12 @@ async def archive_all_active_surveys(
 
         for survey in surveys_to_archive:
             survey.archived = True
+            survey.archived_at = datetime.now()
         
         await db.commit()
+        for survey in surveys_to_archive:
+            await invalidate_public_survey(survey.public_id)
+            await unpublish_survey(survey.public_id)
 
         return {"message": f"Successfully archived {len(surveys_to_archive)} active survey(s)."}
     except Exception as e:
@@ -394,10 +724,14 @@ async def archive_all_active_surveys(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/s/{public_id}/answers")
-async def get_public_survey_answers(public_id: str, db: AsyncSession = Depends(get_async_db)):
-    result = await db.execute(select(SurveyAnswer).where(SurveyAnswer.public_id == public_id))
-    answers = result.scalars().all()
-    return [
+async def get_public_survey_answers(public_id: str, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(
+        select(Survey).where(Survey.public_id == public_id, Survey.deleted_at.is_(None))
+    )
+    survey = result.scalar_one_or_none()
+    # Ответы давно архивных опросов лежат в холодном хранилище (src/tasks/archive.py)
+    answers = await load_survey_answers(survey, db) if survey else []
+    return trusted_json([
         {
             "answers": json.loads(a.answers),
             "respondent_id": a.respondent_id,
@@ -405,23 +739,47 @@ async def get_public_survey_answers(public_id: str, db: AsyncSession = Depends(g
             "created_at": a.created_at.isoformat() if a.created_at else None
         }
         for a in answers
-    ]
+    ])
+
+@router.post("/{survey_id}/answers/import", response_model=AnswerImportOut)
+async def import_survey_answers(
+    survey_id: int,
+    request: Request,
+    format: str | None = Query(None, description="ndjson or csv; detected from Content-Type if omitted"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Bulk import of answers (migration from other tools, offline Telegram responses).
+    The request body is streamed and written with COPY in batches.
+    """
+    survey = await db.get(Survey, survey_id)
+    if not survey or survey.user_id != current_user.id or survey.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+
+    try:
+        importer = BulkAnswerImporter(survey, db)
+    except ImportNotAllowedError as e:
+        raise HTTPException(status_code=409, detail=f"Import is not possible: {e}")
+    result = await importer.run(iter_lines(request.stream()), format)
+    return AnswerImportOut(imported=result.imported, rejected=result.rejected, errors=result.errors)
 
 @router.get("/{survey_id}/analytics", response_model=SurveyAnalytics)
 async def get_survey_analytics(
     survey_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_async_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     survey = await db.get(Survey, survey_id)
-    if not survey or survey.user_id != current_user.id:
+    if not survey or survey.user_id != current_user.id or survey.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Survey not found")
 
-    # Fetch all answers for the survey
-    answers_result = await db.execute(
-        select(SurveyAnswer).where(SurveyAnswer.survey_id == survey_id)
-    )
-    answers = answers_result.scalars().all()
+    # Fetch all answers for the survey, including the ones moved to cold storage
+    answers = await load_survey_answers(survey, db)
 
     total_responses = len(answers)
     question_analytics = {}
@@ -440,8 +798,9 @@ async def get_survey_analytics(
             avg_time_between_responses = round(sum(deltas) / len(deltas), 2) if deltas else None
         else:
             avg_time_between_responses = None
-        # Завершаемость (response_rate) — если нет незавершённых, считаем 100%
-        response_rate = 100.0
+        # Завершаемость (response_rate) — по пошаговым ответам; если их нет, считаем 100%
+        funnel = await drop_off_stats(survey_id, len(json.loads(survey.questions)), db)
+        response_rate = funnel["completion_rate"] if funnel["started"] else 100.0
         # Массив дат ответов
         response_times = [a.created_at.isoformat() for a in sorted_answers if a.created_at]
         # Популярный день недели
@@ -561,15 +920,16 @@ async def get_survey_analytics(
                 "answers": [ans for ans in q_answers if ans]
             }
 
-    return SurveyAnalytics(
-        total_responses=total_responses,
-        question_analytics=question_analytics,
-        first_response_date=first_response_date,
-        last_response_date=last_response_date,
-        unique_respondents=unique_respondents,
-        avg_time_between_responses=avg_time_between_responses,
-        response_rate=response_rate,
-        response_times=response_times,
-        popular_day=popular_day,
-        popular_hour=popular_hour
-    )
+    # Самый тяжёлый ответ API: отдаём без повторной валидации через SurveyAnalytics
+    return trusted_json({
+        "total_responses": total_responses,
+        "question_analytics": question_analytics,
+        "first_response_date": first_response_date,
+        "last_response_date": last_response_date,
+        "unique_respondents": unique_respondents,
+        "avg_time_between_responses": avg_time_between_responses,
+        "response_rate": response_rate,
+        "response_times": response_times,
+        "popular_day": popular_day,
+        "popular_hour": popular_hour,
+    })
@@ -0,0 +1,142 @@
+"""
+Per-process cache of public survey definitions, keyed by public_id.
+
+An entry holds the fields the public endpoints need (id, topic, archived),
+the parsed questions, and the GET /s/{public_id} response already encoded
+to JSON and gzip, plus its ETag. Hits therefore need neither the database nor
+json.loads/json.dumps. A conditional GET with a matching If-None-Match is
+answered 304 straight from the entry.
+
+Survey endpoints call invalidate_public_survey() when they change a
+survey. That drops the entry in this worker and publishes the public_id on
+the "public_surveys" pub/sub channel (src/pubsub.py), so the other workers
+drop theirs too: an archived or deleted survey stops accepting answers
+everywhere right away. That needs PUBSUB_BACKEND=postgres when there is
+more than one worker: the memory backend only reaches its own process, so
+other workers (and a lost message) see the change only once their entry
+expires (public_survey_cache_ttl_seconds). The body carries "version", a
+hash of the definition, so all workers (and the static snapshots,
+src/tasks/publish.py) agree on it for the same definition. The ETag is that
+version, with a "-gzip" suffix for the gzip-encoded body.
+"""
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.metrics import Counter, Gauge
+from src.pubsub import pubsub
+from src.tasks.schema import Survey
+
+CACHE_LOOKUPS = Counter("public_survey_cache_lookups_total", "Public survey cache lookups by result", ["result"])
+CACHE_SIZE = Gauge("public_survey_cache_entries", "Public survey definitions cached in this process")
+
+PUBLIC_SURVEYS_CHANNEL = "public_surveys"
+
+
+@dataclass
+class PublicSurveyEntry:
+    id: int
+    public_id: str
+    topic: str
+    archived: bool
+    questions: list[Any]
+    body: bytes
+    gzip_body: bytes
+    etag: str
+    gzip_etag: str
+    expires_at: float
+
+    def etag_matches(self, if_none_match: str | None, gzip_encoded: bool) -> bool:
+        """Weak comparison of an If-None-Match list ("*", W/ tags) with the ETag of the chosen body."""
+        if not if_none_match:
+            return False
+        etag = self.gzip_etag if gzip_encoded else self.etag
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == etag:
+                return True
+        return False
+
+
+def encode_public_survey(topic: str, questions: list[Any]) -> tuple[str, bytes]:
+    """(version, body) of GET /s/{public_id}; the version changes whenever the definition does."""
+    # Тот же формат, что у ORJSONResponse приложения
+    version = hashlib.sha256(orjson.dumps({"topic": topic, "questions": questions})).hexdigest()[:16]
+    return version, orjson.dumps({"topic": topic, "questions": questions, "version": version})
+
+
+class PublicSurveyCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, PublicSurveyEntry] = OrderedDict()
+        CACHE_SIZE.set_function(lambda: len(self._entries))
+
+    def _build(self, survey: Survey) -> PublicSurveyEntry:
+        questions = json.loads(survey.questions)
+        version, body = encode_public_survey(survey.topic, questions)
+        return PublicSurveyEntry(
+            id=survey.id,
+            public_id=survey.public_id,
+            topic=survey.topic,
+            archived=survey.archived,
+            questions=questions,
+            body=body,
+            gzip_body=gzip.compress(body, compresslevel=6, mtime=0),
+            etag=f'"{version}"',
+            gzip_etag=f'"{version}-gzip"',
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+
+    async def get(self, public_id: str, db: AsyncSession) -> PublicSurveyEntry | None:
+        """Cached definition of a non-deleted survey, loaded with `db` on a miss. None if not found."""
+        entry = self._entries.get(public_id)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self._entries.move_to_end(public_id)
+                CACHE_LOOKUPS.inc(result="hit")
+                return entry
+            del self._entries[public_id]
+
+        CACHE_LOOKUPS.inc(result="miss")
+        result = await db.execute(
+            select(Survey).where(Survey.public_id == public_id, Survey.deleted_at.is_(None))
+        )
+        survey = result.scalar_one_or_none()
+        if survey is None:
+            return None
+        entry = self._build(survey)
+        self._entries[public_id] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, public_id: str) -> None:
+        self._entries.pop(public_id, None)
+
+
+public_survey_cache = PublicSurveyCache(
+    max_entries=settings.public_survey_cache_size,
+    ttl_seconds=settings.public_survey_cache_ttl_seconds,
+)
+
+
+async def invalidate_public_survey(public_id: str) -> None:
+    public_survey_cache.invalidate(public_id)
+    await pubsub.publish(PUBLIC_SURVEYS_CHANNEL, public_id)
+
+
+async def _on_invalidate(payload: str) -> None:
+    public_survey_cache.invalidate(payload)
+
+
+pubsub.subscribe(PUBLIC_SURVEYS_CHANNEL, _on_invalidate)
@@ -0,0 +1,69 @@
+"""
+Validation of respondent answers against a survey's question schema.
+"""
+from typing import Any
+
+
+class AnswerValidationError(ValueError):
+    """Raised when an answer does not match its question."""
+    pass
+
+
+def _question_text(question: Any, index: int) -> str:
+    if isinstance(question, dict):
+        return question.get("text") or f"Question {index + 1}"
+    return str(question)
+
+
+def validate_answer(question: Any, answer: Any, index: int = 0) -> None:
+    """
+    Check a single answer against its question.
+    Empty answers are allowed (the question was skipped).
+    Raises AnswerValidationError.
+    """
+    if answer is None or answer == "":
+        return
+    if not isinstance(question, dict):
+        return
+
+    q_type = question.get("type")
+    label = _question_text(question, index)
+    if q_type in ("rating", "rating-10"):
+        scale = 10 if q_type == "rating-10" else question.get("scale", 5)
+        try:
+            value = int(answer)
+        except (TypeError, ValueError):
+            raise AnswerValidationError(f"{label}: rating must be an integer")
+        if not 1 <= value <= scale:
+            raise AnswerValidationError(f"{label}: rating must be between 1 and {scale}")
+    elif q_type == "multiple_choice":
+        options = question.get("options", [])
+        if answer not in options:
+            raise AnswerValidationError(f"{label}: '{answer}' is not one of the options")
+    elif q_type == "image_choice":
+        images = question.get("images", [])
+        labels = [img["label"] if isinstance(img, dict) and "label" in img else str(img) for img in images]
+        if answer not in labels:
+            raise AnswerValidationError(f"{label}: '{answer}' is not one of the images")
+    elif q_type == "ranking":
+        items = question.get("items", [])
+        if isinstance(answer, list) and sorted(map(str, answer)) != sorted(map(str, items)):
+            raise AnswerValidationError(f"{label}: ranking must contain every item exactly once")
+    elif q_type in ("open_ended", "long_text", "text"):
+        if not isinstance(answer, str):
+            raise AnswerValidationError(f"{label}: answer must be text")
+
+
+def validate_answers(questions: list[Any], answers: list[Any]) -> None:
+    """
+    Check a full list of answers (by question index) against the survey questions.
+    Raises AnswerValidationError.
+    """
+    if not isinstance(answers, list):
+        raise AnswerValidationError("answers must be a list")
+    if len(answers) > len(questions):
+        raise AnswerValidationError(
+            f"got {len(answers)} answers for a survey with {len(questions)} questions"
+        )
+    for i, answer in enumerate(answers):
+        validate_answer(questions[i], answer, i)
@@ -57,7 +57,7 @@ async def get_survey_by_public_id(public_id: str):
             print(f"❌ Unexpected error: {e}")
             raise
 
-async def submit_survey_answer(public_id: str, answers: list, respondent_id: str = None):
+async def submit_survey_answer(public_id: str, answers: list, respondent_id: str = None, idempotency_key: str = None):
     print(f"📤 Submitting answers for survey: {public_id}")
     print(f"📋 Answers: {answers}")
     print(f"👤 Respondent ID: {respondent_id}")
@@ -73,7 +73,8 @@ async def submit_survey_answer(public_id: str, answers: list, respondent_id: str
         print(f"📦 Payload: {payload}")
         
         try:
-            res = await client.post(url, json=payload)
+            headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+            res = await client.post(url, json=payload, headers=headers)
             print(f"📊 Response status: {res.status_code}")
             print(f"📄 Response headers: {res.headers}")
             print(f"📄 Response content: {res.text[:500]}")
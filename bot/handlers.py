@@ -4,6 +4,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 import api
 import httpx
+import uuid
 from config import BACKEND_URL, BOT_API_TOKEN
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
@@ -39,7 +40,8 @@ async def cmd_start(message: types.Message, command: CommandObject, state: FSMCo
             questions=survey["questions"],
             topic=survey.get("topic", "Опрос"),
             answers=[],
-            current=0
+            current=0,
+            attempt_id=uuid.uuid4().hex
         )
         first_q = survey["questions"][0]
         if first_q["type"] == "multiple_choice":
@@ -138,7 +140,8 @@ async def handle_survey_link_or_code(message: types.Message, state: FSMContext):
         questions=survey["questions"],
         topic=survey.get("topic", "Опрос"),
         answers=[],
-        current=0
+        current=0,
+        attempt_id=uuid.uuid4().hex
     )
     first_q = survey["questions"][0]
     if first_q["type"] == "multiple_choice":
@@ -243,7 +246,9 @@ async def process_survey_answer(message: types.Message, state: FSMContext):
             response = await api.submit_survey_answer(
                 public_id=data["public_id"],
                 answers=answers,
-                respondent_id=str(getattr(message.from_user, 'id', ''))
+                respondent_id=str(getattr(message.from_user, 'id', '')),
+                # Повторная отправка того же набора ответов не создаст дубликат
+                idempotency_key=f"tg-{data['attempt_id']}-{len(answers)}" if data.get("attempt_id") else None
             )
             print(f"Backend response: {response}")
             if not response.get("ok", True):
@@ -301,7 +306,8 @@ async def cmd_survey(message: types.Message, command: CommandObject, state: FSMC
             questions=survey["questions"],
             topic=survey.get("topic", "Опрос"),
             answers=[],
-            current=0
+            current=0,
+            attempt_id=uuid.uuid4().hex
         )
         first_q = survey["questions"][0]
         if first_q["type"] == "multiple_choice":
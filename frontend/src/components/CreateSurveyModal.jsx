@@ -3,6 +3,7 @@ import { useNavigate } from "react-router-dom";
 import { motion } from "framer-motion";
 import { Sparkles, Loader2, ArrowLeft } from "lucide-react";
 import { BACKEND_URL } from '../config';
+import { authFetch } from '../utils/auth';
 import { useTranslation } from 'react-i18next';
 
 const TEMPLATES = [
@@ -176,7 +177,7 @@ export default function CreateSurveyModal({ onSuccess }) {
         return;
       }
       const token = localStorage.getItem("token");
-      const res = await fetch(`/api/surveys/`, {
+      const res = await authFetch(`/api/surveys/`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
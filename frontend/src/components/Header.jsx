@@ -4,6 +4,7 @@ import { Menu, X, MessageCircle, ArrowRight, User } from 'lucide-react';
 import logoo from '../assets/logoo.png';
 import LanguageSwitcher from './LanguageSwitcher';
 import { useTranslation } from 'react-i18next';
+import { logout } from '../utils/auth';
 
 function Header() {
   const { t } = useTranslation();
@@ -18,8 +19,8 @@ function Header() {
   ];
 
   const isLoggedIn = Boolean(localStorage.getItem('token'));
-  const handleLogout = () => {
-    localStorage.removeItem('token');
+  const handleLogout = async () => {
+    await logout();
     navigate('/login');
   };
 
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { useTranslation } from 'react-i18next';
 import { getApiUrl } from '../config';
+import { storeTokens } from '../utils/auth';
 import { Mail, CheckCircle, AlertCircle } from 'lucide-react';
 
 export default function MagicLinkAuth({ onSuccess }) {
@@ -62,7 +63,7 @@ export default function MagicLinkAuth({ onSuccess }) {
       const data = await response.json();
 
       if (response.ok && data.access_token) {
-        localStorage.setItem('token', data.access_token);
+        storeTokens(data);
         if (onSuccess) onSuccess();
       } else {
         setError(data.detail || t('Failed to verify magic link'));
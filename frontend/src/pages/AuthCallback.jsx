@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useSearchParams, useNavigate } from 'react-router-dom';
 import { useTranslation } from 'react-i18next';
 import { getApiUrl } from '../config';
+import { storeTokens } from '../utils/auth';
 
 const AuthCallback = () => {
   const [searchParams] = useSearchParams();
@@ -14,17 +15,19 @@ const AuthCallback = () => {
     const handleCallback = async () => {
       try {
         const code = searchParams.get('code');
-        const token = searchParams.get('token');
+        // Наш backend передаёт токены во фрагменте URL: он не попадает в логи серверов и Referer
+        const fragment = new URLSearchParams(window.location.hash.slice(1));
+        const token = fragment.get('token') || searchParams.get('token');
+        const refreshToken = fragment.get('refresh_token');
         const error = searchParams.get('error');
         const state = searchParams.get('state');
 
         // Debug logging
         console.log('🔍 AuthCallback Debug Info:');
-        console.log('URL:', window.location.href);
         console.log('Pathname:', window.location.pathname);
         console.log('Search params:', Object.fromEntries(searchParams.entries()));
         console.log('Code:', code);
-        console.log('Token:', token);
+        console.log('Token received:', Boolean(token));
         console.log('Error:', error);
         console.log('State:', state);
 
@@ -39,21 +42,22 @@ const AuthCallback = () => {
         if (token) {
           console.log('✅ Received token from Google OAuth callback');
           console.log('🔗 Token length:', token.length);
-          localStorage.setItem('token', token); // Fixed: use 'token' instead of 'access_token'
+          storeTokens({ access_token: token, refresh_token: refreshToken });
           console.log('💾 Token stored in localStorage with key "token"');
           setStatus('success');
           console.log('🔄 Setting status to success, will redirect in 1 second...');
           
           // Immediate redirect as fallback
+          // replace: адрес с токенами не остаётся в истории браузера
           setTimeout(() => {
             console.log('🚀 Attempting redirect to /dashboard...');
-            navigate('/dashboard');
+            navigate('/dashboard', { replace: true });
           }, 1000);
           
           // Additional fallback redirect after 3 seconds
           setTimeout(() => {
             console.log('🔄 Fallback redirect attempt...');
-            window.location.href = '/dashboard';
+            window.location.replace('/dashboard');
           }, 3000);
           
           return;
@@ -142,7 +146,7 @@ const AuthCallback = () => {
       const backendData = await backendResponse.json();
 
       if (backendData.access_token) {
-        localStorage.setItem('token', backendData.access_token); // Fixed: use 'token' instead of 'access_token'
+        storeTokens(backendData);
         setStatus('success');
         setTimeout(() => navigate('/dashboard'), 1000);
       } else {
@@ -170,7 +174,7 @@ const AuthCallback = () => {
       const data = await response.json();
 
       if (data.access_token) {
-        localStorage.setItem('token', data.access_token); // Fixed: use 'token' instead of 'access_token'
+        storeTokens(data);
         setStatus('success');
         setTimeout(() => navigate('/dashboard'), 1000);
       } else {
@@ -204,7 +208,7 @@ const AuthCallback = () => {
       const data = await response.json();
 
       if (data.access_token) {
-        localStorage.setItem('token', data.access_token); // Fixed: use 'token' instead of 'access_token'
+        storeTokens(data);
         setStatus('success');
         setTimeout(() => navigate('/dashboard'), 1000);
       } else {
@@ -2,6 +2,7 @@ import { useState } from "react";
 import { useNavigate } from "react-router-dom";
 import ErrorModal from '../components/ErrorModal';
 import { BACKEND_URL } from '../config';
+import { authFetch } from '../utils/auth';
 import QRCode from 'react-qr-code';
 import { useTranslation } from 'react-i18next';
 
@@ -141,7 +142,7 @@ export default function CreateSurveyPage() {
       }
       // 2. Submit survey
       const token = localStorage.getItem("token");
-      const res = await fetch(`/api/surveys/`, {
+      const res = await authFetch(`/api/surveys/`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
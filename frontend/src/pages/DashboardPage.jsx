@@ -31,6 +31,7 @@ import Modal from "../components/Modal";
 import CreateSurveyModal from "../components/CreateSurveyModal";
 import SurveyEditPage from "./SurveyEditPage";
 import { BACKEND_URL, getApiUrl } from '../config';
+import { authFetch } from '../utils/auth';
 import { BarChart as RBarChart, Bar, XAxis, YAxis, Tooltip, Legend, ResponsiveContainer, PieChart as RPieChart, Pie, Cell } from 'recharts';
 import { saveAs } from "file-saver";
 import LogoutButton from "./LogoutButton";
@@ -69,7 +70,7 @@ function DashboardPage() {
     const fetchCurrentUser = async () => {
       const token = localStorage.getItem('token');
       try {
-        const res = await fetch(getApiUrl('auth/me'), {
+        const res = await authFetch(getApiUrl('auth/me'), {
           headers: { Authorization: `Bearer ${token}` }
         });
         if (res.ok) {
@@ -146,7 +147,7 @@ function DashboardPage() {
     let url = getApiUrl(`api/surveys/?${params.toString()}`);
 
     try {
-      const res = await fetch(url, {
+      const res = await authFetch(url, {
         headers: { Authorization: `Bearer ${token}` }
       });
       if (res.status === 401) {
@@ -196,7 +197,7 @@ function DashboardPage() {
     setAnalytics(null);
     const token = localStorage.getItem("token");
     try {
-      const res = await fetch(getApiUrl(`api/surveys/${surveyId}/analytics`), {
+      const res = await authFetch(getApiUrl(`api/surveys/${surveyId}/analytics`), {
         headers: { Authorization: `Bearer ${token}` }
       });
       if (res.ok) {
@@ -222,7 +223,7 @@ function DashboardPage() {
   const confirmDelete = async () => {
     if (!surveyToDelete) return;
     const token = localStorage.getItem('token');
-    const res = await fetch(getApiUrl(`api/surveys/${surveyToDelete}`), {
+    const res = await authFetch(getApiUrl(`api/surveys/${surveyToDelete}`), {
       method: "DELETE",
       headers: { Authorization: `Bearer ${token}` }
     });
@@ -240,7 +241,7 @@ function DashboardPage() {
 
   const handleArchive = async (surveyId) => {
     const token = localStorage.getItem('token');
-    const res = await fetch(getApiUrl(`api/surveys/${surveyId}/archive`), {
+    const res = await authFetch(getApiUrl(`api/surveys/${surveyId}/archive`), {
       method: 'POST',
       headers: { Authorization: `Bearer ${token}` }
     });
@@ -257,7 +258,7 @@ function DashboardPage() {
 
   const handleRestore = async (surveyId) => {
     const token = localStorage.getItem('token');
-    const res = await fetch(getApiUrl(`api/surveys/${surveyId}/restore`), {
+    const res = await authFetch(getApiUrl(`api/surveys/${surveyId}/restore`), {
       method: 'POST',
       headers: { Authorization: `Bearer ${token}` }
     });
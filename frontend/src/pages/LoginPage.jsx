@@ -4,6 +4,7 @@ import { Link, useNavigate, useLocation } from "react-router-dom";
 import { motion } from "framer-motion";
 import { User, Eye, EyeOff, Mail, Lock } from "lucide-react";
 import { BACKEND_URL, getApiUrl } from '../config';
+import { storeTokens } from '../utils/auth';
 import { useTranslation } from 'react-i18next';
 import AnimatedBackground from '../components/AnimatedBackground';
 import { isMobileDevice } from '../utils/browserDetection';
@@ -43,7 +44,7 @@ export default function LoginPage() {
       });
       const data = await res.json();
       if (res.ok && data.access_token) {
-        localStorage.setItem("token", data.access_token);
+        storeTokens(data);
         setTimeout(() => {
           navigate("/dashboard");
         }, 0);
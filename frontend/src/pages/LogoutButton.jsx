@@ -1,11 +1,12 @@
 import { useNavigate } from 'react-router-dom';
 import { useTranslation } from 'react-i18next';
+import { logout } from '../utils/auth';
 
 export default function LogoutButton() {
   const { t } = useTranslation();
   const navigate = useNavigate();
-  const handleLogout = () => {
-    localStorage.removeItem('token');
+  const handleLogout = async () => {
+    await logout();
     navigate('/login');
   };
   return (
@@ -4,6 +4,7 @@ import { Eye, EyeOff, User, Mail, Building, Briefcase, Lock, CheckCircle } from
 import { motion } from 'framer-motion';
 import OAuthButtons from '../components/OAuthButtons';
 import { BACKEND_URL, getApiUrl } from '../config';
+import { storeTokens } from '../utils/auth';
 import { useTranslation } from 'react-i18next';
 import AnimatedBackground from '../components/AnimatedBackground';
 import { isMobileDevice } from '../utils/browserDetection';
@@ -80,7 +81,7 @@ function RegisterPage() {
       });
       const data = await res.json();
       if (res.ok && data.access_token) {
-        localStorage.setItem('token', data.access_token);
+        storeTokens(data);
         setTimeout(() => {
           navigate('/dashboard');
         }, 0);
@@ -3,6 +3,7 @@ import { useNavigate, Link } from "react-router-dom";
 import QRCode from "react-qr-code";
 import ErrorModal from '../components/ErrorModal';
 import { getApiUrl } from '../config';
+import { authFetch } from '../utils/auth';
 import { Plus, Trash2, BarChart2, Edit, Settings, Star, List, Image as ImageIcon, MessageCircle, AlignLeft, User } from 'lucide-react';
 import Select from '../components/Select';
 import { motion } from 'framer-motion';
@@ -75,7 +76,7 @@ export default function SurveyDetailPage({ id, onClose }) {
       setLoading(true);
       const token = localStorage.getItem("token");
       try {
-        const res = await fetch(getApiUrl(`api/surveys/${id}`), {
+        const res = await authFetch(getApiUrl(`api/surveys/${id}`), {
           headers: { Authorization: `Bearer ${token}` }
         });
         if (res.status === 401) {
@@ -103,7 +104,7 @@ export default function SurveyDetailPage({ id, onClose }) {
   const handleSave = async () => {
     const token = localStorage.getItem("token");
     try {
-      const res = await fetch(getApiUrl(`api/surveys/${id}`), {
+      const res = await authFetch(getApiUrl(`api/surveys/${id}`), {
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',
@@ -4,6 +4,7 @@ import { DragDropContext, Droppable, Draggable } from "react-beautiful-dnd";
 import QRCode from "react-qr-code";
 import ErrorModal from '../components/ErrorModal';
 import { BACKEND_URL, getApiUrl } from '../config';
+import { authFetch } from '../utils/auth';
 import Select from '../components/Select';
 import { motion } from 'framer-motion';
 import { Star, List, Image as ImageIcon, MessageCircle, AlignLeft, Copy } from 'lucide-react';
@@ -78,7 +79,7 @@ export default function SurveyEditPage({ id: propId, onClose }) {
       setLoading(true);
       const token = localStorage.getItem("token");
       try {
-        const res = await fetch(getApiUrl(`api/surveys/${id}`), {
+        const res = await authFetch(getApiUrl(`api/surveys/${id}`), {
           headers: { Authorization: `Bearer ${token}` }
         });
         if (res.status === 401) {
@@ -185,7 +186,7 @@ export default function SurveyEditPage({ id: propId, onClose }) {
     setSuccess("");
     const token = localStorage.getItem("token");
     try {
-      const res = await fetch(getApiUrl(`api/surveys/${id}`), {
+      const res = await authFetch(getApiUrl(`api/surveys/${id}`), {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -23,6 +23,8 @@ export default function SurveyPublicPage() {
   const [isTyping, setIsTyping] = useState(false);
   const [errorModal, setErrorModal] = useState({ open: false, title: '', message: '' });
   const [copySuccess, setCopySuccess] = useState('');
+  // Один идентификатор на прохождение: повторная отправка того же набора ответов не создаст дубликат
+  const [attemptId] = useState(() => (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`));
 
   useEffect(() => {
     async function fetchSurvey() {
@@ -93,7 +95,10 @@ export default function SurveyPublicPage() {
     try {
       const res = await fetch(`/api/surveys/s/${public_id}/answer`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: {
+          "Content-Type": "application/json",
+          "Idempotency-Key": `${attemptId}-${finalChat.length}`
+        },
         body: JSON.stringify({ answers: finalChat.map(c => c.answer) })
       });
       const data = await res.json();
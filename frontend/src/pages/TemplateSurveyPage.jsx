@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { Sparkles, Rocket, Target, Zap, ArrowRight, Lightbulb } from 'lucide-react';
 import { getApiUrl } from '../config';
+import { authFetch } from '../utils/auth';
 
 export default function TemplateSurveyPage() {
     const [appName, setAppName] = useState('');
@@ -25,7 +26,7 @@ export default function TemplateSurveyPage() {
                 return;
             }
 
-            const response = await fetch(getApiUrl('api/surveys/from-template'), {
+            const response = await authFetch(getApiUrl('api/surveys/from-template'), {
                  method: 'POST',
                  headers: { 
                     'Content-Type': 'application/json',
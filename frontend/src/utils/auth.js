@@ -0,0 +1,80 @@
+import { getApiUrl } from '../config';
+
+// Access-токен живёт 15 минут (ACCESS_TOKEN_EXPIRE_MINUTES), refresh-токен — 30 дней.
+// authFetch подставляет текущий access-токен и при 401 один раз обновляет пару через /auth/refresh.
+
+export const storeTokens = (data) => {
+  localStorage.setItem('token', data.access_token);
+  if (data.refresh_token) {
+    localStorage.setItem('refresh_token', data.refresh_token);
+  }
+};
+
+export const clearTokens = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('refresh_token');
+};
+
+// Один запрос на обновление, даже если 401 получили несколько запросов сразу:
+// refresh-токен одноразовый, повторное использование отзывает всю сессию
+let refreshing = null;
+
+export const refreshTokens = () => {
+  if (!refreshing) {
+    refreshing = (async () => {
+      const refreshToken = localStorage.getItem('refresh_token');
+      const token = localStorage.getItem('token');
+      if (!refreshToken && !token) return false;
+      try {
+        // Без refresh-токена — старый бессрочный токен: сервер один раз меняет его на пару
+        const res = await fetch(getApiUrl('auth/refresh'), refreshToken
+          ? {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: refreshToken }),
+          }
+          : { method: 'POST', headers: { Authorization: `Bearer ${token}` } });
+        if (!res.ok) {
+          clearTokens();
+          return false;
+        }
+        storeTokens(await res.json());
+        return true;
+      } catch {
+        return false;
+      }
+    })().finally(() => {
+      refreshing = null;
+    });
+  }
+  return refreshing;
+};
+
+const withToken = (options) => ({
+  ...options,
+  headers: { ...(options.headers || {}), Authorization: `Bearer ${localStorage.getItem('token')}` },
+});
+
+export const authFetch = async (url, options = {}) => {
+  const res = await fetch(url, withToken(options));
+  if (res.status !== 401 || !(await refreshTokens())) {
+    return res;
+  }
+  return fetch(url, withToken(options));
+};
+
+export const logout = async () => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  const token = localStorage.getItem('token');
+  clearTokens();
+  if (!token) return;
+  try {
+    await fetch(getApiUrl('auth/logout'), {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
+      body: refreshToken ? JSON.stringify({ refresh_token: refreshToken }) : undefined,
+    });
+  } catch {
+    // сеть недоступна — токены уже удалены локально
+  }
+};